@@ -0,0 +1,58 @@
+"""
+TimesFM 추론 벤치마크 공용 모듈
+항상 같은 값으로 생성되는 고정 시계열 세트와 비교/측정 함수를 제공합니다.
+"""
+
+import time
+import numpy as np
+
+# 10분 단위 기준 하루(144) 예측
+HORIZON = 144
+SEED = 2025
+
+
+def make_benchmark_set(num_series: int = 16, seed: int = SEED) -> tuple:
+    """
+    10분 단위 건물 전력 사용량 형태의 합성 시계열 세트 생성
+
+    일/주 단위 주기, 주말 감소, 잡음을 포함하며 길이는 144 ~ 4096 포인트로 다양합니다.
+
+    Returns:
+    - contexts: 예측 입력 시계열 리스트 (각 shape: (길이,))
+    - targets: 각 시계열의 실제 다음 HORIZON 구간, shape: (num_series, HORIZON)
+    """
+    rng = np.random.default_rng(seed)
+    lengths = np.linspace(144, 4096, num_series).astype(int)
+
+    contexts, targets = [], []
+    for length in lengths:
+        t = np.arange(length + HORIZON)
+        base = rng.uniform(20.0, 400.0)
+        daily = 0.4 * base * np.sin(2 * np.pi * t / 144 + rng.uniform(0, 2 * np.pi))
+        weekend = np.where((t // 144) % 7 >= 5, -0.25 * base, 0.0)
+        noise = rng.normal(0.0, 0.03 * base, size=len(t))
+        series = np.clip(base + daily + weekend + noise, 0.0, None)
+        contexts.append(series[:length])
+        targets.append(series[length:])
+    return contexts, np.stack(targets)
+
+
+def timed_forecast(model, contexts: list, horizon: int = HORIZON, repeats: int = 3) -> tuple:
+    """
+    예측을 repeats회 실행해 마지막 결과와 평균 소요 시간(초)을 반환 (첫 실행은 워밍업으로 제외)
+
+    Returns:
+    - (point_forecast, quantile_forecast, seconds)
+    """
+    point_forecast, quantile_forecast = model.forecast(horizon=horizon, inputs=list(contexts))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        point_forecast, quantile_forecast = model.forecast(horizon=horizon, inputs=list(contexts))
+    return point_forecast, quantile_forecast, (time.perf_counter() - start) / repeats
+
+
+def relative_mae(actual: np.ndarray, expected: np.ndarray, contexts: list) -> float:
+    """시계열별 평균 크기로 정규화한 평균 절대 오차"""
+    scale = np.array([np.mean(np.abs(c)) for c in contexts])
+    scale = scale.reshape((-1,) + (1,) * (actual.ndim - 1))
+    return float(np.mean(np.abs(actual - expected) / np.maximum(scale, 1e-6)))
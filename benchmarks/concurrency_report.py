@@ -0,0 +1,80 @@
+"""
+동시 예측 처리량 리포트
+같은 예측 요청을 동시에 보냈을 때 기본 executor(asyncio.to_thread)와
+전용 추론 executor(run_inference)의 처리량과 지연 시간을 비교합니다.
+
+사용법: python benchmarks/concurrency_report.py [--concurrency 4] [--rounds 3]
+슬롯 설정은 FORECAST_INFERENCE_SLOTS, FORECAST_THREADS_PER_SLOT, FORECAST_PIN_CORES로 지정합니다.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 프로젝트 루트를 sys.path에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.benchmark_data import HORIZON, make_benchmark_set
+from src import metrics
+from src.config import INFERENCE_CONFIG
+from src.forecast_model import forecasting, model
+from src.inference_executor import run_inference, shutdown_executor, slot_plan
+
+
+async def measure(submit, contexts: list, concurrency: int, rounds: int) -> tuple:
+    """concurrency개 요청을 rounds회 동시에 보내 (초당 처리량, 요청별 지연 시간 목록) 반환"""
+    latencies = []
+
+    async def one(context):
+        start = time.perf_counter()
+        await submit(forecasting, model, HORIZON, context)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for r in range(rounds):
+        batch = [contexts[(r * concurrency + i) % len(contexts)] for i in range(concurrency)]
+        await asyncio.gather(*(one(context) for context in batch))
+    elapsed = time.perf_counter() - start
+    return concurrency * rounds / elapsed, latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="동시 예측 처리량 리포트")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    contexts, _ = make_benchmark_set()
+
+    # 워밍업 (두 방식 모두 같은 컴파일 상태에서 측정)
+    await asyncio.to_thread(forecasting, model, HORIZON, contexts[0])
+    await run_inference(forecasting, model, HORIZON, contexts[0])
+    metrics.reset()
+
+    results = {
+        "asyncio.to_thread": await measure(asyncio.to_thread, contexts, args.concurrency, args.rounds),
+        "run_inference": await measure(run_inference, contexts, args.concurrency, args.rounds),
+    }
+    queue_wait = metrics.snapshot()["latencies"]["inference.queue_wait"]
+    shutdown_executor()
+
+    print("=" * 60)
+    print(f"동시 예측 처리량 리포트 (동시 요청 {args.concurrency}개 x {args.rounds}회, horizon {HORIZON})")
+    print(f"슬롯 {INFERENCE_CONFIG['slots']}개, 슬롯별 (스레드, 코어): {slot_plan()}")
+    print("=" * 60)
+    print(f"{'':<20}{'처리량(req/s)':>16}{'p50(ms)':>12}{'p95(ms)':>12}")
+    for name, (throughput, latencies) in results.items():
+        p50, p95 = np.percentile(np.array(latencies) * 1000, [50, 95])
+        print(f"{name:<20}{throughput:>16.2f}{p50:>12.1f}{p95:>12.1f}")
+    print(f"\n전용 executor 대기 시간: {queue_wait}")
+    base, dedicated = results["asyncio.to_thread"][0], results["run_inference"][0]
+    print(f"처리량 변화: x{dedicated / base:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""
+KV 캐시 저장 dtype 정확도 리포트
+float32 캐시 결과를 기준으로 bfloat16/float16 캐시의 예측 차이, 지연 시간, 실측 캐시 메모리와 읽은 바이트를 비교합니다.
+
+- 캐시(MB): 실제로 할당된 디코딩 캐시 텐서의 크기 (시계열별 예측 중 최대, 가장 긴 컨텍스트 기준)
+- 읽기(MB): 시계열별 예측에서 attention이 캐시에서 읽은 key/value 바이트 합
+- 최대 메모리(MB): CUDA 사용 시 예측 중 최대 할당 메모리
+
+사용법: python benchmarks/kv_cache_report.py [--max-relative-mae 0.005]
+허용 오차를 넘으면 종료 코드 1을 반환합니다.
+"""
+
+import argparse
+import dataclasses
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# 프로젝트 루트를 sys.path에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.benchmark_data import HORIZON, make_benchmark_set, relative_mae, timed_forecast
+from src.forecast_model import model
+
+KV_CACHE_DTYPES = ["float32", "bfloat16", "float16"]
+
+
+def measure_cache_traffic(model, contexts: list, horizon: int = HORIZON) -> tuple:
+    """
+    attention 호출을 감싸 시계열별 예측에서 할당된 캐시 크기와 캐시에서 읽은 바이트를 측정
+
+    감싼 함수는 컴파일되지 않고 매번 실행되도록 torch.compiler.disable로 감싸며,
+    측정은 시간 측정과 별도로 한 번만 실행합니다.
+
+    Returns:
+    - (cache_bytes, read_bytes): 시계열별 캐시 텐서 크기 중 최대, attention이 읽은 key/value 바이트 합
+    """
+    read_bytes = 0
+    storages = {}
+    cache_bytes = 0
+
+    def wrap(attention_fn):
+        @torch.compiler.disable
+        def counting_attention(query, key, value, mask=None):
+            nonlocal read_bytes
+            read_bytes += key.nbytes + value.nbytes
+            for tensor in (key, value):
+                storage = tensor.untyped_storage()
+                storages[storage.data_ptr()] = storage.nbytes()
+            return attention_fn(query, key, value, mask=mask)
+        return counting_attention
+
+    layers = [layer.attn for layer in model.model.stacked_xf]
+    originals = [attn.attention_fn for attn in layers]
+    try:
+        for attn, attention_fn in zip(layers, originals):
+            attn.attention_fn = wrap(attention_fn)
+        # 배치마다 캐시를 새로 할당하므로 시계열 하나씩 예측해 그중 최대를 캐시 크기로 사용
+        for context in contexts:
+            storages.clear()
+            model.forecast(horizon=horizon, inputs=[context])
+            cache_bytes = max(cache_bytes, sum(storages.values()))
+    finally:
+        for attn, attention_fn in zip(layers, originals):
+            attn.attention_fn = attention_fn
+    return cache_bytes, read_bytes
+
+
+def peak_memory_megabytes(model, contexts: list, horizon: int = HORIZON):
+    """CUDA 사용 시 예측 한 번의 최대 할당 메모리(MB), 그 외에는 None"""
+    if not torch.cuda.is_available():
+        return None
+    torch.cuda.synchronize()
+    torch.cuda.reset_peak_memory_stats()
+    model.forecast(horizon=horizon, inputs=list(contexts))
+    torch.cuda.synchronize()
+    return torch.cuda.max_memory_allocated() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KV 캐시 저장 dtype 정확도 리포트")
+    parser.add_argument("--max-relative-mae", type=float, default=0.005,
+                        help="float32 캐시 대비 허용하는 최대 상대 MAE (point/quantile 각각)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    contexts, targets = make_benchmark_set()
+    base_config = dataclasses.replace(model.forecast_config, kv_cache_dtype="float32")
+
+    results = {}
+    measured = {}
+    for kv_cache_dtype in KV_CACHE_DTYPES:
+        config = dataclasses.replace(base_config, kv_cache_dtype=kv_cache_dtype)
+        model.compile(config)
+        results[kv_cache_dtype] = timed_forecast(model, contexts, HORIZON, args.repeats)
+        peak = peak_memory_megabytes(model, contexts)
+        cache_bytes, read_bytes = measure_cache_traffic(model, contexts)
+        measured[kv_cache_dtype] = (cache_bytes / 2**20, read_bytes / 2**20, peak)
+
+    fp32_point, fp32_quantile, fp32_seconds = results["float32"]
+    fp32_cache, fp32_read, fp32_peak = measured["float32"]
+
+    print("=" * 60)
+    print(f"KV 캐시 dtype 리포트 (시계열 {len(contexts)}개, horizon {HORIZON})")
+    print("=" * 60)
+    print(f"{'':<12}{'MAE(실제값)':>14}{'지연 시간(ms)':>16}{'캐시(MB)':>12}{'읽기(MB)':>12}{'최대 메모리(MB)':>18}")
+    for kv_cache_dtype, (point, _, seconds) in results.items():
+        cache_mb, read_mb, peak = measured[kv_cache_dtype]
+        peak_text = f"{peak:.1f}" if peak is not None else "-"
+        print(f"{kv_cache_dtype:<12}{np.mean(np.abs(point - targets)):>14.4f}{seconds * 1000:>16.1f}"
+              f"{cache_mb:>12.1f}{read_mb:>12.1f}{peak_text:>18}")
+
+    exceeded = False
+    for kv_cache_dtype in KV_CACHE_DTYPES[1:]:
+        point, quantile, seconds = results[kv_cache_dtype]
+        cache_mb, read_mb, peak = measured[kv_cache_dtype]
+        point_drift = relative_mae(point, fp32_point, contexts)
+        quantile_drift = relative_mae(quantile, fp32_quantile, contexts)
+        print(f"\n[{kv_cache_dtype}] float32 대비 상대 MAE - point: {point_drift:.6f}, quantile: {quantile_drift:.6f}")
+        print(f"[{kv_cache_dtype}] 속도 향상: x{fp32_seconds / seconds:.2f}, "
+              f"캐시 절감: x{fp32_cache / cache_mb:.2f}, 읽기 절감: x{fp32_read / read_mb:.2f}")
+        if peak is not None:
+            print(f"[{kv_cache_dtype}] 최대 메모리 절감: {fp32_peak - peak:.1f}MB")
+        exceeded |= max(point_drift, quantile_drift) > args.max_relative_mae
+
+    # 정확도 가드레일
+    if exceeded:
+        print(f"\n❌ 상대 MAE가 허용치({args.max_relative_mae})를 초과했습니다.")
+        sys.exit(1)
+    print(f"\n✅ 허용치({args.max_relative_mae}) 이내")
+
+
+if __name__ == "__main__":
+    main()
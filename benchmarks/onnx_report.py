@@ -0,0 +1,73 @@
+"""
+ONNX Runtime 백엔드 비교 리포트
+torch 모델 결과를 기준으로 ONNX Runtime 예측의 일치 여부와 지연 시간을 비교합니다.
+
+export_onnx.py로 만든 그래프 디렉토리가 필요합니다 (--onnx-dir 또는 FORECAST_ONNX_DIR).
+
+사용법: python benchmarks/onnx_report.py [--onnx-dir DIR] [--max-relative-mae 0.0001]
+허용 오차를 넘으면 종료 코드 1을 반환합니다.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 프로젝트 루트를 sys.path에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# 기준 모델은 항상 torch 백엔드로 로드
+os.environ["FORECAST_BACKEND"] = "torch"
+
+from benchmarks.benchmark_data import HORIZON, make_benchmark_set, relative_mae, timed_forecast
+from src.forecast_model import FORECAST_CONFIG, model
+from src.models.timesfm.src.timesfm.timesfm_2p5.timesfm_2p5_onnx import TimesFM_2p5_200M_onnx
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX Runtime 백엔드 비교 리포트")
+    parser.add_argument("--onnx-dir", default=os.getenv("FORECAST_ONNX_DIR"),
+                        help="export_onnx.py로 만든 그래프 디렉토리")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op 스레드 수 (0: 전체 코어)")
+    parser.add_argument("--max-relative-mae", type=float, default=1e-4,
+                        help="torch 대비 허용하는 최대 상대 MAE (point/quantile 각각)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if not args.onnx_dir:
+        print("❌ --onnx-dir 또는 FORECAST_ONNX_DIR을 지정하세요.")
+        sys.exit(1)
+
+    contexts, targets = make_benchmark_set()
+
+    torch_point, torch_quantile, torch_seconds = timed_forecast(model, contexts, HORIZON, args.repeats)
+
+    onnx_model = TimesFM_2p5_200M_onnx(args.onnx_dir, intra_op_num_threads=args.threads)
+    onnx_model.compile(FORECAST_CONFIG)
+    onnx_point, onnx_quantile, onnx_seconds = timed_forecast(onnx_model, contexts, HORIZON, args.repeats)
+
+    point_drift = relative_mae(onnx_point, torch_point, contexts)
+    quantile_drift = relative_mae(onnx_quantile, torch_quantile, contexts)
+
+    print("=" * 60)
+    print(f"ONNX Runtime 비교 리포트 (시계열 {len(contexts)}개, horizon {HORIZON})")
+    print("=" * 60)
+    print(f"{'':<12}{'MAE(실제값)':>14}{'지연 시간(ms)':>16}")
+    print(f"{'torch':<12}{np.mean(np.abs(torch_point - targets)):>14.4f}{torch_seconds * 1000:>16.1f}")
+    print(f"{'onnx':<12}{np.mean(np.abs(onnx_point - targets)):>14.4f}{onnx_seconds * 1000:>16.1f}")
+    print(f"\ntorch 대비 상대 MAE - point: {point_drift:.2e}, quantile: {quantile_drift:.2e}")
+    print(f"torch 대비 최대 절대 오차 - point: {np.max(np.abs(onnx_point - torch_point)):.2e}")
+    print(f"속도 향상: x{torch_seconds / onnx_seconds:.2f}")
+
+    # 일치 여부 가드레일
+    if max(point_drift, quantile_drift) > args.max_relative_mae:
+        print(f"\n❌ 상대 MAE가 허용치({args.max_relative_mae})를 초과했습니다.")
+        sys.exit(1)
+    print(f"\n✅ 허용치({args.max_relative_mae}) 이내")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+bf16 autocast 정확도 리포트
+fp32 결과를 기준으로 point/quantile 예측 차이와 지연 시간을 비교합니다.
+
+사용법: python benchmarks/precision_report.py [--max-relative-mae 0.01]
+허용 오차를 넘으면 종료 코드 1을 반환합니다.
+"""
+
+import argparse
+import dataclasses
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 프로젝트 루트를 sys.path에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.benchmark_data import HORIZON, make_benchmark_set, relative_mae, timed_forecast
+from src.forecast_model import model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bf16 autocast 정확도 리포트")
+    parser.add_argument("--max-relative-mae", type=float, default=0.01,
+                        help="fp32 대비 허용하는 최대 상대 MAE (point/quantile 각각)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    contexts, targets = make_benchmark_set()
+    base_config = dataclasses.replace(model.forecast_config, precision="float32")
+
+    results = {}
+    for precision in ["float32", "bfloat16"]:
+        model.compile(dataclasses.replace(base_config, precision=precision))
+        results[precision] = timed_forecast(model, contexts, HORIZON, args.repeats)
+
+    fp32_point, fp32_quantile, fp32_seconds = results["float32"]
+    bf16_point, bf16_quantile, bf16_seconds = results["bfloat16"]
+
+    point_drift = relative_mae(bf16_point, fp32_point, contexts)
+    quantile_drift = relative_mae(bf16_quantile, fp32_quantile, contexts)
+
+    print("=" * 60)
+    print(f"bf16 autocast 정확도 리포트 (시계열 {len(contexts)}개, horizon {HORIZON})")
+    print("=" * 60)
+    print(f"{'':<12}{'MAE(실제값)':>14}{'지연 시간(ms)':>16}")
+    for precision, (point, _, seconds) in results.items():
+        print(f"{precision:<12}{np.mean(np.abs(point - targets)):>14.4f}{seconds * 1000:>16.1f}")
+    print(f"\nfp32 대비 상대 MAE - point: {point_drift:.6f}, quantile: {quantile_drift:.6f}")
+    print(f"fp32 대비 최대 절대 오차 - point: {np.max(np.abs(bf16_point - fp32_point)):.4f}")
+    print(f"속도 향상: x{fp32_seconds / bf16_seconds:.2f}")
+
+    # 정확도 가드레일
+    if max(point_drift, quantile_drift) > args.max_relative_mae:
+        print(f"\n❌ 상대 MAE가 허용치({args.max_relative_mae})를 초과했습니다.")
+        sys.exit(1)
+    print(f"\n✅ 허용치({args.max_relative_mae}) 이내")
+
+
+if __name__ == "__main__":
+    main()
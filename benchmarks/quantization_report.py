@@ -0,0 +1,81 @@
+"""
+int8 동적 양자화 평가 리포트
+fp32 모델 대비 MAE 변화, 지연 시간, 가중치 메모리를 비교합니다.
+
+동적 양자화는 활성값 범위를 실행 시점에 계산하므로 별도 calibration 데이터가 필요 없습니다.
+고정 벤치마크 세트로 양자화 전후 결과를 비교해 정확도 손실을 확인합니다.
+
+사용법: python benchmarks/quantization_report.py [--max-relative-mae 0.02]
+허용 오차를 넘으면 종료 코드 1을 반환합니다.
+"""
+
+import argparse
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# 프로젝트 루트를 sys.path에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.benchmark_data import HORIZON, make_benchmark_set, relative_mae, timed_forecast
+from src.forecast_model import model
+from src.models.timesfm.src.timesfm.torch import quantization
+
+
+def state_dict_megabytes(module) -> float:
+    """직렬화된 state_dict 크기(MB)"""
+    buffer = io.BytesIO()
+    torch.save(module.state_dict(), buffer)
+    return buffer.tell() / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="int8 동적 양자화 평가 리포트")
+    parser.add_argument("--mode", default="int8_dynamic", choices=quantization.QUANTIZATION_MODES)
+    parser.add_argument("--max-relative-mae", type=float, default=0.02,
+                        help="fp32 대비 허용하는 최대 상대 MAE (point/quantile 각각)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if model.model.quantization is not None:
+        print("❌ 이미 양자화된 모델입니다. FORECAST_QUANTIZATION 없이 실행하세요.")
+        sys.exit(1)
+
+    contexts, targets = make_benchmark_set()
+
+    # 1. fp32 기준 측정
+    fp32_megabytes = state_dict_megabytes(model.model)
+    fp32_point, fp32_quantile, fp32_seconds = timed_forecast(model, contexts, HORIZON, args.repeats)
+
+    # 2. 같은 모델을 양자화한 뒤 재측정
+    quantization.quantize_linear_layers(model.model, args.mode)
+    model.model.quantization = args.mode
+    model.compile(model.forecast_config)
+    int8_megabytes = state_dict_megabytes(model.model)
+    int8_point, int8_quantile, int8_seconds = timed_forecast(model, contexts, HORIZON, args.repeats)
+
+    point_drift = relative_mae(int8_point, fp32_point, contexts)
+    quantile_drift = relative_mae(int8_quantile, fp32_quantile, contexts)
+
+    print("=" * 60)
+    print(f"{args.mode} 양자화 리포트 (시계열 {len(contexts)}개, horizon {HORIZON})")
+    print("=" * 60)
+    print(f"{'':<14}{'MAE(실제값)':>14}{'지연 시간(ms)':>16}{'가중치(MB)':>14}")
+    print(f"{'float32':<14}{np.mean(np.abs(fp32_point - targets)):>14.4f}{fp32_seconds * 1000:>16.1f}{fp32_megabytes:>14.1f}")
+    print(f"{args.mode:<14}{np.mean(np.abs(int8_point - targets)):>14.4f}{int8_seconds * 1000:>16.1f}{int8_megabytes:>14.1f}")
+    print(f"\nfp32 대비 상대 MAE - point: {point_drift:.6f}, quantile: {quantile_drift:.6f}")
+    print(f"속도 향상: x{fp32_seconds / int8_seconds:.2f}, 메모리 절감: x{fp32_megabytes / int8_megabytes:.2f}")
+
+    # 정확도 가드레일
+    if max(point_drift, quantile_drift) > args.max_relative_mae:
+        print(f"\n❌ 상대 MAE가 허용치({args.max_relative_mae})를 초과했습니다.")
+        sys.exit(1)
+    print(f"\n✅ 허용치({args.max_relative_mae}) 이내")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+torch.compile 캐시 빌드 스크립트
+배포 전에 실행해 예측 모델의 컴파일 결과를 FORECAST_COMPILE_CACHE_DIR에 저장합니다.
+
+서버는 같은 디렉토리를 가리키면 Inductor 코드 생성/C++ 컴파일 없이 캐시를 재사용하고,
+시작 시 워밍업으로 그래프를 미리 만들어 첫 요청부터 컴파일된 모델을 사용합니다.
+
+사용법: FORECAST_COMPILE_CACHE_DIR=/path/to/cache python build_compile_cache.py
+FORECAST_PRECISION, FORECAST_QUANTIZATION은 서버와 같은 값으로 설정해야 합니다.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+# 프로젝트 루트를 sys.path에 추가
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def main():
+    cache_dir = os.getenv("FORECAST_COMPILE_CACHE_DIR")
+    if not cache_dir:
+        print("❌ FORECAST_COMPILE_CACHE_DIR 환경 변수를 설정하세요.")
+        sys.exit(1)
+    # 모델 로드 시 워밍업으로 모든 decode 그래프를 컴파일
+    os.environ["FORECAST_WARMUP"] = "true"
+
+    start = time.perf_counter()
+    from src.forecast_model import model
+    from src.models.timesfm.src.timesfm.torch import compile_cache
+    elapsed = time.perf_counter() - start
+
+    fc = model.forecast_config
+    stats = compile_cache.cache_stats()
+    print("=" * 60)
+    print("torch.compile 캐시 빌드 완료")
+    print("=" * 60)
+    print(f"캐시 디렉토리: {os.path.abspath(cache_dir)}")
+    print(f"설정: batch {model.global_batch_size}, context {fc.max_context}, horizon {fc.max_horizon}, precision {fc.precision}")
+    print(f"소요 시간: {elapsed:.1f}s")
+    print(f"캐시 적중/미스: {stats}")
+
+
+if __name__ == "__main__":
+    main()
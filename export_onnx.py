@@ -0,0 +1,51 @@
+"""
+ONNX 그래프 export 스크립트
+예측 모델을 prefill / AR step ONNX 그래프로 변환해 FORECAST_ONNX_DIR에 저장합니다.
+
+서버는 FORECAST_BACKEND=onnx, FORECAST_ONNX_DIR=같은 경로로 실행하면 ONNX Runtime으로 예측합니다.
+그래프는 src/forecast_model.py의 ForecastConfig(배치, context, horizon) 기준으로 고정되므로
+설정을 바꾸면 다시 export해야 합니다.
+
+사용법: FORECAST_ONNX_DIR=/path/to/onnx python export_onnx.py
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+# 프로젝트 루트를 sys.path에 추가
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def main():
+    output_dir = os.getenv("FORECAST_ONNX_DIR")
+    if not output_dir:
+        print("❌ FORECAST_ONNX_DIR 환경 변수를 설정하세요.")
+        sys.exit(1)
+    if os.getenv("FORECAST_QUANTIZATION"):
+        print("❌ 양자화된 모델은 export할 수 없습니다. FORECAST_QUANTIZATION 없이 실행하세요.")
+        sys.exit(1)
+    # export는 torch 모델에서만 가능하며 워밍업은 필요 없음
+    os.environ["FORECAST_BACKEND"] = "torch"
+    os.environ["FORECAST_WARMUP"] = "false"
+
+    from src.forecast_model import model
+    from src.models.timesfm.src.timesfm.timesfm_2p5 import timesfm_2p5_onnx
+
+    start = time.perf_counter()
+    timesfm_2p5_onnx.export(model, output_dir)
+    elapsed = time.perf_counter() - start
+
+    fc = model.forecast_config
+    print("=" * 60)
+    print("ONNX export 완료")
+    print("=" * 60)
+    print(f"출력 디렉토리: {os.path.abspath(output_dir)}")
+    print(f"설정: batch {model.global_batch_size}, context {fc.max_context}, horizon {fc.max_horizon}")
+    print(f"소요 시간: {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
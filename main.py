@@ -1,18 +1,41 @@
+from contextlib import asynccontextmanager
 from src.config import setup_logging
 from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from src import metrics
+from src.power_control_client import close_session as close_power_control_session
+from src.inference_executor import shutdown_executor as shutdown_inference_executor
+from src.forecast_store import close_store as close_forecast_store
 from src.electricity_tools import register_electricity_tools
 from src.forecast_tools import register_forecast_tools
 from src.datetime_tools import register_datetime_tools
 from src.power_control_tools import register_power_control_tools
 
+# 서버 수명 주기: 종료 시 공유 리소스 정리
+@asynccontextmanager
+async def lifespan(server):
+    try:
+        yield
+    finally:
+        await close_power_control_session()
+        shutdown_inference_executor()
+        await close_forecast_store()
+
 # MCP 서버 인스턴스 생성
 mcp_server = FastMCP(
     name="Inha Campus Electricity Server",
     instructions="""
     이 서버는 인하대학교 내 건물들의 누적 유효 전력량(KWH) 정보를 조회 및 분석하는 MCP 서버입니다.
-    """
+    """,
+    lifespan=lifespan,
 )
 
+# 서버 내부 지표 조회 엔드포인트
+@mcp_server.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse(metrics.snapshot())
+
 # 도구 등록
 def register_all_tools():
     register_electricity_tools(mcp_server)
@@ -36,6 +36,13 @@ def get_env(key: str, default: str = None) -> str:
     """환경 변수 값 반환"""
     return os.getenv(key, default)
 
+# 프로젝트 루트 (src의 상위 디렉토리)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def resolve_project_path(path: str) -> str:
+    """상대 경로는 실행 위치(cwd)가 아닌 프로젝트 루트 기준 절대 경로로 변환"""
+    return os.path.abspath(os.path.join(PROJECT_ROOT, os.path.expanduser(path)))
+
 # 모듈 임포트 시 로깅 자동 초기화
 setup_logging()
 
@@ -46,4 +53,42 @@ POSTGRES_CONFIG = {
     'database': os.getenv('POSTGRES_DATABASE', 'postgres'),
     'user': os.getenv('POSTGRES_USER', 'postgres'),
     'password': os.getenv('POSTGRES_PASSWORD', ''),
-}
\ No newline at end of file
+}
+# 전력 제어 API HTTP 클라이언트 설정 (커넥션 풀 / 타임아웃)
+POWER_CONTROL_CONFIG = {
+    'pool_limit': int(os.getenv('POWER_CONTROL_POOL_LIMIT', '100')),
+    'pool_limit_per_host': int(os.getenv('POWER_CONTROL_POOL_LIMIT_PER_HOST', '50')),
+    'keepalive_timeout': float(os.getenv('POWER_CONTROL_KEEPALIVE_TIMEOUT', '60')),
+    'dns_cache_ttl': int(os.getenv('POWER_CONTROL_DNS_CACHE_TTL', '300')),
+    'total_timeout': float(os.getenv('POWER_CONTROL_TIMEOUT', '10')),
+    'connect_timeout': float(os.getenv('POWER_CONTROL_CONNECT_TIMEOUT', '3')),
+    'batch_concurrency': int(os.getenv('POWER_CONTROL_BATCH_CONCURRENCY', '50')),
+    'max_retries': int(os.getenv('POWER_CONTROL_MAX_RETRIES', '3')),
+    'retry_backoff_base': float(os.getenv('POWER_CONTROL_RETRY_BACKOFF_BASE', '0.2')),
+    'retry_backoff_max': float(os.getenv('POWER_CONTROL_RETRY_BACKOFF_MAX', '2.0')),
+}
+# 예측 모델 전용 추론 executor 설정 (동시 실행 슬롯 수 / 슬롯별 torch 스레드 수 / 코어 고정)
+INFERENCE_CONFIG = {
+    'slots': int(os.getenv('FORECAST_INFERENCE_SLOTS', '2')),
+    'threads_per_slot': int(os.getenv('FORECAST_THREADS_PER_SLOT', '0')),  # 0이면 사용 가능한 코어를 슬롯 수로 나눔
+    'pin_cores': os.getenv('FORECAST_PIN_CORES', 'false').lower() == 'true',
+}
+# 예측 결과 저장소 설정 (memory: 프로세스 내부 / sqlite: 로컬 디스크 / redis: replica 공유 서버)
+FORECAST_STORE_CONFIG = {
+    'backend': os.getenv('FORECAST_STORE', 'memory'),
+    'sqlite_path': resolve_project_path(os.getenv('FORECAST_STORE_SQLITE_PATH', 'forecast_store.sqlite3')),
+    'redis_url': os.getenv('FORECAST_STORE_REDIS_URL', 'redis://localhost:6379/0'),
+    'ttl': int(os.getenv('FORECAST_STORE_TTL', '3600')),
+    'memory_max_entries': int(os.getenv('FORECAST_STORE_MEMORY_MAX_ENTRIES', '1024')),  # memory 저장소 LRU 최대 항목 수
+}
+# 기간 조회 캐시 설정 (데이터는 10분 간격으로 수집)
+RANGE_CACHE_CONFIG = {
+    'ingestion_interval_minutes': int(os.getenv('INGESTION_INTERVAL_MINUTES', '10')),
+    'max_size': int(os.getenv('RANGE_CACHE_SIZE', '1024')),  # 과거 구간 결과 LRU 최대 항목 수
+}
+# 사용량 인덱스 설정 (건물별 DB 재조회 최소 간격 / 건물별 마지막 적재 시각 이전부터 다시 읽어 늦게 도착한 행을 반영하는 구간 / 한 번에 읽는 최대 행 수)
+USAGE_INDEX_CONFIG = {
+    'refresh_interval_seconds': float(os.getenv('USAGE_INDEX_REFRESH_SECONDS', '60')),
+    'overlap_minutes': int(os.getenv('USAGE_INDEX_OVERLAP_MINUTES', '30')),
+    'chunk_size': int(os.getenv('USAGE_INDEX_CHUNK_SIZE', '10000')),
+}
@@ -4,6 +4,8 @@ from .services import (
     service_get_building_data_range,
     service_get_energy_usages_range,
     service_get_total_energy_usage,
+    service_get_total_energy_usage_batch,
+    service_get_energy_usage_by_period,
 )
 from datetime import datetime
 import json
@@ -108,4 +110,86 @@ def register_electricity_tools(mcp_server):
             logger.error(f"get_total_energy_usage error: {str(e)}", exc_info=True)
             return str(e)
 
-    
\ No newline at end of file
+    @mcp_server.tool(
+        name="get_total_energy_usage_batch",
+        description="여러 건물/기간(YYYY-MM-DD HH:MM:SS)의 총 전력 사용량(kWh)을 한 번에 계산하여 반환합니다. 일별/주별 사용량처럼 많은 기간을 집계할 때 get_total_energy_usage를 반복 호출하는 대신 사용하세요."
+    )
+    async def get_total_energy_usage_batch(queries: list[dict[str, str]]) -> str:
+        """
+        여러 (건물, 기간)의 총 전력 사용량을 한 번에 계산하여 반환합니다.
+
+        Args:
+            queries: 조회 목록
+                [{"building": "<건물명>", "start_date_time": "YYYY-MM-DD HH:MM:SS", "end_date_time": "YYYY-MM-DD HH:MM:SS"}, ...]
+        """
+        try:
+            logger.info(f"get_total_energy_usage_batch called: {len(queries)}개 기간")
+
+            # 문자열을 datetime 객체로 변환
+            parsed = [
+                {
+                    "building": query["building"],
+                    "start_date_time": datetime.strptime(query["start_date_time"], '%Y-%m-%d %H:%M:%S'),
+                    "end_date_time": datetime.strptime(query["end_date_time"], '%Y-%m-%d %H:%M:%S'),
+                }
+                for query in queries
+            ]
+
+            result = await service_get_total_energy_usage_batch(parsed)
+            logger.info(f"get_total_energy_usage_batch result: {len(result)} bytes")
+            return result
+        except ValueError as e:
+            logger.error(f"Date parsing error: {str(e)}", exc_info=True)
+            return json.dumps({"error": f"날짜 형식 오류: {str(e)}. 올바른 형식: YYYY-MM-DD HH:MM:SS"}, ensure_ascii=False)
+        except KeyError as e:
+            logger.error(f"get_total_energy_usage_batch missing field: {str(e)}", exc_info=True)
+            return json.dumps({"error": f"필수 항목 누락: {str(e)}. building, start_date_time, end_date_time이 필요합니다."}, ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"get_total_energy_usage_batch error: {str(e)}", exc_info=True)
+            return str(e)
+
+    @mcp_server.tool(
+        name="get_energy_usage_by_period",
+        description="여러 건물의 시간/일/주/월 단위(또는 지정한 구간별) 총 전력 사용량(kWh)을 한 번에 계산합니다. '지난달 일별 사용량'처럼 여러 구간의 사용량이 필요할 때 get_total_energy_usage를 구간마다 호출하는 대신 사용하세요."
+    )
+    async def get_energy_usage_by_period(start_date_time: str, end_date_time: str, buildings: list[str], period: str = "day", intervals: list[dict[str, str]] | None = None) -> str:
+        """
+        지정된 기간을 구간(period)으로 나누어 건물별 구간 총 사용량을 열(column) 단위로 반환합니다.
+
+        Args:
+            start_date_time: 조회 시작 일시 (Format: 'YYYY-MM-DD HH:MM:SS')
+            end_date_time: 조회 종료 일시 (Format: 'YYYY-MM-DD HH:MM:SS')
+            buildings: get_monitored_buildings 도구를 통해 확인된 정확한 건물명 목록
+            period: 'hour', 'day', 'week'(월요일 시작), 'month' 또는 'custom'
+            intervals: period가 'custom'일 때의 구간 목록
+                [{"start_date_time": "YYYY-MM-DD HH:MM:SS", "end_date_time": "YYYY-MM-DD HH:MM:SS"}, ...]
+
+        Returns:
+            {"meta": {...}, "columns": {"building": [...], "period_start": [...], "total_usage_kwh": [...], "data_points": [...]}}
+        """
+        try:
+            logger.info(f"get_energy_usage_by_period called: {buildings}, {start_date_time} ~ {end_date_time}, period={period}")
+
+            # 문자열을 datetime 객체로 변환
+            start_dt = datetime.strptime(start_date_time, '%Y-%m-%d %H:%M:%S')
+            end_dt = datetime.strptime(end_date_time, '%Y-%m-%d %H:%M:%S')
+            parsed_intervals = [
+                {
+                    "start_date_time": datetime.strptime(interval["start_date_time"], '%Y-%m-%d %H:%M:%S'),
+                    "end_date_time": datetime.strptime(interval["end_date_time"], '%Y-%m-%d %H:%M:%S'),
+                }
+                for interval in intervals or []
+            ]
+
+            result = await service_get_energy_usage_by_period(start_dt, end_dt, buildings, period, parsed_intervals or None)
+            logger.info(f"get_energy_usage_by_period result: {len(result)} bytes")
+            return result
+        except ValueError as e:
+            logger.error(f"Date parsing error: {str(e)}", exc_info=True)
+            return json.dumps({"error": f"날짜 형식 오류: {str(e)}. 올바른 형식: YYYY-MM-DD HH:MM:SS"}, ensure_ascii=False)
+        except KeyError as e:
+            logger.error(f"get_energy_usage_by_period missing field: {str(e)}", exc_info=True)
+            return json.dumps({"error": f"필수 항목 누락: {str(e)}. intervals에는 start_date_time, end_date_time이 필요합니다."}, ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"get_energy_usage_by_period error: {str(e)}", exc_info=True)
+            return str(e)
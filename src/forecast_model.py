@@ -1,20 +1,123 @@
+import dataclasses
+import hashlib
+import json
+from . import metrics
+from .config import get_env, get_logger
 from .models.timesfm.src.timesfm.configs import ForecastConfig
+from .models.timesfm.src.timesfm.timesfm_2p5 import batch_planner
+from .models.timesfm.src.timesfm.timesfm_2p5.timesfm_2p5_base import TimesFM_2p5_200M_Definition
 from .models.timesfm.src.timesfm.timesfm_2p5.timesfm_2p5_torch import TimesFM_2p5_200M_torch
+from .models.timesfm.src.timesfm.torch import compile_cache
 
-model = TimesFM_2p5_200M_torch.from_pretrained("google/timesfm-2.5-200m-pytorch", torch_compile=True)
-
-model.compile(
-    ForecastConfig(
-        max_context=1024*4,
-        max_horizon=1024,
-        normalize_inputs=True,
-        use_continuous_quantile_head=True,
-        force_flip_invariance=True,
-        infer_is_positive=True,
-        fix_quantile_crossing=True,
-        window_size=144*7,
+logger = get_logger(__name__)
+
+FORECAST_CONFIG = ForecastConfig(
+    # 기본 4096, 청크 attention 사용 시 context_limit(16384) - max_horizon까지 확장 가능
+    max_context=int(get_env('FORECAST_MAX_CONTEXT', str(1024*4))),
+    max_horizon=1024,
+    normalize_inputs=True,
+    use_continuous_quantile_head=True,
+    force_flip_invariance=True,
+    infer_is_positive=True,
+    fix_quantile_crossing=True,
+    window_size=144*7,
+    precision=get_env('FORECAST_PRECISION', 'float32'),
+    # KV 캐시 저장 dtype: float32 (기본), bfloat16, float16 (attention은 캐시 dtype으로 계산)
+    kv_cache_dtype=get_env('FORECAST_KV_CACHE_DTYPE', 'float32'),
+    # 0이면 배치 크기 고정 (per_core_batch_size), 양수이면 디코딩 메모리 추정치가 예산(MiB)에 맞는 최대 배치 사용
+    memory_budget_mb=int(get_env('FORECAST_MEMORY_BUDGET_MB', '0')),
+    # 길이가 다른 시계열을 한 컨텍스트 행에 나란히 넣어 디코딩 (torch 백엔드 전용)
+    pack_inputs=get_env('FORECAST_PACK_INPUTS', 'false').lower() == 'true',
+    # 0이면 전체 attention, 양수이면 해당 패치 수 단위 블록으로 나눠 계산 (메모리가 컨텍스트에 선형)
+    attention_block_size=int(get_env('FORECAST_ATTENTION_BLOCK_SIZE', '0')),
+    # attention 구현: auto (시작 시 벤치마크로 가장 빠른 정확한 구현 선택), sdpa, sdpa_additive, einsum
+    attention_backend=get_env('FORECAST_ATTENTION_BACKEND', 'auto'),
+)
+
+def _model_version() -> str:
+    """예측 저장소 키에 사용할 모델/설정 식별자 (백엔드, 양자화, ForecastConfig가 바뀌면 달라짐)"""
+    config_hash = hashlib.sha256(
+        json.dumps(dataclasses.asdict(FORECAST_CONFIG), sort_keys=True).encode()
+    ).hexdigest()[:12]
+    backend = get_env('FORECAST_BACKEND', 'torch')
+    quantization = get_env('FORECAST_QUANTIZATION') or 'none'
+    return f"timesfm-2.5-200m:{backend}:{quantization}:{config_hash}"
+
+
+MODEL_VERSION = _model_version()
+
+# 추론 백엔드: torch (기본) 또는 onnx (export_onnx.py로 만든 그래프를 ONNX Runtime으로 실행)
+if get_env('FORECAST_BACKEND', 'torch') == 'onnx':
+    from .models.timesfm.src.timesfm.timesfm_2p5.timesfm_2p5_onnx import TimesFM_2p5_200M_onnx
+
+    model = TimesFM_2p5_200M_onnx(
+        get_env('FORECAST_ONNX_DIR'),
+        intra_op_num_threads=int(get_env('FORECAST_ONNX_THREADS', '0')),
     )
-) 
+else:
+    model = TimesFM_2p5_200M_torch.from_pretrained(
+        "google/timesfm-2.5-200m-pytorch",
+        torch_compile=True,
+        compile_cache_dir=get_env('FORECAST_COMPILE_CACHE_DIR'),
+        quantization=get_env('FORECAST_QUANTIZATION'),
+    )
+
+model.compile(FORECAST_CONFIG)
+
+# 서버 시작 시 컴파일을 마쳐 첫 요청부터 컴파일된 그래프를 사용
+# (FORECAST_COMPILE_CACHE_DIR에 build_compile_cache.py로 만든 캐시가 있으면 재사용)
+if get_env('FORECAST_WARMUP', 'true').lower() == 'true':
+    with metrics.timer("forecast.warmup"):
+        model.warmup()
+    cache_stats = compile_cache.cache_stats()
+    for name, value in cache_stats.items():
+        metrics.set_gauge(f"forecast.compile_cache.{name}", value)
+    logger.info(f"forecast_model - 워밍업 완료, 컴파일 캐시: {cache_stats}")
+
+def report_memory_plan(model):
+    """컨텍스트 길이 구간별 최대 배치 크기와 디코딩 메모리 추정치를 지표로 기록"""
+    fc = model.forecast_config
+    definition = TimesFM_2p5_200M_Definition()
+    contexts = sorted({
+        model.decode_context([[0.0] * (definition.input_patch_len << i)])
+        for i in range((fc.max_context // definition.input_patch_len).bit_length())
+    })
+    for context in contexts:
+        if fc.memory_budget_mb > 0:
+            batch_size = batch_planner.plan_batch_size(definition, fc, fc.memory_budget_mb * 2**20, context)
+        else:
+            batch_size = model.global_batch_size
+        estimate_mb = batch_planner.estimate_decode_memory(definition, fc, batch_size, context)["total"] / 2**20
+        metrics.set_gauge(f"forecast.memory.{context}.batch_size", batch_size)
+        metrics.set_gauge(f"forecast.memory.{context}.estimate_mb", round(estimate_mb, 1))
+        logger.info(f"forecast_model - context {context}: 배치 크기 {batch_size}, 메모리 추정치 {estimate_mb:.1f}MiB")
+    metrics.set_gauge("forecast.memory.budget_mb", fc.memory_budget_mb)
+
+
+def _observe_memory_estimate(model, inputs):
+    """이번 예측의 배치 크기와 디코딩 메모리 추정치를 지표로 기록"""
+    batch_size = model.plan_batch_size(inputs)
+    context = model.decode_context(inputs)
+    estimate = batch_planner.estimate_decode_memory(
+        TimesFM_2p5_200M_Definition(), model.forecast_config, batch_size, context
+    )
+    metrics.set_gauge("forecast.memory.last.batch_size", batch_size)
+    metrics.set_gauge("forecast.memory.last.context", context)
+    for name, value in estimate.items():
+        metrics.set_gauge(f"forecast.memory.last.{name}_mb", round(value / 2**20, 1))
+
+
+def report_attention_backend(model):
+    """선택된 attention 구현과 벤치마크 결과(ms)를 지표로 기록"""
+    metrics.set_gauge("forecast.attention.backend", model.model.attention_backend)
+    metrics.set_gauge("forecast.attention.block_size", model.forecast_config.attention_block_size)
+    for name, seconds in (model.attention_benchmark or {}).items():
+        metrics.set_gauge(f"forecast.attention.benchmark.{name}_ms", None if seconds is None else round(seconds * 1000, 3))
+    logger.info(f"forecast_model - attention 구현: {model.model.attention_backend}, 벤치마크: {model.attention_benchmark}")
+
+
+report_memory_plan(model)
+report_attention_backend(model)
 
 def forecasting(model, horizon, input):
     """
@@ -41,10 +144,34 @@ def forecasting(model, horizon, input):
         Shape: (입력 개수, horizon, 10)
         첫 번째 값은 mean, 이후 q10 ~ q90 분위수 예측값을 포함합니다.
     """
+    _observe_memory_estimate(model, [input])
     point_forecast, quantile_forecast = model.forecast(
         horizon=horizon,
         inputs=[
             input
         ]
     )
-    return (point_forecast, quantile_forecast)
\ No newline at end of file
+    return (point_forecast, quantile_forecast)
+
+def forecasting_multi_horizon(model, horizons, input):
+    """
+    한 번의 디코딩으로 여러 horizon을 예측 (model.forecast_multi_horizon)
+
+    Arguments
+    ---------
+    model : timesfm.TimesFM_2p5_200M_torch
+        사전학습된 TimesFM 모델 객체.
+
+    horizons : list[int]
+        예측할 구간 수 목록. 가장 긴 horizon으로 한 번 예측하고, 짧은 horizon은 그 앞부분입니다.
+
+    input : np.ndarray
+        원하는 시계열 데이터 구간, shape: (길이,)
+
+    Returns
+    -------
+    dict[int, tuple[np.ndarray, np.ndarray]]
+        horizon별 (point_forecast, quantile_forecast), 각 shape은 forecasting과 동일합니다.
+    """
+    _observe_memory_estimate(model, [input])
+    return model.forecast_multi_horizon(horizons, [input])
@@ -0,0 +1,228 @@
+import asyncio
+import collections
+import json
+import sqlite3
+import struct
+import threading
+import time
+import numpy as np
+from .config import FORECAST_STORE_CONFIG, get_logger
+from . import metrics
+
+logger = get_logger(__name__)
+
+# 저장 형식 버전 (blob 구조나 키 구성이 바뀌면 올려서 이전 항목을 무효화)
+STORE_FORMAT_VERSION = 1
+
+# blob 앞에 붙는 JSON 헤더 길이 (uint32, little-endian)
+_HEADER_LENGTH = struct.Struct("<I")
+
+# 공유 저장소 (첫 사용 시 생성, 서버 종료 시 close_store로 정리)
+_store = None
+
+
+def forecast_key(model_version: str, building: str, start_date_time, end_date_time, horizon: int) -> str:
+    """모델/설정 식별자와 요청 인자로 버전이 붙은 저장소 키 생성"""
+    return f"forecast:v{STORE_FORMAT_VERSION}:{model_version}:{building}:{start_date_time}:{end_date_time}:{horizon}"
+
+
+def encode_forecast(point_forecast, quantile_forecast, meta: dict = None) -> bytes:
+    """
+    예측 결과를 float32 blob으로 직렬화
+
+    형식: [헤더 길이][JSON 헤더 (shape, meta)][point float32][quantile float32]
+    """
+    point = np.ascontiguousarray(point_forecast, dtype=np.float32)
+    quantile = np.ascontiguousarray(quantile_forecast, dtype=np.float32)
+    header = json.dumps({
+        "point": point.shape,
+        "quantile": quantile.shape,
+        "meta": meta or {},
+    }).encode()
+    return _HEADER_LENGTH.pack(len(header)) + header + point.tobytes() + quantile.tobytes()
+
+
+def decode_forecast(blob: bytes) -> tuple:
+    """encode_forecast로 직렬화한 blob을 (point, quantile, meta)로 복원 (복사 없이 읽기 전용 배열)"""
+    (header_length,) = _HEADER_LENGTH.unpack_from(blob)
+    offset = _HEADER_LENGTH.size
+    header = json.loads(blob[offset:offset + header_length])
+    offset += header_length
+
+    arrays = []
+    for name in ("point", "quantile"):
+        shape = tuple(header[name])
+        array = np.frombuffer(blob, dtype=np.float32, count=int(np.prod(shape)), offset=offset)
+        arrays.append(array.reshape(shape))
+        offset += array.nbytes
+    return arrays[0], arrays[1], header["meta"]
+
+
+class MemoryForecastStore:
+    """
+    프로세스 내부 저장소 (재시작 시 초기화, worker 간 공유되지 않음)
+
+    최근 사용 순서의 LRU로 최대 max_entries개까지만 보관합니다.
+    가득 차면 가장 오래 사용되지 않은 항목부터 만료 여부와 관계없이 제거합니다 (조회/저장 O(1)).
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or FORECAST_STORE_CONFIG['memory_max_entries']
+        self._items = collections.OrderedDict()
+
+    async def get(self, key: str):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        blob, expires_at = item
+        if expires_at <= time.time():
+            self._items.pop(key, None)
+            return None
+        self._items.move_to_end(key)
+        return blob
+
+    async def set(self, key: str, blob: bytes, ttl: int):
+        self._items[key] = (blob, time.time() + ttl)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    async def close(self):
+        self._items.clear()
+
+
+class SQLiteForecastStore:
+    """
+    로컬 디스크 SQLite 저장소 (재시작 후에도 유지, 같은 호스트의 worker끼리 공유)
+
+    sqlite3 호출은 블로킹이므로 스레드에서 실행하고, 하나의 연결을 lock으로 보호합니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            # WAL: 여러 worker 프로세스가 읽는 동안에도 쓰기 가능
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS forecasts ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM forecasts WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def _set(self, key: str, blob: bytes, ttl: int):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO forecasts (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, blob, now + ttl),
+            )
+            self._conn.execute("DELETE FROM forecasts WHERE expires_at <= ?", (now,))
+
+    async def get(self, key: str):
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, blob: bytes, ttl: int):
+        await asyncio.to_thread(self._set, key, blob, ttl)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisForecastStore:
+    """
+    Redis 호환 서버 저장소 (모든 replica가 공유)
+
+    client를 주지 않으면 redis 패키지(redis.asyncio)로 url에 연결합니다.
+    client는 get(key), set(key, value, ex=초)를 지원하는 비동기 클라이언트입니다.
+    """
+
+    def __init__(self, url: str = None, client=None):
+        if client is None:
+            # FORECAST_STORE=redis일 때만 필요한 선택 의존성
+            import redis.asyncio as redis
+
+            client = redis.from_url(url)
+        self.client = client
+
+    async def get(self, key: str):
+        return await self.client.get(key)
+
+    async def set(self, key: str, blob: bytes, ttl: int):
+        await self.client.set(key, blob, ex=ttl)
+
+    async def close(self):
+        # aclose는 redis-py 5.0.1부터 제공 (이전 클라이언트는 close)
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
+
+
+def create_store(backend: str):
+    """설정된 backend(memory, sqlite, redis)의 저장소 생성"""
+    if backend == 'memory':
+        return MemoryForecastStore()
+    if backend == 'sqlite':
+        return SQLiteForecastStore(FORECAST_STORE_CONFIG['sqlite_path'])
+    if backend == 'redis':
+        return RedisForecastStore(FORECAST_STORE_CONFIG['redis_url'])
+    raise ValueError(f"지원하지 않는 예측 저장소: {backend}")
+
+
+def get_store():
+    """공유 예측 저장소 반환 (없으면 설정에 따라 생성)"""
+    global _store
+
+    if _store is None:
+        _store = create_store(FORECAST_STORE_CONFIG['backend'])
+        logger.info(f"forecast_store - {FORECAST_STORE_CONFIG['backend']} 저장소 생성")
+    return _store
+
+
+async def close_store():
+    """공유 예측 저장소 종료 (서버 종료 시 호출)"""
+    global _store
+
+    if _store is not None:
+        await _store.close()
+        logger.info("forecast_store - 저장소 종료")
+    _store = None
+
+
+async def load_forecast(key: str):
+    """
+    저장된 예측을 (point, quantile, meta)로 반환 (없거나 만료되었으면 None)
+
+    저장소 오류는 예측을 막지 않도록 miss로 처리합니다.
+    """
+    try:
+        blob = await get_store().get(key)
+    except Exception as e:
+        metrics.increment("forecast_store.errors")
+        logger.warning(f"forecast_store - 조회 실패({type(e).__name__}): {e}")
+        return None
+    if blob is None:
+        metrics.increment("forecast_store.misses")
+        return None
+    metrics.increment("forecast_store.hits")
+    return decode_forecast(blob)
+
+
+async def save_forecast(key: str, point_forecast, quantile_forecast, meta: dict = None):
+    """예측을 float32 blob으로 저장 (저장소 오류는 기록만 하고 무시)"""
+    blob = encode_forecast(point_forecast, quantile_forecast, meta)
+    try:
+        await get_store().set(key, blob, FORECAST_STORE_CONFIG['ttl'])
+    except Exception as e:
+        metrics.increment("forecast_store.errors")
+        logger.warning(f"forecast_store - 저장 실패({type(e).__name__}): {e}")
+        return
+    metrics.increment("forecast_store.writes")
@@ -1,5 +1,5 @@
 from .config import get_logger
-from .services import service_forecast_energy_usage
+from .services import service_forecast_energy_usage, service_forecast_energy_usage_multi_horizon
 from datetime import datetime
 import json
 
@@ -54,4 +54,51 @@ def register_forecast_tools(mcp_server):
             return json.dumps({"error": f"날짜 형식 오류: {str(e)}. 올바른 형식: YYYY-MM-DD HH:MM:SS"}, ensure_ascii=False)
         except Exception as e:
             logger.error(f"Forecast error: {str(e)}", exc_info=True)
-            return str(e)
\ No newline at end of file
+            return str(e)
+
+    @mcp_server.tool(
+        name="forecast_energy_usage_multi_horizon",
+        description="같은 과거 데이터로 여러 예측 기간(예: 1시간, 1일, 1주)의 미래 전력량을 한 번에 예측합니다."
+    )
+    async def forecast_energy_usage_multi_horizon(start_date_time: str, end_date_time: str, building: str, horizons: list[int]) -> str:
+        """
+        같은 과거 데이터로 여러 예측 기간의 미래 전력량을 한 번에 예측합니다.
+        horizon마다 forecast_energy_usage를 호출하는 것보다 빠릅니다.
+
+        Args:
+        - start_date_time: 과거 데이터 시작 시간 (SQL Server 형식: YYYY-MM-DD HH:MM:SS)
+        - end_date_time: 과거 데이터 종료 시간 (SQL Server 형식: YYYY-MM-DD HH:MM:SS)
+        - building: 건물 이름
+        - horizons: 예측할 타임스텝 수 목록 (단위: 10분, 예: [6, 144, 1008])
+
+        Returns:
+        - JSON 형식의 예측 결과:
+        {
+            "meta": {
+                "building": "<건물명>",
+                "horizons": [<예측 타임스텝 수>, ...],
+                "data_points": <예측에 사용된 과거 관측치의 수>
+            },
+            "forecasts": {
+                "<예측 타임스텝 수>": {
+                    "point_forecast": [<예측값 1>, <예측값 2>, ...]
+                },
+                ...
+            }
+        }
+        """
+        try:
+            logger.info(f"Multi-horizon forecast called: {building}, {start_date_time} ~ {end_date_time}, horizons={horizons}")
+
+            start_dt = datetime.strptime(start_date_time, '%Y-%m-%d %H:%M:%S')
+            end_dt = datetime.strptime(end_date_time, '%Y-%m-%d %H:%M:%S')
+
+            result = await service_forecast_energy_usage_multi_horizon(start_dt, end_dt, building, horizons)
+            logger.info(f"forecast_energy_usage_multi_horizon result: {result}")
+            return result
+        except ValueError as e:
+            logger.error(f"Date parsing error: {str(e)}", exc_info=True)
+            return json.dumps({"error": f"날짜 형식 오류: {str(e)}. 올바른 형식: YYYY-MM-DD HH:MM:SS"}, ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"Multi-horizon forecast error: {str(e)}", exc_info=True)
+            return str(e)
@@ -0,0 +1,128 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import torch
+from .config import INFERENCE_CONFIG, get_logger
+from . import metrics
+
+logger = get_logger(__name__)
+
+# 예측 전용 executor (첫 요청 시 생성, 서버 종료 시 shutdown_executor로 정리)
+_executor = None
+_executor_lock = threading.Lock()
+_slot_counter = None
+
+# 대기 중(제출되었지만 아직 시작하지 않은) 작업 수
+_queued = 0
+_queued_lock = threading.Lock()
+
+
+def _available_cores() -> list:
+    """현재 프로세스가 사용할 수 있는 CPU 코어 목록"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def slot_plan() -> list:
+    """
+    슬롯별 (torch 스레드 수, 고정할 코어 목록) 계획
+
+    threads_per_slot이 0이면 사용 가능한 코어를 슬롯 수로 나눕니다.
+    코어가 부족하면 코어 목록을 순환해 할당합니다.
+    """
+    cores = _available_cores()
+    slots = max(1, INFERENCE_CONFIG['slots'])
+    threads = INFERENCE_CONFIG['threads_per_slot'] or max(1, len(cores) // slots)
+    return [
+        (threads, [cores[(i * threads + j) % len(cores)] for j in range(threads)])
+        for i in range(slots)
+    ]
+
+
+def _init_worker():
+    """
+    worker 스레드 초기화: 슬롯의 스레드 수와 코어 고정을 적용
+
+    torch.set_num_threads와 sched_setaffinity(0, ...)는 호출한 스레드에만 적용되므로
+    슬롯마다 독립된 intra-op 스레드 예산을 가집니다.
+    """
+    slot = next(_slot_counter)
+    threads, cores = slot_plan()[slot]
+    torch.set_num_threads(threads)
+    if INFERENCE_CONFIG['pin_cores'] and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    logger.info(f"inference_executor - 슬롯 {slot} 시작 (스레드 {threads}, 코어 {cores if INFERENCE_CONFIG['pin_cores'] else '고정 안 함'})")
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """전용 추론 executor 반환 (없으면 새로 생성)"""
+    global _executor, _slot_counter
+
+    with _executor_lock:
+        if _executor is None:
+            _slot_counter = itertools.count()
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, INFERENCE_CONFIG['slots']),
+                thread_name_prefix="inference",
+                initializer=_init_worker,
+            )
+            logger.info(f"inference_executor - executor 생성 (슬롯 {INFERENCE_CONFIG['slots']})")
+        return _executor
+
+
+def shutdown_executor():
+    """전용 추론 executor 종료 (서버 종료 시 호출)"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+            logger.info("inference_executor - executor 종료")
+
+
+def _dequeue(state: dict):
+    """대기 중인 작업을 한 번만 대기열에서 제거 (실행 시작 또는 취소 시)"""
+    global _queued
+
+    with _queued_lock:
+        if state['queued']:
+            state['queued'] = False
+            _queued -= 1
+            metrics.set_gauge("inference.queue_depth", _queued)
+
+
+async def run_inference(func, *args):
+    """
+    CPU 집약적인 추론 함수를 전용 executor에서 실행 (asyncio.to_thread 대체)
+
+    동시에 실행되는 추론 수는 슬롯 수로 제한되고, 나머지는 대기열에서 기다립니다.
+
+    지표:
+    - inference.queue_depth: 대기 중인 작업 수
+    - inference.queue_wait: 제출부터 실행 시작까지 대기 시간
+    - inference.run: 실행 시간
+    """
+    global _queued
+
+    submitted = time.perf_counter()
+    state = {'queued': True}
+
+    def task():
+        _dequeue(state)
+        metrics.observe_latency("inference.queue_wait", time.perf_counter() - submitted)
+        with metrics.timer("inference.run"):
+            return func(*args)
+
+    with _queued_lock:
+        _queued += 1
+        metrics.set_gauge("inference.queue_depth", _queued)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_executor(), task)
+    finally:
+        # 시작 전에 취소된 작업은 실행되지 않으므로 여기서 대기열에서 제거
+        _dequeue(state)
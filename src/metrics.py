@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# 프로세스 내부 지표 저장소 (추론 스레드에서도 갱신되므로 lock으로 보호)
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_latencies = {}
+
+# 백분위 계산에 사용할 최근 샘플 수
+_LATENCY_WINDOW = 1024
+
+
+class LatencyStats:
+    """지연 시간 누적 통계 (전체 합계 + 최근 샘플 기반 백분위)"""
+
+    def __init__(self, window: int = _LATENCY_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def summary(self) -> dict:
+        samples_ms = np.array(self.samples) * 1000.0
+        p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99]) if len(samples_ms) else (0.0, 0.0, 0.0)
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000.0, 3) if self.count else 0.0,
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(self.max * 1000.0, 3),
+        }
+
+
+def increment(name: str, value: int = 1):
+    """카운터 증가"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value):
+    """게이지 값 설정 (마지막 값만 유지)"""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe_latency(name: str, seconds: float):
+    """지연 시간(초) 기록"""
+    with _lock:
+        if name not in _latencies:
+            _latencies[name] = LatencyStats()
+        _latencies[name].observe(seconds)
+
+
+@contextmanager
+def timer(name: str):
+    """with 블록의 실행 시간을 지연 시간 지표로 기록"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_latency(name, time.perf_counter() - start)
+
+
+def snapshot() -> dict:
+    """현재까지 수집된 모든 지표를 딕셔너리로 반환"""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "latencies": {name: stats.summary() for name, stats in _latencies.items()},
+        }
+
+
+def reset():
+    """모든 지표 초기화 (테스트용)"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _latencies.clear()
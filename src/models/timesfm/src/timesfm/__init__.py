@@ -27,3 +27,9 @@ try:
   TimesFM_2p5_200M_flax = timesfm_2p5_flax.TimesFM_2p5_200M_flax
 except ImportError:
   pass
+
+try:
+  from .timesfm_2p5 import timesfm_2p5_onnx
+  TimesFM_2p5_200M_onnx = timesfm_2p5_onnx.TimesFM_2p5_200M_onnx
+except ImportError:
+  pass
@@ -46,6 +46,28 @@ class ForecastConfig:
       input is nonnegative.
     fix_quantile_crossing: Whether to fix quantile crossing.
     return_backcast: Whether to return backcast.
+    precision: The compute precision of the transformer stack. "bfloat16" runs
+      the tokenizer, transformer layers and output heads under bf16 autocast,
+      while RevIN normalization and the running stats stay in float32.
+    kv_cache_dtype: The storage dtype of the decode caches. "bfloat16" or
+      "float16" halve the cache memory and the traffic of every AR step.
+      Attention over the cache runs in its storage dtype, with the queries
+      cast down and the outputs cast back to the compute dtype.
+    memory_budget_mb: The memory budget of one decode call in MiB. If positive,
+      each batch is as large as fits in the budget by the estimate of
+      `batch_planner`, instead of `per_core_batch_size` times the device count.
+    pack_inputs: Whether to pack the series of a batch side by side into shared
+      context rows, each with its own positions and attention block, so that
+      short series do not pay for the padding up to the longest one. Not
+      supported with `return_backcast`.
+    attention_block_size: If positive, attention runs in blocks of this many
+      patches with an online softmax, see
+      `transformer.chunked_dot_product_attention`, so that its memory grows
+      linearly with the context. If 0, the fused full attention is used.
+    attention_backend: The attention implementation when `attention_block_size`
+      is 0, a key of `transformer.ATTENTION_BACKENDS`. "auto" times them on the
+      host when compiling, see `transformer.benchmark_attention_backends`, and
+      uses the fastest correct one.
   """
 
   max_context: int = 0
@@ -58,6 +80,14 @@ class ForecastConfig:
   infer_is_positive: bool = True
   fix_quantile_crossing: bool = False
   return_backcast: bool = False
+  precision: Literal["float32", "bfloat16"] = "float32"
+  kv_cache_dtype: Literal["float32", "bfloat16", "float16"] = "float32"
+  memory_budget_mb: int = 0
+  pack_inputs: bool = False
+  attention_block_size: int = 0
+  attention_backend: Literal[
+    "auto", "sdpa", "sdpa_additive", "einsum"
+  ] = "sdpa"
 
 
 @dataclasses.dataclass(frozen=True)
@@ -15,12 +15,15 @@
 """TimesFM 2p5 base implementation."""
 
 import dataclasses
+import logging
+import math
 from typing import Any, Callable, Sequence
 
 import collections
 import numpy as np
 
 from .. import configs
+from . import batch_planner
 
 ResidualBlockConfig = configs.ResidualBlockConfig
 StackedTransformersConfig = configs.StackedTransformersConfig
@@ -138,11 +141,14 @@ class TimesFM_2p5:
     forecast_config: Configuration for forecasting flags.
     compiled_decode: Compiled decode function.
     global_batch_size: Global batch size.
+    trims_masked_patches: Whether the compiled decode drops the leading
+      patches masked in every row, so its cost follows the longest input.
   """
 
   forecast_config: ForecastConfig | None = None
   compiled_decode: Callable[..., Any] | None = None
   global_batch_size: int = 0
+  trims_masked_patches: bool = False
 
   def load_checkpoint(self, path: str):
     """Loads a TimesFM model from a checkpoint."""
@@ -152,6 +158,91 @@ class TimesFM_2p5:
     """Compiles the TimesFM model for fast decoding."""
     raise NotImplementedError()
 
+  def _validate_forecast_config(
+    self,
+    forecast_config: ForecastConfig,
+    definition: TimesFM_2p5_200M_Definition,
+  ) -> ForecastConfig:
+    """Checks the backend-independent flags of a forecast config.
+
+    Rounds max context and max horizon up to multiples of the input and output
+    patch lengths, and raises a ValueError for unsupported flags.
+
+    Args:
+      forecast_config: Configuration for forecasting flags.
+      definition: The definition of the compiled model.
+
+    Returns:
+      The forecast config with the rounded max context and max horizon.
+    """
+    fc = forecast_config
+    p, o = definition.input_patch_len, definition.output_patch_len
+    if fc.max_context % p != 0:
+      logging.info(
+        "When compiling, max context needs to be multiple of the patch size"
+        " %d. Using max context = %d instead.",
+        p,
+        new_context := math.ceil(fc.max_context / p) * p,
+      )
+      fc = dataclasses.replace(fc, max_context=new_context)
+    if fc.max_horizon % o != 0:
+      logging.info(
+        "When compiling, max horizon needs to be multiple of the output patch"
+        " size %d. Using max horizon = %d instead.",
+        o,
+        new_horizon := math.ceil(fc.max_horizon / o) * o,
+      )
+      fc = dataclasses.replace(fc, max_horizon=new_horizon)
+    if fc.max_context + fc.max_horizon > definition.context_limit:
+      raise ValueError(
+        "Context + horizon must be less than the context limit."
+        f" {fc.max_context} + {fc.max_horizon} >"
+        f" {definition.context_limit}."
+      )
+    if fc.use_continuous_quantile_head and (
+      fc.max_horizon > definition.output_quantile_len
+    ):
+      raise ValueError(
+        "Continuous quantile head is not supported for horizons >"
+        f" {definition.output_quantile_len}."
+      )
+    if fc.precision not in ("float32", "bfloat16"):
+      raise ValueError(f"Unsupported precision: {fc.precision}.")
+    if fc.kv_cache_dtype not in ("float32", "bfloat16", "float16"):
+      raise ValueError(f"Unsupported KV cache dtype: {fc.kv_cache_dtype}.")
+    if fc.memory_budget_mb < 0:
+      raise ValueError(f"Memory budget must be nonnegative: {fc.memory_budget_mb}.")
+    if fc.attention_block_size < 0:
+      raise ValueError(
+        f"Attention block size must be nonnegative: {fc.attention_block_size}."
+      )
+    if fc.pack_inputs and fc.return_backcast:
+      raise ValueError("Packed inputs are not supported with `return_backcast`.")
+    return fc
+
+  def warmup(self) -> None:
+    """Runs full batches through the compiled decode.
+
+    Inputs are decoded to max_horizon regardless of the requested horizon.
+    Backends that trim the padded patches run one batch per context bucket,
+    the only lengths their decode is ever called with, so later requests of
+    any length start warm.
+    """
+    if self.compiled_decode is None:
+      raise RuntimeError("Model is not compiled. Please call compile() first.")
+
+    context = self.forecast_config.max_context
+    lengths = [context]
+    if self.trims_masked_patches and not self.forecast_config.return_backcast:
+      lengths = batch_planner.context_buckets(
+        context, TimesFM_2p5_200M_Definition.input_patch_len
+      )[::-1]
+    for length in lengths:
+      self.forecast(
+        horizon=self.forecast_config.max_horizon,
+        inputs=[np.ones(length, dtype=np.float32)] * self.global_batch_size,
+      )
+
   def forecast(
     self, horizon: int, inputs: list[np.ndarray]
   ) -> tuple[np.ndarray, np.ndarray]:
@@ -162,39 +253,133 @@ class TimesFM_2p5:
     assert self.global_batch_size > 0
     assert self.forecast_config is not None
 
-    context = self.forecast_config.max_context
     num_inputs = len(inputs)
-    if (w := num_inputs % self.global_batch_size) != 0:
-      inputs += [np.array([0.0] * 3)] * (self.global_batch_size - w)
+    batch_size = self.plan_batch_size(inputs)
+    values, masks = self._assemble_batches(inputs, batch_size)
 
     output_points = []
     output_quantiles = []
-    values = []
-    masks = []
-    idx = 0
-    for each_input in inputs:
-      value = linear_interpolation(strip_leading_nans(np.array(each_input)))
-      if (w := len(value)) >= context:
-        value = value[-context:]
-        mask = np.zeros_like(value, dtype=bool)
-      else:
-        mask = np.array([True] * (context - w) + [False] * w)
-        value = np.pad(value, (context - w, 0), "constant", constant_values=0.0)
-      values.append(value)
-      masks.append(mask)
-      idx += 1
-      if idx == self.global_batch_size:
-        idx = 0
-        point_forecast, quantile_forecast = self.compiled_decode(horizon, values, masks)
-        output_points.append(point_forecast)
-        output_quantiles.append(quantile_forecast)
-        values = []
-        masks = []
+    for start in range(0, len(values), batch_size):
+      end = start + batch_size
+      point_forecast, quantile_forecast = self.compiled_decode(
+        horizon, values[start:end], masks[start:end]
+      )
+      output_points.append(point_forecast)
+      output_quantiles.append(quantile_forecast)
 
     output_points = np.concatenate(output_points, axis=0)
     output_quantiles = np.concatenate(output_quantiles, axis=0)
     return output_points[:num_inputs], output_quantiles[:num_inputs]
 
+  def forecast_multi_horizon(
+    self, horizons: Sequence[int], inputs: list[np.ndarray]
+  ) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+    """Forecasts the time series at several horizons with one decode.
+
+    The compiled decode always runs the prefill and the autoregressive loop to
+    max_horizon and the forecast at a shorter horizon is a prefix of it, so
+    one forecast at the longest horizon serves every requested horizon.
+
+    Args:
+      horizons: The numbers of time points to forecast.
+      inputs: The time series to forecast.
+
+    Returns:
+      A dict mapping each horizon to the (point_forecast, quantile_forecast)
+      that `forecast` returns for it.
+    """
+    if not horizons or min(horizons) <= 0:
+      raise ValueError(f"Horizons must be positive. Got {list(horizons)}.")
+
+    max_horizon = max(horizons)
+    point_forecast, quantile_forecast = self.forecast(
+      horizon=max_horizon, inputs=inputs
+    )
+    # Forecasts follow the backcast, if any.
+    offset = point_forecast.shape[1] - max_horizon
+    return {
+      horizon: (
+        point_forecast[:, : offset + horizon],
+        quantile_forecast[:, : offset + horizon],
+      )
+      for horizon in horizons
+    }
+
+  def decode_context(self, inputs: Sequence[np.ndarray]) -> int:
+    """Returns the context length the compiled decode runs the inputs at.
+
+    With trimmed masked patches this is the longest input rounded up to a
+    `batch_planner.context_bucket`, otherwise max_context.
+    """
+    fc = self.forecast_config
+    if not self.trims_masked_patches or fc.return_backcast or not inputs:
+      return fc.max_context
+    return batch_planner.context_bucket(
+      max(len(each_input) for each_input in inputs),
+      fc.max_context,
+      TimesFM_2p5_200M_Definition.input_patch_len,
+    )
+
+  def plan_batch_size(self, inputs: Sequence[np.ndarray]) -> int:
+    """Returns the number of rows per compiled decode call for the inputs.
+
+    Without a memory budget in the forecast config this is the global batch
+    size. Otherwise it is the largest batch whose estimated decode memory at
+    the `decode_context` of the inputs fits in the budget, and no more rows
+    than there are inputs.
+    """
+    fc = self.forecast_config
+    if fc.memory_budget_mb <= 0:
+      return self.global_batch_size
+    batch_size = batch_planner.plan_batch_size(
+      TimesFM_2p5_200M_Definition(),
+      fc,
+      fc.memory_budget_mb * 2**20,
+      self.decode_context(inputs),
+    )
+    return max(min(batch_size, len(inputs)), 1)
+
+  def _assemble_batches(
+    self, inputs: Sequence[np.ndarray], batch_size: int | None = None
+  ) -> tuple[np.ndarray, np.ndarray]:
+    """Left-pads or truncates the inputs into preallocated batch buffers.
+
+    Rows are padded up to a multiple of the batch size. The last
+    max_context points of each input are written in place. Only rows whose
+    window contains NaNs go through `strip_leading_nans` and
+    `linear_interpolation`, which may need points before the window. The
+    inputs are not modified.
+
+    Args:
+      inputs: The time series to forecast.
+      batch_size: The rows per batch. Defaults to the global batch size.
+
+    Returns:
+      A tuple (values, masks) of float32 and bool arrays of shape
+      (padded number of inputs, max_context). Masks are True on padding.
+    """
+    context = self.forecast_config.max_context
+    batch_size = batch_size or self.global_batch_size
+    num_rows = -(-len(inputs) // batch_size) * batch_size
+    values = np.zeros((num_rows, context), dtype=np.float32)
+    masks = np.ones((num_rows, context), dtype=bool)
+
+    def write_row(i, value):
+      value = value[-context:]
+      values[i, context - len(value) :] = value
+      masks[i, context - len(value) :] = False
+
+    for i, each_input in enumerate(inputs):
+      write_row(i, np.asarray(each_input))
+    # Padding rows hold three zeros, as if [0.0] * 3 was forecast.
+    masks[len(inputs) :, -3:] = False
+
+    for i in np.flatnonzero(np.isnan(values).any(axis=-1)):
+      values[i] = 0.0
+      masks[i] = True
+      write_row(i, linear_interpolation(strip_leading_nans(np.array(inputs[i]))))
+    return values, masks
+
   def forecast_with_covariates(
     self,
     inputs: list[Sequence[float]],
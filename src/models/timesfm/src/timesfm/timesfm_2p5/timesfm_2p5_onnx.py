@@ -0,0 +1,424 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""TimesFM 2.5 served with ONNX Runtime."""
+
+import json
+import logging
+import os
+
+import onnxruntime as ort
+import torch
+from torch import nn
+
+from .. import configs
+from ..torch import util
+from . import timesfm_2p5_base, timesfm_2p5_torch
+
+PREFILL_FILENAME = "prefill.onnx"
+AR_STEP_FILENAME = "ar_step.onnx"
+METADATA_FILENAME = "metadata.json"
+
+
+def _cache_names(num_layers: int) -> list[str]:
+  return [f"key_cache_{i}" for i in range(num_layers)] + [
+    f"value_cache_{i}" for i in range(num_layers)
+  ]
+
+
+class _PrefillGraph(nn.Module):
+  """Prefill: patched context -> last patch outputs and a filled decode cache."""
+
+  def __init__(self, model: timesfm_2p5_torch.TimesFM_2p5_200M_torch_module, cache_size: int):
+    super().__init__()
+    self.model = model
+    self.cache_size = cache_size
+
+  def forward(self, inputs: torch.Tensor, masks: torch.Tensor):
+    batch_size = inputs.shape[0]
+    decode_caches = [
+      util.DecodeCache(
+        next_index=torch.zeros(batch_size, dtype=torch.int32, device=inputs.device),
+        num_masked=torch.zeros(batch_size, dtype=torch.int32, device=inputs.device),
+        key=torch.zeros(
+          batch_size, self.cache_size, self.model.h, self.model.hd, device=inputs.device
+        ),
+        value=torch.zeros(
+          batch_size, self.cache_size, self.model.h, self.model.hd, device=inputs.device
+        ),
+      )
+      for _ in range(self.model.x)
+    ]
+    # Calls forward directly to bypass the torch.compile wrapper, if any. The
+    # forecast only needs the heads of the last patch, see `compile`. The
+    # prefill attends over its own keys only.
+    (_, _, output_ts, output_quantile_spread), decode_caches = self.model.forward(
+      inputs,
+      masks,
+      decode_caches,
+      output_positions=slice(-1, None),
+      kv_length=inputs.shape[1],
+    )
+    return (
+      output_ts,
+      output_quantile_spread,
+      decode_caches[0].next_index,
+      decode_caches[0].num_masked,
+      *[c.key for c in decode_caches],
+      *[c.value for c in decode_caches],
+    )
+
+
+class _ARStepGraph(nn.Module):
+  """One AR step: new patches and the decode cache -> outputs and the cache."""
+
+  def __init__(self, model: timesfm_2p5_torch.TimesFM_2p5_200M_torch_module):
+    super().__init__()
+    self.model = model
+
+  def forward(self, inputs, masks, next_index, num_masked, *kv_caches):
+    decode_caches = [
+      util.DecodeCache(
+        next_index=next_index,
+        num_masked=num_masked,
+        key=kv_caches[i],
+        value=kv_caches[self.model.x + i],
+      )
+      for i in range(self.model.x)
+    ]
+    # Only the last patch's point output is needed in AR steps.
+    (_, _, output_ts, _), decode_caches = self.model.forward(
+      inputs,
+      masks,
+      decode_caches,
+      output_positions=slice(-1, None),
+      compute_quantile_spread=False,
+    )
+    return (
+      output_ts,
+      decode_caches[0].next_index,
+      decode_caches[0].num_masked,
+      *[c.key for c in decode_caches],
+      *[c.value for c in decode_caches],
+    )
+
+
+def export(model: timesfm_2p5_torch.TimesFM_2p5_200M_torch, output_dir: str) -> None:
+  """Exports the prefill and AR step graphs of a compiled torch model.
+
+  The graphs are exported for the batch size, max context and max horizon of
+  the model's forecast config, which `TimesFM_2p5_200M_onnx.compile` must then
+  match. The decode cache is an explicit input and output of the AR step graph.
+  Both graphs compute the output heads of the last patch only.
+
+  Args:
+    model: A torch model on which `compile` has been called.
+    output_dir: Directory for the graphs and their metadata.
+  """
+  if model.forecast_config is None:
+    raise RuntimeError("Model is not compiled. Please call compile() first.")
+  if model.model.quantization is not None:
+    raise ValueError(
+      f"Exporting a model quantized with {model.model.quantization} is not"
+      " supported."
+    )
+
+  fc = model.forecast_config
+  module = model.model
+  batch_size = model.global_batch_size
+  num_input_patches = fc.max_context // module.p
+  num_decode_steps = (fc.max_horizon - 1) // module.o
+  cache_size = num_input_patches + num_decode_steps * module.m
+  cache_names = _cache_names(module.x)
+  os.makedirs(output_dir, exist_ok=True)
+
+  with torch.no_grad():
+    logging.info("Exporting prefill graph to %s", output_dir)
+    torch.onnx.export(
+      _PrefillGraph(module, cache_size).eval(),
+      (
+        torch.zeros(batch_size, num_input_patches, module.p, device=module.device),
+        torch.zeros(
+          batch_size, num_input_patches, module.p, dtype=torch.bool, device=module.device
+        ),
+      ),
+      os.path.join(output_dir, PREFILL_FILENAME),
+      input_names=["inputs", "masks"],
+      output_names=[
+        "output_ts",
+        "output_quantile_spread",
+        "next_index",
+        "num_masked",
+        *cache_names,
+      ],
+      dynamo=True,
+    )
+
+    logging.info("Exporting AR step graph to %s", output_dir)
+    # Same dtypes as the prefill outputs.
+    # Every cache needs its own example tensor, aliased inputs are merged.
+    caches = [
+      torch.zeros(batch_size, cache_size, module.h, module.hd, device=module.device)
+      for _ in cache_names
+    ]
+    torch.onnx.export(
+      _ARStepGraph(module).eval(),
+      (
+        torch.zeros(batch_size, module.m, module.p, device=module.device),
+        torch.zeros(batch_size, module.m, module.p, dtype=torch.bool, device=module.device),
+        torch.full((batch_size,), num_input_patches, dtype=torch.int32, device=module.device),
+        torch.zeros(batch_size, dtype=torch.int32, device=module.device),
+        *caches,
+      ),
+      os.path.join(output_dir, AR_STEP_FILENAME),
+      input_names=["inputs", "masks", "next_index", "num_masked", *cache_names],
+      output_names=["output_ts", "next_index_out", "num_masked_out", *[
+        f"{name}_out" for name in cache_names
+      ]],
+      dynamo=True,
+    )
+
+  with open(os.path.join(output_dir, METADATA_FILENAME), "w") as f:
+    json.dump(
+      {
+        "batch_size": batch_size,
+        "max_context": fc.max_context,
+        "max_horizon": fc.max_horizon,
+        "cache_size": cache_size,
+      },
+      f,
+    )
+
+
+class TimesFM_2p5_200M_onnx_module:
+  """Runs the exported graphs behind the interface of the torch module."""
+
+  config = timesfm_2p5_base.TimesFM_2p5_200M_Definition()
+
+  def __init__(self, model_dir: str, intra_op_num_threads: int = 0):
+    # Names constants.
+    self.p = self.config.input_patch_len  # 32
+    self.o = self.config.output_patch_len  # 128
+    self.os = self.config.output_quantile_len  # 1024
+    self.m = self.o // self.p  # 4
+    self.x = self.config.stacked_transformers.num_layers  # 20
+    self.h = self.config.stacked_transformers.transformer.num_heads  # 16
+    self.md = self.config.stacked_transformers.transformer.model_dims  # 1280
+    self.hd = self.md // self.h  # 80
+    self.q = len(self.config.quantiles) + 1  # 10
+    self.aridx = self.config.decode_index  # 5
+
+    self.quantization = None
+    # The exported graphs have a fixed context length and the default attention.
+    self.trim_masked_patches = False
+    self.attention_backend = "sdpa"
+    self.device = torch.device("cpu")
+    self.device_count = 1
+
+    with open(os.path.join(model_dir, METADATA_FILENAME)) as f:
+      self.metadata = json.load(f)
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = intra_op_num_threads
+    options.inter_op_num_threads = 1
+    logging.info("Loading ONNX graphs from %s", model_dir)
+    self.prefill_session = ort.InferenceSession(
+      os.path.join(model_dir, PREFILL_FILENAME),
+      options,
+      providers=["CPUExecutionProvider"],
+    )
+    self.ar_step_session = ort.InferenceSession(
+      os.path.join(model_dir, AR_STEP_FILENAME),
+      options,
+      providers=["CPUExecutionProvider"],
+    )
+    self.cache_names = _cache_names(self.x)
+
+  def decode(
+    self,
+    horizon: int,
+    inputs,
+    masks,
+    precision: str = "float32",
+    return_backcast: bool = True,
+    kv_cache_dtype: str = "float32",
+    pack_inputs: bool = False,
+  ):
+    """Decodes the time series, see `timesfm_2p5_torch.run_decode`.
+
+    The decode loop (running stats, revin, AR feedback) is shared with the
+    torch module; only the forward pass runs in ONNX Runtime.
+    """
+    return timesfm_2p5_torch.run_decode(
+      self,
+      horizon,
+      inputs,
+      masks,
+      precision=precision,
+      return_backcast=return_backcast,
+      kv_cache_dtype=kv_cache_dtype,
+      pack_inputs=pack_inputs,
+    )
+
+  def __call__(
+    self,
+    inputs: torch.Tensor,
+    masks: torch.Tensor,
+    decode_caches: list[util.DecodeCache],
+    output_positions: slice | None = None,
+    compute_quantile_spread: bool = True,
+    kv_length: int | None = None,
+  ):
+    # The exported graphs fix the attended cache length.
+    del kv_length
+    if output_positions is None:
+      raise ValueError(
+        "The ONNX graphs compute the output heads of the last patch only."
+      )
+    if decode_caches[0].key.shape[1] != self.metadata["cache_size"]:
+      raise ValueError(
+        "Decode cache size does not match the exported graphs."
+        f" {decode_caches[0].key.shape[1]} != {self.metadata['cache_size']}."
+      )
+
+    if int(decode_caches[0].next_index[0]) == 0:
+      outputs = self.prefill_session.run(
+        None, {"inputs": inputs.numpy(), "masks": masks.numpy()}
+      )
+      output_ts, output_quantile_spread, next_index, num_masked, *kv_caches = outputs
+      output_quantile_spread = torch.from_numpy(output_quantile_spread)
+    else:
+      feeds = {
+        "inputs": inputs.numpy(),
+        "masks": masks.numpy(),
+        "next_index": decode_caches[0].next_index.numpy(),
+        "num_masked": decode_caches[0].num_masked.numpy(),
+      }
+      for i, c in enumerate(decode_caches):
+        feeds[self.cache_names[i]] = c.key.numpy()
+        feeds[self.cache_names[self.x + i]] = c.value.numpy()
+      output_ts, next_index, num_masked, *kv_caches = self.ar_step_session.run(
+        None, feeds
+      )
+      output_quantile_spread = None
+
+    next_index = torch.from_numpy(next_index)
+    num_masked = torch.from_numpy(num_masked)
+    new_decode_caches = [
+      util.DecodeCache(
+        next_index=next_index,
+        num_masked=num_masked,
+        key=torch.from_numpy(kv_caches[i]),
+        value=torch.from_numpy(kv_caches[self.x + i]),
+      )
+      for i in range(self.x)
+    ]
+    # The graphs compute the heads of the last patch only, which is the one
+    # the decode asks for.
+    output_ts = torch.from_numpy(output_ts)
+    if not compute_quantile_spread:
+      output_quantile_spread = None
+    return (
+      None,
+      None,
+      output_ts,
+      output_quantile_spread,
+    ), new_decode_caches
+
+
+class TimesFM_2p5_200M_onnx(timesfm_2p5_base.TimesFM_2p5):
+  """TimesFM 2.5 with 200M parameters served with ONNX Runtime on CPU.
+
+  Each graph holds its own copy of the weights, so the resident size is about
+  twice that of the torch model.
+  """
+
+  def __init__(self, model_dir: str, intra_op_num_threads: int = 0):
+    """Loads graphs written by `export`.
+
+    Args:
+      model_dir: Directory written by `export`.
+      intra_op_num_threads: ONNX Runtime intra-op threads. 0 uses all cores.
+    """
+    self.model = TimesFM_2p5_200M_onnx_module(model_dir, intra_op_num_threads)
+
+  def compile(self, forecast_config: configs.ForecastConfig, **kwargs) -> None:
+    """Compiles the model for fast decoding.
+
+    Pre- and post-processing are shared with the torch model, see
+    `timesfm_2p5_torch.make_compiled_decode`. The forecast config must match
+    the one the graphs were exported with.
+
+    Args:
+      forecast_config: Configuration for forecasting flags.
+      **kwargs: Unused.
+    """
+    del kwargs
+    if forecast_config.precision != "float32":
+      raise ValueError(
+        f"Precision {forecast_config.precision} is not supported by the ONNX"
+        " graphs, which are exported in float32."
+      )
+    if forecast_config.kv_cache_dtype != "float32":
+      raise ValueError(
+        f"KV cache dtype {forecast_config.kv_cache_dtype} is not supported by"
+        " the ONNX graphs, which are exported with float32 caches."
+      )
+    if forecast_config.memory_budget_mb > 0:
+      raise ValueError(
+        "Memory-budgeted batches are not supported by the ONNX graphs, which"
+        " are exported with a fixed batch size."
+      )
+    if forecast_config.attention_block_size > 0:
+      raise ValueError(
+        "Chunked attention is not supported by the ONNX graphs, which are"
+        " exported with full attention."
+      )
+    if forecast_config.attention_backend not in ("auto", "sdpa"):
+      raise ValueError(
+        f"Attention backend {forecast_config.attention_backend} is not supported"
+        " by the ONNX graphs, which are exported with the default attention."
+      )
+    if forecast_config.pack_inputs:
+      raise ValueError(
+        "Packed inputs are not supported by the ONNX graphs, which are exported"
+        " without attention mask and position inputs."
+      )
+    if forecast_config.return_backcast:
+      raise ValueError(
+        "Returning the backcast is not supported by the ONNX graphs, which are"
+        " exported with the output heads of the last patch only."
+      )
+    fc = self._validate_forecast_config(forecast_config, self.model.config)
+    global_batch_size = fc.per_core_batch_size * self.model.device_count
+    metadata = self.model.metadata
+    exported = (
+      metadata["batch_size"],
+      metadata["max_context"],
+      metadata["max_horizon"],
+    )
+    requested = (global_batch_size, fc.max_context, fc.max_horizon)
+    if exported != requested:
+      raise ValueError(
+        "(batch size, max context, max horizon) must match the exported graphs."
+        f" {requested} != {exported}."
+      )
+
+    self.global_batch_size = global_batch_size
+    self.forecast_config = fc
+    # The exported graphs fix the attention, so there is nothing to time.
+    self.attention_benchmark = None
+    self.compiled_decode = timesfm_2p5_torch.make_compiled_decode(self.model, fc)
@@ -13,9 +13,8 @@
 # limitations under the License.
 """TimesFM models."""
 
-import dataclasses
+import functools
 import logging
-import math
 import os
 from pathlib import Path
 from typing import Dict, Optional, Sequence, Union
@@ -27,8 +26,8 @@ from safetensors.torch import load_file, save_file
 from torch import nn
 
 from .. import configs
-from ..torch import dense, transformer, util
-from . import timesfm_2p5_base
+from ..torch import compile_cache, dense, quantization, transformer, util
+from . import batch_planner, timesfm_2p5_base
 
 revin = util.revin
 
@@ -68,6 +67,18 @@ class TimesFM_2p5_200M_torch_module(nn.Module):
       self.config.output_projection_quantiles
     )
 
+    # Quantization mode applied in load_checkpoint, if any.
+    self.quantization = None
+
+    # Whether decode accepts a context shorter than `max_context`, so that the
+    # leading patches masked in every row can be dropped before decoding.
+    self.trim_masked_patches = True
+
+    # Attention of every layer, see `set_attention_backend` and
+    # `set_attention_block_size`.
+    self.attention_backend = "sdpa"
+    self.attention_block_size = 0
+
     # Device.
     if torch.cuda.is_available():
       self.device = torch.device("cuda:0")
@@ -77,40 +88,132 @@ class TimesFM_2p5_200M_torch_module(nn.Module):
       self.device_count = 1
 
   def load_checkpoint(self, path: str, **kwargs):
-    """Loads a PyTorch TimesFM model from a checkpoint."""
+    """Loads a PyTorch TimesFM model from a checkpoint.
+
+    Args:
+      path: Path to the safetensors checkpoint.
+      **kwargs: Loading options. `torch_compile` (default True) compiles the
+        model. `compile_cache_dir` (default None) persists the compiled
+        artifacts in a directory shared across processes, see
+        `compile_cache.configure`. `quantization` (default None) quantizes the
+        linear layers, see `quantization.QUANTIZATION_MODES`.
+    """
     tensors = load_file(path)
     self.load_state_dict(tensors, strict=True)
     self.to(self.device)
     torch_compile = True
     if "torch_compile" in kwargs:
       torch_compile = kwargs["torch_compile"]
+    if kwargs.get("quantization"):
+      logging.info("Quantizing linear layers: %s", kwargs["quantization"])
+      quantization.quantize_linear_layers(self, kwargs["quantization"])
+      self.quantization = kwargs["quantization"]
     if torch_compile:
-      print("Compiling model...")
-      self = torch.compile(self)
+      if kwargs.get("compile_cache_dir"):
+        compile_cache.configure(kwargs["compile_cache_dir"])
+      logging.info("Compiling model...")
+      # Compiles in place; graphs are built lazily on the first forward.
+      self.compile()
 
     self.eval()
 
+  def set_attention_backend(self, name: str):
+    """Selects the full attention of every layer.
+
+    Args:
+      name: A key of `transformer.ATTENTION_BACKENDS`.
+    """
+    if name not in transformer.ATTENTION_BACKENDS:
+      raise ValueError(f"Unsupported attention backend: {name}.")
+    self.attention_backend = name
+    self._set_attention_fn()
+
+  def set_attention_block_size(self, block_size: int):
+    """Selects between chunked and full attention for every layer.
+
+    Args:
+      block_size: If positive, attention runs in blocks of this many patches,
+        see `transformer.chunked_dot_product_attention`. If 0, the backend of
+        `set_attention_backend` is used.
+    """
+    self.attention_block_size = block_size
+    self._set_attention_fn()
+
+  def _set_attention_fn(self):
+    if self.attention_block_size > 0:
+      attention_fn = functools.partial(
+        transformer.chunked_dot_product_attention,
+        block_size=self.attention_block_size,
+      )
+    else:
+      attention_fn = transformer.ATTENTION_BACKENDS[self.attention_backend]
+    for layer in self.stacked_xf:
+      layer.attn.attention_fn = attention_fn
+
   def forward(
     self,
     inputs: torch.Tensor,
     masks: torch.Tensor,
     decode_caches: list[util.DecodeCache] | None = None,
+    output_positions: slice | torch.Tensor | None = None,
+    compute_quantile_spread: bool = True,
+    attn_mask: torch.Tensor | None = None,
+    position: torch.Tensor | None = None,
+    kv_length: int | None = None,
   ):
+    """Runs the model on patched inputs.
+
+    Args:
+      inputs: The normalized patches of shape (b, n, p).
+      masks: The patch masks of shape (b, n, p).
+      decode_caches: The per-layer decode caches, if decoding.
+      output_positions: The patches whose output heads are computed, e.g.
+        `slice(-1, None)` for the last one, or per-row patch indices of shape
+        (b, k). All patches by default.
+      compute_quantile_spread: Whether to run the quantile head. If False, the
+        quantile spread is returned as None.
+      attn_mask: Overrides the attention mask built from the patch masks, e.g.
+        for packed series. Shape (b, 1, n, kv).
+      position: Overrides the rotary positions of the patches, shape (b, n).
+      kv_length: The number of leading decode cache slots attended over, see
+        `transformer.filled_kv_bucket`. The whole cache by default.
+    """
     tokenizer_inputs = torch.cat([inputs, masks.to(inputs.dtype)], dim=-1)
     input_embeddings = self.tokenizer(tokenizer_inputs)
 
     if decode_caches is None:
       decode_caches = [None] * self.x
 
+    # All layers share one attention mask.
+    patch_mask = masks[..., -1]
+    if attn_mask is None:
+      attn_mask = transformer.make_layer_attn_mask(
+        patch_mask, decode_caches[0], kv_length
+      )
+
     output_embeddings = input_embeddings
     new_decode_caches = []
     for i, layer in enumerate(self.stacked_xf):
       output_embeddings, new_cache = layer(
-        output_embeddings, masks[..., -1], decode_caches[i]
+        output_embeddings,
+        patch_mask,
+        decode_caches[i],
+        attn_mask,
+        position,
+        kv_length=kv_length,
       )
       new_decode_caches.append(new_cache)
+    if isinstance(output_positions, torch.Tensor):
+      output_embeddings = torch.take_along_dim(
+        output_embeddings, output_positions[..., None], dim=1
+      )
+    elif output_positions is not None:
+      output_embeddings = output_embeddings[:, output_positions]
     output_ts = self.output_projection_point(output_embeddings)
-    output_quantile_spread = self.output_projection_quantiles(output_embeddings)
+    if compute_quantile_spread:
+      output_quantile_spread = self.output_projection_quantiles(output_embeddings)
+    else:
+      output_quantile_spread = None
 
     return (
       input_embeddings,
@@ -119,111 +222,27 @@ class TimesFM_2p5_200M_torch_module(nn.Module):
       output_quantile_spread,
     ), new_decode_caches
 
-  def decode(self, horizon: int, inputs, masks):
-    """Decodes the time series."""
-
-    with torch.no_grad():
-      batch_size, context = inputs.shape[0], inputs.shape[1]
-      num_decode_steps = (horizon - 1) // self.o
-      num_input_patches = context // self.p
-      decode_cache_size = num_input_patches + num_decode_steps * self.m
-
-      # Prefill
-      patched_inputs = torch.reshape(inputs, (batch_size, -1, self.p))
-      patched_masks = torch.reshape(masks, (batch_size, -1, self.p))
-
-      # running stats
-      n = torch.zeros(batch_size, device=inputs.device)
-      mu = torch.zeros(batch_size, device=inputs.device)
-      sigma = torch.zeros(batch_size, device=inputs.device)
-      patch_mu = []
-      patch_sigma = []
-      for i in range(num_input_patches):
-        (n, mu, sigma), _ = util.update_running_stats(
-          n, mu, sigma, patched_inputs[:, i], patched_masks[:, i]
-        )
-        patch_mu.append(mu)
-        patch_sigma.append(sigma)
-      last_n, last_mu, last_sigma = n, mu, sigma
-      context_mu = torch.stack(patch_mu, dim=1)
-      context_sigma = torch.stack(patch_sigma, dim=1)
-
-      decode_caches = [
-        util.DecodeCache(
-          next_index=torch.zeros(batch_size, dtype=torch.int32, device=inputs.device),
-          num_masked=torch.zeros(batch_size, dtype=torch.int32, device=inputs.device),
-          key=torch.zeros(
-            batch_size,
-            decode_cache_size,
-            self.h,
-            self.hd,
-            device=inputs.device,
-          ),
-          value=torch.zeros(
-            batch_size,
-            decode_cache_size,
-            self.h,
-            self.hd,
-            device=inputs.device,
-          ),
-        )
-        for _ in range(self.x)
-      ]
-
-      normed_inputs = revin(patched_inputs, context_mu, context_sigma, reverse=False)
-      normed_inputs = torch.where(patched_masks, 0.0, normed_inputs)
-      (_, _, normed_outputs, normed_quantile_spread), decode_caches = self(
-        normed_inputs, patched_masks, decode_caches
-      )
-      renormed_outputs = torch.reshape(
-        revin(normed_outputs, context_mu, context_sigma, reverse=True),
-        (batch_size, -1, self.o, self.q),
-      )
-      renormed_quantile_spread = torch.reshape(
-        revin(normed_quantile_spread, context_mu, context_sigma, reverse=True),
-        (batch_size, -1, self.os, self.q),
-      )[:, -1, ...]
-
-      # Autogressive decode
-      ar_outputs = []
-      last_renormed_output = renormed_outputs[:, -1, :, self.aridx]
-
-      for _ in range(num_decode_steps):
-        new_patched_input = torch.reshape(
-          last_renormed_output, (batch_size, self.m, self.p)
-        )
-        new_mask = torch.zeros_like(new_patched_input, dtype=torch.bool)
-
-        n, mu, sigma = last_n, last_mu, last_sigma
-        new_mus, new_sigmas = [], []
-        for i in range(self.m):
-          (n, mu, sigma), _ = util.update_running_stats(
-            n, mu, sigma, new_patched_input[:, i], new_mask[:, i]
-          )
-          new_mus.append(mu)
-          new_sigmas.append(sigma)
-        last_n, last_mu, last_sigma = n, mu, sigma
-        new_mu = torch.stack(new_mus, dim=1)
-        new_sigma = torch.stack(new_sigmas, dim=1)
-
-        new_normed_input = revin(new_patched_input, new_mu, new_sigma, reverse=False)
-        (_, _, new_normed_output, _), decode_caches = self(
-          new_normed_input, new_mask, decode_caches
-        )
-
-        new_renormed_output = torch.reshape(
-          revin(new_normed_output, new_mu, new_sigma, reverse=True),
-          (batch_size, self.m, self.o, self.q),
-        )
-        ar_outputs.append(new_renormed_output[:, -1, ...])
-        last_renormed_output = new_renormed_output[:, -1, :, self.aridx]
-
-      if num_decode_steps > 0:
-        ar_renormed_outputs = torch.stack(ar_outputs, dim=1)
-      else:
-        ar_renormed_outputs = None
-
-    return renormed_outputs, renormed_quantile_spread, ar_renormed_outputs
+  def decode(
+    self,
+    horizon: int,
+    inputs,
+    masks,
+    precision: str = "float32",
+    return_backcast: bool = True,
+    kv_cache_dtype: str = "float32",
+    pack_inputs: bool = False,
+  ):
+    """Decodes the time series, see `run_decode`."""
+    return run_decode(
+      self,
+      horizon,
+      inputs,
+      masks,
+      precision=precision,
+      return_backcast=return_backcast,
+      kv_cache_dtype=kv_cache_dtype,
+      pack_inputs=pack_inputs,
+    )
 
   def forecast_naive(
     self, horizon: int, inputs: Sequence[np.ndarray]
@@ -253,7 +272,7 @@ class TimesFM_2p5_200M_torch_module(nn.Module):
         mask = torch.cat([torch.ones(len_front_mask, dtype=torch.bool), mask], dim=0)
       input_t = input_t[None, ...]
       mask = mask[None, ...]
-      t_pf, _, t_ar = self.decode(horizon, input_t, mask)
+      t_pf, _, t_ar = self.decode(horizon, input_t, mask, return_backcast=False)
       to_concat = [t_pf[:, -1, ...]]
       if t_ar is not None:
         to_concat.append(t_ar.reshape(1, -1, self.q))
@@ -263,11 +282,573 @@ class TimesFM_2p5_200M_torch_module(nn.Module):
     return outputs
 
 
+def run_decode(
+  module,
+  horizon: int,
+  inputs,
+  masks,
+  precision: str = "float32",
+  return_backcast: bool = True,
+  kv_cache_dtype: str = "float32",
+  pack_inputs: bool = False,
+):
+  """Decodes the time series with the forward pass of `module`.
+
+  Runs the prefill and the autoregressive loop around the forward, with the
+  running stats, revin and the feedback of each step's outputs. Shared by the
+  torch module and the ONNX module, which only runs the forward differently.
+
+  Args:
+    module: A `TimesFM_2p5_200M_torch_module`, or a module with its constants
+      whose call takes the same arguments as its forward.
+    horizon: The number of time points to decode.
+    inputs: The inputs of shape (b, context).
+    masks: The masks of shape (b, context).
+    precision: "float32" or "bfloat16". See `configs.ForecastConfig`.
+    return_backcast: Whether to return the prefill outputs of every context
+      patch. If False, the output heads only run on the last patch and the
+      prefill outputs have a single patch.
+    kv_cache_dtype: The storage dtype of the decode caches. See
+      `configs.ForecastConfig`.
+    pack_inputs: Whether to pack the series side by side into shared rows.
+      See `configs.ForecastConfig`. Requires `return_backcast=False`.
+  """
+  if pack_inputs and return_backcast:
+    raise ValueError("Packed inputs do not support returning the backcast.")
+
+  def autocast():
+    return torch.autocast(
+      device_type=inputs.device.type,
+      dtype=torch.bfloat16,
+      enabled=precision == "bfloat16",
+    )
+
+  with torch.no_grad():
+    batch_size, context = inputs.shape[0], inputs.shape[1]
+    num_decode_steps = (horizon - 1) // module.o
+    num_input_patches = context // module.p
+    decode_cache_size = num_input_patches + num_decode_steps * module.m
+
+    # Prefill
+    patched_inputs = torch.reshape(inputs, (batch_size, -1, module.p))
+    patched_masks = torch.reshape(masks, (batch_size, -1, module.p))
+
+    # running stats
+    n = torch.zeros(batch_size, device=inputs.device)
+    mu = torch.zeros(batch_size, device=inputs.device)
+    sigma = torch.zeros(batch_size, device=inputs.device)
+    context_n, context_mu, context_sigma = util.running_stats(
+      n, mu, sigma, patched_inputs, patched_masks
+    )
+    last_n, last_mu, last_sigma = (
+      context_n[:, -1],
+      context_mu[:, -1],
+      context_sigma[:, -1],
+    )
+
+    # Packed series keep their decode caches in the packed layout.
+    if pack_inputs:
+      model = _PackedSegments(module, patched_masks, num_decode_steps, kv_cache_dtype)
+      decode_caches = None
+    else:
+      model = module
+      decode_caches = [
+        util.DecodeCache(
+          next_index=torch.zeros(batch_size, dtype=torch.int32, device=inputs.device),
+          num_masked=torch.zeros(batch_size, dtype=torch.int32, device=inputs.device),
+          key=torch.zeros(
+            batch_size,
+            decode_cache_size,
+            module.h,
+            module.hd,
+            dtype=getattr(torch, kv_cache_dtype),
+            device=inputs.device,
+          ),
+          value=torch.zeros(
+            batch_size,
+            decode_cache_size,
+            module.h,
+            module.hd,
+            dtype=getattr(torch, kv_cache_dtype),
+            device=inputs.device,
+          ),
+        )
+        for _ in range(module.x)
+      ]
+
+    normed_inputs = revin(patched_inputs, context_mu, context_sigma, reverse=False)
+    normed_inputs = torch.where(patched_masks, 0.0, normed_inputs)
+    # The prefill attends over exactly its own keys, and each decode step
+    # over a power-of-two bucket of the filled cache slots.
+    filled = num_input_patches
+    # Only the last patch's quantile spread is used, and the point outputs of
+    # the other patches only for the backcast.
+    with autocast():
+      (_, _, normed_outputs, normed_quantile_spread), decode_caches = model(
+        normed_inputs,
+        patched_masks,
+        decode_caches,
+        output_positions=None if return_backcast else slice(-1, None),
+        kv_length=filled,
+      )
+    normed_outputs = normed_outputs.to(torch.float32)
+    normed_quantile_spread = normed_quantile_spread[:, -1:].to(torch.float32)
+    renormed_outputs = torch.reshape(
+      revin(
+        normed_outputs,
+        context_mu if return_backcast else context_mu[:, -1:],
+        context_sigma if return_backcast else context_sigma[:, -1:],
+        reverse=True,
+      ),
+      (batch_size, -1, module.o, module.q),
+    )
+    renormed_quantile_spread = torch.reshape(
+      revin(
+        normed_quantile_spread,
+        context_mu[:, -1:],
+        context_sigma[:, -1:],
+        reverse=True,
+      ),
+      (batch_size, module.os, module.q),
+    )
+
+    # Autogressive decode
+    ar_outputs = []
+    last_renormed_output = renormed_outputs[:, -1, :, module.aridx]
+
+    for _ in range(num_decode_steps):
+      new_patched_input = torch.reshape(
+        last_renormed_output, (batch_size, module.m, module.p)
+      )
+      new_mask = torch.zeros_like(new_patched_input, dtype=torch.bool)
+
+      new_n, new_mu, new_sigma = util.running_stats(
+        last_n, last_mu, last_sigma, new_patched_input, new_mask
+      )
+      last_n, last_mu, last_sigma = (
+        new_n[:, -1],
+        new_mu[:, -1],
+        new_sigma[:, -1],
+      )
+
+      new_normed_input = revin(new_patched_input, new_mu, new_sigma, reverse=False)
+      filled += module.m
+      # Only the last new patch's point output is used.
+      with autocast():
+        (_, _, new_normed_output, _), decode_caches = model(
+          new_normed_input,
+          new_mask,
+          decode_caches,
+          output_positions=slice(-1, None),
+          compute_quantile_spread=False,
+          kv_length=transformer.filled_kv_bucket(filled, decode_cache_size),
+        )
+      new_normed_output = new_normed_output.to(torch.float32)
+
+      new_renormed_output = torch.reshape(
+        revin(
+          new_normed_output, new_mu[:, -1:], new_sigma[:, -1:], reverse=True
+        ),
+        (batch_size, module.o, module.q),
+      )
+      ar_outputs.append(new_renormed_output)
+      last_renormed_output = new_renormed_output[:, :, module.aridx]
+
+    if num_decode_steps > 0:
+      ar_renormed_outputs = torch.stack(ar_outputs, dim=1)
+    else:
+      ar_renormed_outputs = None
+
+  return renormed_outputs, renormed_quantile_spread, ar_renormed_outputs
+
+
+def make_compiled_decode(module, fc: configs.ForecastConfig):
+  """Makes the decode function of `TimesFM_2p5.compiled_decode`.
+
+  Wraps `module.decode` with the pre- and post-processing of the forecast
+  config: input normalization, trimming of padded patches, flip invariance,
+  the continuous quantile head, quantile crossing fixes and positivity.
+
+  Args:
+    module: A `TimesFM_2p5_200M_torch_module`, or a module with its constants
+      and `decode`, e.g. the ONNX module.
+    fc: A forecast config checked by `TimesFM_2p5._validate_forecast_config`.
+
+  Returns:
+    A function of (horizon, inputs, masks) with numpy inputs and masks of
+    shape (b, context) returning the point and quantile forecasts.
+  """
+
+  def _compiled_decode(horizon, inputs, masks):
+    if horizon > fc.max_horizon:
+      raise ValueError(
+        f"Horizon must be less than the max horizon. {horizon} > {fc.max_horizon}."
+      )
+
+    # Shares memory with the batch buffers of `forecast`, which are not
+    # modified in place below.
+    inputs = torch.from_numpy(np.asarray(inputs, dtype=np.float32)).to(
+      module.device
+    )
+    masks = torch.from_numpy(np.asarray(masks, dtype=bool)).to(module.device)
+    batch_size = inputs.shape[0]
+
+    if fc.infer_is_positive:
+      is_positive = torch.all(inputs >= 0, dim=-1, keepdim=True)
+    else:
+      is_positive = None
+
+    if fc.normalize_inputs:
+      mu = torch.mean(inputs, dim=-1, keepdim=True)
+      sigma = torch.std(inputs, dim=-1, keepdim=True)
+      inputs = revin(inputs, mu, sigma, reverse=False)
+    else:
+      mu, sigma = None, None
+
+    # The backcast covers the whole context, so it needs every patch.
+    if module.trim_masked_patches and not fc.return_backcast:
+      inputs, masks = _trim_leading_masked_patches(inputs, masks, module.p)
+
+    pf_outputs, quantile_spreads, ar_outputs = module.decode(
+      fc.max_horizon,
+      inputs,
+      masks,
+      precision=fc.precision,
+      return_backcast=fc.return_backcast,
+      kv_cache_dtype=fc.kv_cache_dtype,
+      pack_inputs=fc.pack_inputs,
+    )
+    to_cat = [pf_outputs[:, -1, ...]]
+    if ar_outputs is not None:
+      to_cat.append(ar_outputs.reshape(batch_size, -1, module.q))
+    full_forecast = torch.cat(to_cat, dim=1)
+
+    def flip_quantile_fn(x):
+      return torch.cat([x[..., :1], torch.flip(x[..., 1:], dims=(-1,))], dim=-1)
+
+    if fc.force_flip_invariance:
+      flipped_pf_outputs, flipped_quantile_spreads, flipped_ar_outputs = (
+        module.decode(
+          fc.max_horizon,
+          -inputs,
+          masks,
+          precision=fc.precision,
+          return_backcast=fc.return_backcast,
+          kv_cache_dtype=fc.kv_cache_dtype,
+          pack_inputs=fc.pack_inputs,
+        )
+      )
+      flipped_quantile_spreads = flip_quantile_fn(flipped_quantile_spreads)
+      flipped_pf_outputs = flip_quantile_fn(flipped_pf_outputs)
+      to_cat = [flipped_pf_outputs[:, -1, ...]]
+      if flipped_ar_outputs is not None:
+        to_cat.append(flipped_ar_outputs.reshape(batch_size, -1, module.q))
+      flipped_full_forecast = torch.cat(to_cat, dim=1)
+      quantile_spreads = (quantile_spreads - flipped_quantile_spreads) / 2
+      pf_outputs = (pf_outputs - flipped_pf_outputs) / 2
+      full_forecast = (full_forecast - flipped_full_forecast) / 2
+
+    if fc.use_continuous_quantile_head:
+      full_forecast = _use_continuous_quantile_head_fn(
+        full_forecast, quantile_spreads, fc.max_horizon
+      )
+    full_forecast = full_forecast[:, :horizon, :]
+
+    if fc.return_backcast:
+      full_backcast = pf_outputs[:, :-1, : module.p, :].reshape(
+        batch_size, -1, module.q
+      )
+      full_forecast = torch.cat([full_backcast, full_forecast], dim=1)
+
+    if fc.fix_quantile_crossing:
+      full_forecast = _fix_quantile_crossing_fn(full_forecast)
+
+    if fc.normalize_inputs:
+      full_forecast = revin(full_forecast, mu, sigma, reverse=True)
+
+    if is_positive is not None:
+      full_forecast = torch.where(
+        is_positive[..., None],
+        torch.maximum(full_forecast, torch.zeros_like(full_forecast)),
+        full_forecast,
+      )
+
+    full_forecast = full_forecast.detach().cpu().numpy()
+    return full_forecast[..., 5], full_forecast
+
+  return _compiled_decode
+
+
+def _trim_leading_masked_patches(
+  inputs: torch.Tensor, masks: torch.Tensor, patch_len: int
+) -> tuple[torch.Tensor, torch.Tensor]:
+  """Drops the leading patches that are masked in every row.
+
+  Masked patches only count towards `num_masked`, which offsets the positions
+  of the remaining patches and hides the masked keys from attention, so the
+  forecasts are unchanged while the transformer runs on the longest series of
+  the batch only. The kept length is rounded up to a
+  `batch_planner.context_bucket`, so that the compiled decode only ever sees
+  a handful of shapes. A fully masked batch is returned as is.
+  """
+  batch_size, context = masks.shape
+  patch_masked = torch.all(
+    masks.reshape(batch_size, context // patch_len, patch_len), dim=(0, 2)
+  )
+  num_unmasked = context // patch_len - int(torch.argmin(patch_masked.to(torch.int32)))
+  kept = batch_planner.context_bucket(num_unmasked * patch_len, context, patch_len)
+  if kept >= context:
+    return inputs, masks
+  return inputs[:, -kept:], masks[:, -kept:]
+
+
+def _pack_rows(lengths: list[int], capacity: int) -> list[list[int]]:
+  """Packs segments into rows of at most `capacity` patches.
+
+  First-fit decreasing: the longest segments are placed first, each into the
+  first row with room left.
+
+  Returns:
+    The segment indices of each row, in placement order.
+  """
+  rows, room = [], []
+  for index in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+    for row, free in enumerate(room):
+      if lengths[index] <= free:
+        rows[row].append(index)
+        room[row] -= lengths[index]
+        break
+    else:
+      rows.append([index])
+      room.append(capacity - lengths[index])
+  return rows
+
+
+class _PackedSegments:
+  """Runs the module on series packed side by side into shared rows.
+
+  Stands in for the module in `decode`, taking and returning the patches of
+  each series, while the transformer runs on rows that hold several series.
+  The leading masked patches of every series are dropped, each series keeps
+  its own rotary positions, and a block-diagonal mask keeps the series from
+  attending to each other, so the outputs match the unpacked decode. The
+  autoregressive patches of each series are appended at the end of its row.
+
+  Only the output heads of the last patch of each series are computed.
+  """
+
+  def __init__(
+    self,
+    module: "TimesFM_2p5_200M_torch_module",
+    patched_masks: torch.Tensor,
+    num_decode_steps: int,
+    kv_cache_dtype: str,
+  ):
+    self.module = module
+    device = patched_masks.device
+    num_series, num_patches, _ = patched_masks.shape
+    m = module.m
+    # A fully masked series keeps its last patch so that it has an output.
+    lengths = torch.clamp(
+      num_patches - torch.sum(patched_masks[..., -1].to(torch.int32), dim=-1),
+      min=1,
+    ).tolist()
+    rows = _pack_rows(lengths, num_patches)
+    num_rows = len(rows)
+    row_len = max(sum(lengths[k] for k in row) for row in rows)
+    max_segments = max(len(row) for row in rows)
+
+    # Slots without a series read the zero patch appended after the inputs,
+    # and form their own segment -1.
+    prefill_index = np.full((num_rows, row_len), num_series * num_patches)
+    prefill_segment_ids = np.full((num_rows, row_len), -1)
+    prefill_position = np.zeros((num_rows, row_len), dtype=np.int64)
+    prefill_outputs = np.zeros((num_rows, max_segments), dtype=np.int64)
+    step_index = np.full((num_rows, max_segments * m), num_series * m)
+    step_segment_ids = np.full((num_rows, max_segments * m), -1)
+    step_position = np.zeros((num_rows, max_segments * m), dtype=np.int64)
+    step_outputs = np.arange(max_segments)[None, :].repeat(num_rows, 0) * m + m - 1
+    series_slot = np.zeros(num_series, dtype=np.int64)
+    for r, row in enumerate(rows):
+      offset = 0
+      for s, k in enumerate(row):
+        length = lengths[k]
+        prefill_index[r, offset : offset + length] = np.arange(
+          k * num_patches + num_patches - length, (k + 1) * num_patches
+        )
+        prefill_segment_ids[r, offset : offset + length] = k
+        prefill_position[r, offset : offset + length] = np.arange(length)
+        prefill_outputs[r, s] = offset + length - 1
+        step_index[r, s * m : (s + 1) * m] = np.arange(k * m, (k + 1) * m)
+        step_segment_ids[r, s * m : (s + 1) * m] = k
+        step_position[r, s * m : (s + 1) * m] = length + np.arange(m)
+        series_slot[k] = r * max_segments + s
+        offset += length
+
+    def to_tensor(array):
+      return torch.from_numpy(array).to(device)
+
+    self.prefill_index = to_tensor(prefill_index)
+    self.prefill_segment_ids = to_tensor(prefill_segment_ids)
+    self.prefill_position = to_tensor(prefill_position)
+    self.prefill_outputs = to_tensor(prefill_outputs)
+    self.step_index = to_tensor(step_index)
+    self.step_segment_ids = to_tensor(step_segment_ids)
+    self.step_position = to_tensor(step_position)
+    self.step_outputs = to_tensor(step_outputs)
+    self.series_slot = to_tensor(series_slot)
+    self.num_steps_taken = -1
+
+    # Keys span the whole cache; its unfilled slots form segment -2, which no
+    # query belongs to.
+    decode_cache_size = row_len + num_decode_steps * max_segments * m
+    self.kv_segment_ids = torch.full(
+      (num_rows, decode_cache_size), -2, dtype=torch.int64, device=device
+    )
+    self.kv_position = torch.zeros_like(self.kv_segment_ids)
+    self.kv_length = 0
+    self.decode_caches = [
+      util.DecodeCache(
+        next_index=torch.zeros(num_rows, dtype=torch.int32, device=device),
+        num_masked=torch.zeros(num_rows, dtype=torch.int32, device=device),
+        key=torch.zeros(
+          num_rows,
+          decode_cache_size,
+          module.h,
+          module.hd,
+          dtype=getattr(torch, kv_cache_dtype),
+          device=device,
+        ),
+        value=torch.zeros(
+          num_rows,
+          decode_cache_size,
+          module.h,
+          module.hd,
+          dtype=getattr(torch, kv_cache_dtype),
+          device=device,
+        ),
+      )
+      for _ in range(module.x)
+    ]
+
+  def __call__(
+    self,
+    inputs: torch.Tensor,
+    masks: torch.Tensor,
+    decode_caches=None,
+    output_positions: slice | None = None,
+    compute_quantile_spread: bool = True,
+    kv_length: int | None = None,
+  ):
+    """Runs the prefill on the first call and a decode step on later calls.
+
+    Takes the same arguments as the module's forward, with the per-series
+    inputs and masks of shape (b, n, p). The decode caches are held here, so
+    `decode_caches` is ignored and None is returned in their place, and the
+    outputs are always those of the last patch of each series. The attended
+    cache length is bucketed from the packed layout, so `kv_length` is ignored.
+    """
+    # Held here / always the last patch / from the packed layout.
+    del decode_caches, output_positions, kv_length
+    self.num_steps_taken += 1
+    if self.num_steps_taken == 0:
+      index, segment_ids = self.prefill_index, self.prefill_segment_ids
+      position, outputs = self.prefill_position, self.prefill_outputs
+    else:
+      index, segment_ids = self.step_index, self.step_segment_ids
+      position = self.step_position + (segment_ids >= 0) * (
+        (self.num_steps_taken - 1) * self.module.m
+      )
+      outputs = self.step_outputs
+
+    p = inputs.shape[-1]
+    packed_inputs = torch.cat(
+      [inputs.reshape(-1, p), inputs.new_zeros(1, p)], dim=0
+    )[index]
+    packed_masks = torch.cat(
+      [masks.reshape(-1, p), masks.new_ones(1, p)], dim=0
+    )[index]
+    kv_slots = slice(self.kv_length, self.kv_length + segment_ids.shape[1])
+    self.kv_segment_ids[:, kv_slots] = segment_ids
+    self.kv_position[:, kv_slots] = position
+    self.kv_length = kv_slots.stop
+    kv_length = transformer.filled_kv_bucket(
+      self.kv_length, self.kv_segment_ids.shape[1]
+    )
+    attn_mask = transformer.make_segment_attn_mask(
+      segment_ids,
+      position,
+      self.kv_segment_ids[:, :kv_length],
+      self.kv_position[:, :kv_length],
+    )
+
+    (_, _, output_ts, output_quantile_spread), self.decode_caches = self.module(
+      packed_inputs,
+      packed_masks,
+      self.decode_caches,
+      output_positions=outputs,
+      compute_quantile_spread=compute_quantile_spread,
+      attn_mask=attn_mask,
+      position=position,
+      kv_length=kv_length,
+    )
+
+    def unpack(packed):
+      return packed.reshape(-1, packed.shape[-1])[self.series_slot][:, None]
+
+    if output_quantile_spread is not None:
+      output_quantile_spread = unpack(output_quantile_spread)
+    return (None, None, unpack(output_ts), output_quantile_spread), None
+
+
+def _use_continuous_quantile_head_fn(
+  full_forecast: torch.Tensor, quantile_spreads: torch.Tensor, max_horizon: int
+) -> torch.Tensor:
+  """Uses continuous quantile head.
+
+  Shifts the median forecast by each quantile's spread from the median in one
+  broadcast. The mean (0) and the median (5) are kept.
+  """
+  median = full_forecast[:, :max_horizon, 5:6]
+  shifted = (
+    quantile_spreads[:, :max_horizon, :] - quantile_spreads[:, :max_horizon, 5:6]
+  ) + median
+  return torch.cat(
+    [
+      full_forecast[:, :max_horizon, :1],
+      shifted[..., 1:5],
+      median,
+      shifted[..., 6:],
+    ],
+    dim=-1,
+  )
+
+
+def _fix_quantile_crossing_fn(full_forecast: torch.Tensor) -> torch.Tensor:
+  """Fixes quantile crossing.
+
+  Running min (max) from the median outward makes the lower (upper) quantiles
+  monotone, equivalent to clamping each quantile to its inner neighbor in turn.
+  """
+  lower_quantiles = torch.flip(
+    torch.cummin(torch.flip(full_forecast[..., 1:6], dims=(-1,)), dim=-1).values,
+    dims=(-1,),
+  )
+  upper_quantiles = torch.cummax(full_forecast[..., 5:10], dim=-1).values
+  return torch.cat(
+    [full_forecast[..., :1], lower_quantiles, upper_quantiles[..., 1:]], dim=-1
+  )
+
+
 class TimesFM_2p5_200M_torch(timesfm_2p5_base.TimesFM_2p5, ModelHubMixin):
   """PyTorch implementation of TimesFM 2.5 with 200M parameters."""
 
   model: nn.Module = TimesFM_2p5_200M_torch_module()
 
+  @property
+  def trims_masked_patches(self) -> bool:
+    return self.model.trim_masked_patches
+
   @classmethod
   def _from_pretrained(
     cls,
@@ -346,127 +927,51 @@ class TimesFM_2p5_200M_torch(timesfm_2p5_base.TimesFM_2p5, ModelHubMixin):
     self.global_batch_size = (
       forecast_config.per_core_batch_size * self.model.device_count
     )
-
-    # Shortcut.
-    fc = forecast_config
-
-    if fc.max_context % self.model.p != 0:
-      logging.info(
-        "When compiling, max context needs to be multiple of the patch size"
-        " %d. Using max context = %d instead.",
-        self.model.p,
-        new_context := math.ceil(fc.max_context / self.model.p) * self.model.p,
-      )
-      fc = dataclasses.replace(fc, max_context=new_context)
-    if fc.max_horizon % self.model.o != 0:
-      logging.info(
-        "When compiling, max horizon needs to be multiple of the output patch"
-        " size %d. Using max horizon = %d instead.",
-        self.model.o,
-        new_horizon := math.ceil(fc.max_horizon / self.model.o) * self.model.o,
-      )
-      fc = dataclasses.replace(fc, max_horizon=new_horizon)
-    if fc.max_context + fc.max_horizon > self.model.config.context_limit:
-      raise ValueError(
-        "Context + horizon must be less than the context limit."
-        f" {fc.max_context} + {fc.max_horizon} >"
-        f" {self.model.config.context_limit}."
-      )
-    if fc.use_continuous_quantile_head and (fc.max_horizon > self.model.os):
+    fc = self._validate_forecast_config(forecast_config, self.model.config)
+    if (
+      fc.attention_backend != "auto"
+      and fc.attention_backend not in transformer.ATTENTION_BACKENDS
+    ):
+      raise ValueError(f"Unsupported attention backend: {fc.attention_backend}.")
+    if fc.precision != "float32" and self.model.quantization is not None:
       raise ValueError(
-        f"Continuous quantile head is not supported for horizons > {self.model.os}."
+        f"Precision {fc.precision} is not supported for a model quantized with"
+        f" {self.model.quantization}."
       )
     self.forecast_config = fc
-
-    def _compiled_decode(horizon, inputs, masks):
-      if horizon > fc.max_horizon:
-        raise ValueError(
-          f"Horizon must be less than the max horizon. {horizon} > {fc.max_horizon}."
-        )
-
-      inputs = (
-        torch.from_numpy(np.array(inputs)).to(self.model.device).to(torch.float32)
-      )
-      masks = torch.from_numpy(np.array(masks)).to(self.model.device).to(torch.bool)
-      batch_size = inputs.shape[0]
-
-      if fc.infer_is_positive:
-        is_positive = torch.all(inputs >= 0, dim=-1, keepdim=True)
-      else:
-        is_positive = None
-
-      if fc.normalize_inputs:
-        mu = torch.mean(inputs, dim=-1, keepdim=True)
-        sigma = torch.std(inputs, dim=-1, keepdim=True)
-        inputs = revin(inputs, mu, sigma, reverse=False)
+    self.model.set_attention_block_size(fc.attention_block_size)
+
+    # Timings of the attention backends on this host, if chosen by benchmark.
+    self.attention_benchmark = None
+    attention_backend = fc.attention_backend
+    if attention_backend == "auto":
+      # Times a decode of the longest context and horizon. Attention over
+      # the cache runs in its storage dtype if narrower.
+      if fc.kv_cache_dtype != "float32":
+        attention_dtype = getattr(torch, fc.kv_cache_dtype)
+      elif fc.precision == "bfloat16":
+        attention_dtype = torch.bfloat16
       else:
-        mu, sigma = None, None
-
-      pf_outputs, quantile_spreads, ar_outputs = self.model.decode(
-        forecast_config.max_horizon, inputs, masks
+        attention_dtype = torch.float32
+      self.attention_benchmark = transformer.benchmark_attention_backends(
+        fc.per_core_batch_size,
+        fc.max_context // self.model.p,
+        self.model.h,
+        self.model.hd,
+        num_decode_steps=(fc.max_horizon - 1) // self.model.o,
+        decode_patches=self.model.m,
+        device=self.model.device,
+        dtype=attention_dtype,
       )
-      to_cat = [pf_outputs[:, -1, ...]]
-      if ar_outputs is not None:
-        to_cat.append(ar_outputs.reshape(batch_size, -1, self.model.q))
-      full_forecast = torch.cat(to_cat, dim=1)
-
-      def flip_quantile_fn(x):
-        return torch.cat([x[..., :1], torch.flip(x[..., 1:], dims=(-1,))], dim=-1)
-
-      if fc.force_flip_invariance:
-        flipped_pf_outputs, flipped_quantile_spreads, flipped_ar_outputs = (
-          self.model.decode(forecast_config.max_horizon, -inputs, masks)
-        )
-        flipped_quantile_spreads = flip_quantile_fn(flipped_quantile_spreads)
-        flipped_pf_outputs = flip_quantile_fn(flipped_pf_outputs)
-        to_cat = [flipped_pf_outputs[:, -1, ...]]
-        if flipped_ar_outputs is not None:
-          to_cat.append(flipped_ar_outputs.reshape(batch_size, -1, self.model.q))
-        flipped_full_forecast = torch.cat(to_cat, dim=1)
-        quantile_spreads = (quantile_spreads - flipped_quantile_spreads) / 2
-        pf_outputs = (pf_outputs - flipped_pf_outputs) / 2
-        full_forecast = (full_forecast - flipped_full_forecast) / 2
-
-      if fc.use_continuous_quantile_head:
-        for quantile_index in [1, 2, 3, 4, 6, 7, 8, 9]:
-          full_forecast[:, :, quantile_index] = (
-            quantile_spreads[:, : fc.max_horizon, quantile_index]
-            - quantile_spreads[:, : fc.max_horizon, 5]
-            + full_forecast[:, : fc.max_horizon, 5]
-          )
-      full_forecast = full_forecast[:, :horizon, :]
-
-      if fc.return_backcast:
-        full_backcast = pf_outputs[:, :-1, : self.model.p, :].reshape(
-          batch_size, -1, self.model.q
-        )
-        full_forecast = torch.cat([full_backcast, full_forecast], dim=1)
-
-      if fc.fix_quantile_crossing:
-        for i in [4, 3, 2, 1]:
-          full_forecast[:, :, i] = torch.where(
-            full_forecast[:, :, i] < full_forecast[:, :, i + 1],
-            full_forecast[:, :, i],
-            full_forecast[:, :, i + 1],
-          )
-        for i in [6, 7, 8, 9]:
-          full_forecast[:, :, i] = torch.where(
-            full_forecast[:, :, i] > full_forecast[:, :, i - 1],
-            full_forecast[:, :, i],
-            full_forecast[:, :, i - 1],
-          )
-
-      if fc.normalize_inputs:
-        full_forecast = revin(full_forecast, mu, sigma, reverse=True)
-
-      if is_positive is not None:
-        full_forecast = torch.where(
-          is_positive[..., None],
-          torch.maximum(full_forecast, torch.zeros_like(full_forecast)),
-          full_forecast,
-        )
-
-      full_forecast = full_forecast.detach().cpu().numpy()
-      return full_forecast[..., 5], full_forecast
+      attention_backend = min(
+        (name for name, t in self.attention_benchmark.items() if t is not None),
+        key=self.attention_benchmark.get,
+      )
+      logging.info(
+        "Attention backend %s chosen by benchmark: %s",
+        attention_backend,
+        self.attention_benchmark,
+      )
+    self.model.set_attention_backend(attention_backend)
 
-    self.compiled_decode = _compiled_decode
+    self.compiled_decode = make_compiled_decode(self.model, fc)
@@ -0,0 +1,58 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persistent torch.compile artifact cache for TimesFM."""
+
+import logging
+import os
+
+from torch._functorch import config as functorch_config
+from torch._inductor import config as inductor_config
+
+# Inductor cache counters reported by cache_stats().
+_CACHE_COUNTERS = {
+  "inductor": ("fxgraph_cache_hit", "fxgraph_cache_miss"),
+  "aot_autograd": ("autograd_cache_hit", "autograd_cache_miss"),
+}
+
+
+def configure(cache_dir: str) -> None:
+  """Points the Inductor FX graph and AOTAutograd caches at `cache_dir`.
+
+  Must be called before the first compilation. Artifacts compiled by one
+  process (e.g. a build step) are then reused by every process that points at
+  the same directory, skipping Inductor code generation and C++ compilation.
+  Cache keys include the torch version and the hardware, so a stale directory
+  only costs misses.
+
+  Args:
+    cache_dir: Directory holding the compiled artifacts. Created if missing.
+  """
+  cache_dir = os.path.abspath(cache_dir)
+  os.makedirs(cache_dir, exist_ok=True)
+  os.environ["TORCHINDUCTOR_CACHE_DIR"] = cache_dir
+  inductor_config.fx_graph_cache = True
+  functorch_config.enable_autograd_cache = True
+  logging.info("Using torch.compile cache directory: %s", cache_dir)
+
+
+def cache_stats() -> dict[str, int]:
+  """Returns the cache hit and miss counts of this process."""
+  from torch._dynamo.utils import counters
+
+  return {
+    name: counters[group][name]
+    for group, names in _CACHE_COUNTERS.items()
+    for name in names
+  }
@@ -0,0 +1,48 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Int8 weight quantization for TimesFM layers."""
+
+import torch
+from torch import nn
+
+# Supported quantization modes.
+#   int8_dynamic: int8 weights with dynamically quantized activations for every
+#     nn.Linear (CPU only).
+QUANTIZATION_MODES = ("int8_dynamic",)
+
+
+def quantize_linear_layers(module: nn.Module, mode: str) -> nn.Module:
+  """Quantizes all linear layers of a module in place.
+
+  This covers the transformer feedforward layers, the fused qkv and output
+  projections of attention, and the residual blocks of the tokenizer and
+  output heads.
+
+  Args:
+    module: The module to quantize. Must live on CPU.
+    mode: One of QUANTIZATION_MODES.
+
+  Returns:
+    The quantized module.
+  """
+  if mode not in QUANTIZATION_MODES:
+    raise ValueError(
+      f"Unsupported quantization mode: {mode}. Supported: {QUANTIZATION_MODES}."
+    )
+  if any(p.device.type != "cpu" for p in module.parameters()):
+    raise ValueError(f"Quantization mode {mode} is only supported on CPU.")
+  return torch.ao.quantization.quantize_dynamic(
+    module, {nn.Linear}, dtype=torch.qint8, inplace=True
+  )
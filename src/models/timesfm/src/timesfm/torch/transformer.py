@@ -14,7 +14,12 @@
 
 """Transformer layers for TimesFM."""
 
+import collections
 import math
+import statistics
+import threading
+import time
+import weakref
 from typing import Callable
 
 import torch
@@ -53,6 +58,114 @@ def make_attn_mask(
   )
 
 
+def make_segment_attn_mask(
+  q_segment_ids: torch.Tensor,
+  q_position: torch.Tensor,
+  kv_segment_ids: torch.Tensor,
+  kv_position: torch.Tensor,
+) -> torch.Tensor:
+  """Makes a block-diagonal causal mask for series packed into shared rows.
+
+  A query attends to the keys of its own segment at the same or earlier
+  positions within the segment, wherever they are in the row.
+
+  Args:
+    q_segment_ids: The segment of each query patch, shape (b, q).
+    q_position: The position of each query patch in its segment, shape (b, q).
+    kv_segment_ids: The segment of each key patch, shape (b, kv).
+    kv_position: The position of each key patch in its segment, shape (b, kv).
+
+  Returns:
+    A boolean mask of shape (b, 1, q, kv).
+  """
+  return torch.logical_and(
+    q_segment_ids[:, :, None] == kv_segment_ids[:, None, :],
+    q_position[:, :, None] >= kv_position[:, None, :],
+  )[:, None]
+
+
+def filled_kv_bucket(filled: int, cache_size: int) -> int:
+  """The number of leading decode cache slots to attend over.
+
+  Rounds the number of filled slots up to a power of two, capped at the cache
+  size, so that a decode step reads little more than the filled part of the
+  cache while its attention takes only a logarithmic number of shapes, each of
+  which is one compiled graph.
+
+  Args:
+    filled: The number of filled cache slots, including those written by the
+      current forward.
+    cache_size: The number of slots of the cache.
+  """
+  return min(cache_size, 1 << max(filled - 1, 0).bit_length())
+
+
+def make_layer_attn_mask(
+  patch_mask: torch.Tensor,
+  decode_cache: DecodeCache | None = None,
+  kv_length: int | None = None,
+) -> torch.Tensor:
+  """Makes the attention mask of one forward pass.
+
+  All layers of a stack see the same patch mask and cache state, so the mask
+  can be built once and shared. It must be built before any layer updates its
+  decode cache. With a decode cache, keys span the first `kv_length` slots of
+  the cache and the causal mask hides the unfilled ones, so no shape depends
+  on `next_index` and compiled graphs need no device sync as the cache fills.
+
+  Args:
+    patch_mask: The patch mask of shape (b, n_patches).
+    decode_cache: The decode cache of any layer, before it is updated.
+    kv_length: The number of leading cache slots attended over, which must
+      cover every slot filled after this forward, see `filled_kv_bucket`. The
+      whole cache by default.
+
+  Returns:
+    A boolean mask of shape (b, 1, n_patches, kv_length).
+  """
+  n_patches = patch_mask.shape[1]
+  num_masked = torch.sum(patch_mask, dim=-1, dtype=torch.int32)
+  if decode_cache is None:
+    return make_attn_mask(query_length=n_patches, num_all_masked_kv=num_masked)
+  return make_attn_mask(
+    query_length=n_patches,
+    num_all_masked_kv=num_masked + decode_cache.num_masked,
+    query_index_offset=decode_cache.next_index,
+    kv_length=kv_length or decode_cache.key.shape[1],
+  )
+
+
+# Sin/cos tables shared by every rotary embedding layer. Keyed by
+# (max positions, embedding dims, min timescale, max timescale, device, dtype).
+_ROTARY_TABLE_CACHE: dict[tuple, tuple[torch.Tensor, torch.Tensor]] = {}
+
+
+def _rotary_tables(
+  max_positions: int,
+  embedding_dims: int,
+  min_timescale: float,
+  max_timescale: float,
+  device: torch.device,
+  dtype: torch.dtype,
+) -> tuple[torch.Tensor, torch.Tensor]:
+  """Returns cached sin/cos tables for positions in [-max_positions, max_positions)."""
+  key = (max_positions, embedding_dims, min_timescale, max_timescale, device, dtype)
+  # Export traces with fake tensors, which must not leak into the cache.
+  if key not in _ROTARY_TABLE_CACHE or torch.compiler.is_exporting():
+    half_embedding_dim = embedding_dims // 2
+    fraction = 2 * torch.arange(0, half_embedding_dim, device=device) / embedding_dims
+    timescale = min_timescale * (max_timescale / min_timescale) ** fraction
+    position = torch.arange(
+      -max_positions, max_positions, dtype=torch.float32, device=device
+    )
+    sinusoid_inp = position[:, None] / timescale[None, :]
+    tables = (torch.sin(sinusoid_inp).to(dtype), torch.cos(sinusoid_inp).to(dtype))
+    if torch.compiler.is_exporting():
+      return tables
+    _ROTARY_TABLE_CACHE[key] = tables
+  return _ROTARY_TABLE_CACHE[key]
+
+
 class RotaryPositionalEmbedding(nn.Module):
   """Rotary positional embedding."""
 
@@ -67,44 +180,86 @@ class RotaryPositionalEmbedding(nn.Module):
     self.min_timescale = min_timescale
     self.max_timescale = max_timescale
 
+  def sin_cos(
+    self,
+    position: torch.Tensor,
+    dtype: torch.dtype = torch.float32,
+    max_positions: int | None = None,
+  ) -> tuple[torch.Tensor, torch.Tensor]:
+    """Gathers sin/cos of the given positions from the shared tables.
+
+    Args:
+      position: Integer positions of shape (b, n). May be negative.
+      dtype: The dtype of the returned tables.
+      max_positions: An upper bound on the absolute positions. Computed from
+        `position` (with a device sync) if not given.
+
+    Returns:
+      A tuple (sin, cos), each of shape (b, n, embedding_dims // 2).
+    """
+    if torch.compiler.is_compiling():
+      # The compiler fuses this into the graph. The shared tables would key a
+      # global dict on the sequence length, specializing the graph on it.
+      half_embedding_dim = self.embedding_dims // 2
+      fraction = (
+        2 * torch.arange(0, half_embedding_dim, device=position.device)
+        / self.embedding_dims
+      )
+      timescale = self.min_timescale * (
+        self.max_timescale / self.min_timescale
+      ) ** fraction
+      sinusoid_inp = position.to(torch.float32)[..., None] / timescale
+      return torch.sin(sinusoid_inp).to(dtype), torch.cos(sinusoid_inp).to(dtype)
+    if max_positions is None:
+      max_positions = int(position.abs().max().item()) + 1
+    # Round up so that only a handful of table sizes are ever built.
+    max_positions = 1 << max(max_positions - 1, 0).bit_length()
+    sin, cos = _rotary_tables(
+      max_positions,
+      self.embedding_dims,
+      self.min_timescale,
+      self.max_timescale,
+      position.device,
+      dtype,
+    )
+    index = position.to(torch.long) + max_positions
+    return sin[index], cos[index]
+
   def forward(
     self,
     inputs: torch.Tensor,
     position: torch.Tensor | None = None,
+    sin_cos: tuple[torch.Tensor, torch.Tensor] | None = None,
   ):
-    """Generates a JTensor of sinusoids with different frequencies."""
+    """Applies rotary embedding to the inputs.
+
+    Args:
+      inputs: Inputs of shape (b, n, d) or (b, n, h, d).
+      position: Positions of shape (b, n). Defaults to 0..n-1.
+      sin_cos: Precomputed output of `sin_cos`. Takes precedence over
+        `position`, so that query and key can share one lookup.
+
+    Returns:
+      The rotated inputs.
+    """
     if self.embedding_dims != inputs.shape[-1]:
       raise ValueError(
         "The embedding dims of the rotary position embedding"
         "must match the hidden dimension of the inputs."
       )
-    half_embedding_dim = self.embedding_dims // 2
-    fraction = (
-      2
-      * torch.arange(0, half_embedding_dim, device=inputs.device)
-      / self.embedding_dims
-    )
-    timescale = (
-      self.min_timescale * (self.max_timescale / self.min_timescale) ** fraction
-    ).to(inputs.device)
-    if position is None:
-      seq_length = inputs.shape[1]
-      position = torch.arange(seq_length, dtype=torch.float32, device=inputs.device)[
-        None, :
-      ]
+    if sin_cos is None:
+      if position is None:
+        seq_length = inputs.shape[1]
+        position = torch.arange(seq_length, device=inputs.device)[None, :]
+      sin_cos = self.sin_cos(position, dtype=inputs.dtype)
+    sin, cos = sin_cos
 
     if len(inputs.shape) == 4:
-      position = position[..., None, None]
-      timescale = timescale[None, None, None, :]
-    elif len(inputs.shape) == 3:
-      position = position[..., None]
-      timescale = timescale[None, None, :]
-    else:
+      sin = sin[..., None, :]
+      cos = cos[..., None, :]
+    elif len(inputs.shape) != 3:
       raise ValueError("Inputs must be of rank 3 or 4.")
 
-    sinusoid_inp = position / timescale
-    sin = torch.sin(sinusoid_inp)
-    cos = torch.cos(sinusoid_inp)
     first_half, second_half = torch.chunk(inputs, 2, dim=-1)
     first_part = first_half * cos - second_half * sin
     second_part = second_half * cos + first_half * sin
@@ -151,6 +306,244 @@ def _torch_dot_product_attention(query, key, value, mask=None):
   return output
 
 
+def chunked_dot_product_attention(query, key, value, mask=None, block_size=128):
+  """Computes the attention of `_dot_product_attention` in blocks.
+
+  Queries and keys are processed `block_size` patches at a time. Each query
+  block keeps a running max and softmax normalizer over the key blocks seen
+  so far (online softmax), so only (block_size, block_size) scores per head
+  are live at once and the memory grows linearly with the context instead of
+  quadratically. Queries whose keys are all masked return zeros, as with the
+  fused `_torch_dot_product_attention` used by default.
+
+  Args:
+    query: The queries of shape (b, q, h, d).
+    key: The keys of shape (b, kv, h, d).
+    value: The values of shape (b, kv, h, d).
+    mask: An optional boolean mask broadcastable to (b, h, q, kv).
+    block_size: The number of queries and keys per block.
+
+  Returns:
+    The attention outputs of shape (b, q, h, d).
+  """
+  q_length, kv_length = query.shape[1], key.shape[1]
+  masked_score = -torch.finfo(torch.float32).max / 2
+  outputs = []
+  for q_start in range(0, q_length, block_size):
+    q_end = min(q_start + block_size, q_length)
+    query_block = query[:, q_start:q_end]
+    running_max = None
+    for kv_start in range(0, kv_length, block_size):
+      kv_end = min(kv_start + block_size, kv_length)
+      # Softmax statistics are kept in float32 under autocast.
+      scores = torch.einsum(
+        "...qhd,...khd->...hqk", query_block, key[:, kv_start:kv_end]
+      ).to(torch.float32)
+      if mask is not None:
+        scores = torch.where(
+          mask[..., q_start:q_end, kv_start:kv_end], scores, masked_score
+        )
+      block_max = torch.amax(scores, dim=-1)
+      if running_max is None:
+        new_max = block_max
+      else:
+        new_max = torch.maximum(running_max, block_max)
+      probs = torch.exp(scores - new_max[..., None])
+      block_output = torch.einsum(
+        "...hqk,...khd->...hqd",
+        probs.to(value.dtype),
+        value[:, kv_start:kv_end],
+      ).to(torch.float32)
+      if running_max is None:
+        normalizer = torch.sum(probs, dim=-1)
+        output = block_output
+      else:
+        correction = torch.exp(running_max - new_max)
+        normalizer = normalizer * correction + torch.sum(probs, dim=-1)
+        output = output * correction[..., None] + block_output
+      running_max = new_max
+    output = torch.where(
+      running_max[..., None] > masked_score, output / normalizer[..., None], 0.0
+    )
+    outputs.append(output.permute(0, 2, 1, 3).to(query.dtype))
+  return torch.cat(outputs, dim=1)
+
+
+def additive_attn_mask(mask: torch.Tensor, dtype: torch.dtype) -> torch.Tensor:
+  """Converts a boolean attention mask to an additive one of `dtype`.
+
+  Masked scores get a large finite negative value rather than -inf, so a query
+  whose keys are all masked gets uniform weights instead of NaNs.
+  """
+  additive = torch.zeros(mask.shape, dtype=dtype, device=mask.device)
+  return additive.masked_fill_(~mask, torch.finfo(dtype).min / 2)
+
+
+# Additive forms of recently used boolean masks, keyed by the id of the mask.
+# All layers of a forward share one mask, so it is converted once per forward.
+# Entries hold their mask weakly and are dropped with it; the size bounds the
+# entries of concurrent forwards, e.g. inference threads sharing a model.
+_ADDITIVE_MASK_CACHE_SIZE = 8
+_ADDITIVE_MASK_CACHE: collections.OrderedDict[
+  int, tuple[weakref.ref, torch.Tensor]
+] = collections.OrderedDict()
+# Reentrant, as a mask may be collected, and its entry evicted, while held.
+_ADDITIVE_MASK_LOCK = threading.RLock()
+
+
+def _cached_additive_mask(mask: torch.Tensor, dtype: torch.dtype) -> torch.Tensor:
+  """Returns `additive_attn_mask(mask, dtype)`, converted once per mask."""
+  key = id(mask)
+  with _ADDITIVE_MASK_LOCK:
+    entry = _ADDITIVE_MASK_CACHE.get(key)
+    if entry is not None and entry[0]() is mask and entry[1].dtype == dtype:
+      _ADDITIVE_MASK_CACHE.move_to_end(key)
+      return entry[1]
+
+  additive = additive_attn_mask(mask, dtype)
+
+  def evict(ref):
+    with _ADDITIVE_MASK_LOCK:
+      entry = _ADDITIVE_MASK_CACHE.get(key)
+      if entry is not None and entry[0] is ref:
+        del _ADDITIVE_MASK_CACHE[key]
+
+  with _ADDITIVE_MASK_LOCK:
+    _ADDITIVE_MASK_CACHE[key] = (weakref.ref(mask, evict), additive)
+    _ADDITIVE_MASK_CACHE.move_to_end(key)
+    while len(_ADDITIVE_MASK_CACHE) > _ADDITIVE_MASK_CACHE_SIZE:
+      _ADDITIVE_MASK_CACHE.popitem(last=False)
+  return additive
+
+
+def _torch_additive_mask_attention(query, key, value, mask=None):
+  """`_torch_dot_product_attention` with the mask passed as an additive mask."""
+  if mask is not None and mask.dtype == torch.bool:
+    if torch.compiler.is_compiling():
+      mask = additive_attn_mask(mask, query.dtype)
+    else:
+      mask = _cached_additive_mask(mask, query.dtype)
+  return _torch_dot_product_attention(query, key, value, mask)
+
+
+# Attention implementations for the `attention_fn` of `MultiHeadAttention`.
+# All take (b, n, h, d) query, key and value and a boolean mask.
+ATTENTION_BACKENDS: dict[str, Callable[..., torch.Tensor]] = {
+  "sdpa": _torch_dot_product_attention,
+  "sdpa_additive": _torch_additive_mask_attention,
+  "einsum": _dot_product_attention,
+}
+
+
+def benchmark_attention_backends(
+  batch_size: int,
+  num_patches: int,
+  num_heads: int,
+  head_dim: int,
+  num_decode_steps: int = 0,
+  decode_patches: int = 1,
+  device: torch.device | str = "cpu",
+  dtype: torch.dtype = torch.float32,
+  repeats: int = 3,
+) -> dict[str, float | None]:
+  """Times the attention backends on the shapes of a decode.
+
+  A decode runs one prefill, whose queries and keys are the context patches,
+  and then autoregressive steps of a few queries over a power-of-two bucket of
+  the filled cache slots, see `filled_kv_bucket`. Every backend runs such a
+  decode once without padding and once with every other row's first half of
+  the context padded. Backends whose outputs for the unpadded queries differ
+  from the float32 einsum reference are not timed.
+
+  Args:
+    batch_size: The number of rows.
+    num_patches: The number of context patches.
+    num_heads: The number of attention heads.
+    head_dim: The dimension of each head.
+    num_decode_steps: The number of autoregressive steps after the prefill.
+    decode_patches: The number of patches each step appends to the cache.
+    device: The device to run on.
+    dtype: The dtype of the query, key and value.
+    repeats: The number of timed runs, of which the median is reported.
+
+  Returns:
+    The median seconds of the two decodes for each backend in
+    `ATTENTION_BACKENDS`, or None if the backend is incorrect.
+  """
+  cache_size = num_patches + num_decode_steps * decode_patches
+  generator = torch.Generator().manual_seed(0)
+  query, key, value = (
+    torch.randn(3, batch_size, cache_size, num_heads, head_dim, generator=generator)
+    .to(device=device, dtype=dtype)
+    .unbind(0)
+  )
+  no_padding = torch.zeros(batch_size, num_patches, dtype=torch.bool, device=device)
+  padding = no_padding.clone()
+  padding[1::2, : num_patches // 2] = True
+
+  # (query, key, value, mask, valid queries) of every attention call.
+  calls = []
+  for patch_mask in [no_padding, padding]:
+    num_masked = torch.sum(patch_mask, dim=-1, dtype=torch.int32)
+    calls.append((
+      query[:, :num_patches],
+      key[:, :num_patches],
+      value[:, :num_patches],
+      make_attn_mask(num_patches, num_masked),
+      ~patch_mask,
+    ))
+    filled = num_patches
+    for _ in range(num_decode_steps):
+      kv_length = filled_kv_bucket(filled + decode_patches, cache_size)
+      calls.append((
+        query[:, filled : filled + decode_patches],
+        key[:, :kv_length],
+        value[:, :kv_length],
+        make_attn_mask(
+          decode_patches,
+          num_masked,
+          query_index_offset=torch.full_like(num_masked, filled),
+          kv_length=kv_length,
+        ),
+        torch.ones(batch_size, decode_patches, dtype=torch.bool, device=device),
+      ))
+      filled += decode_patches
+
+  def synchronize():
+    if query.is_cuda:
+      torch.cuda.synchronize()
+
+  timings = {}
+  with torch.no_grad():
+    expected = [
+      _dot_product_attention(q.float(), k.float(), v.float(), mask)
+      for q, k, v, mask, _ in calls
+    ]
+    tolerance = 1e-3 if dtype == torch.float32 else 5e-2
+    for name, attention_fn in ATTENTION_BACKENDS.items():
+      if not all(
+        torch.allclose(
+          attention_fn(q, k, v, mask=mask)[valid].float(),
+          e[valid],
+          rtol=tolerance,
+          atol=tolerance,
+        )
+        for (q, k, v, mask, valid), e in zip(calls, expected)
+      ):
+        timings[name] = None
+        continue
+      elapsed = []
+      for _ in range(repeats):
+        synchronize()
+        start = time.perf_counter()
+        for q, k, v, mask, _ in calls:
+          attention_fn(q, k, v, mask=mask)
+        synchronize()
+        elapsed.append(time.perf_counter() - start)
+      timings[name] = statistics.median(elapsed)
+  return timings
+
+
 class PerDimScale(nn.Module):
   """Per-dimension scaling."""
 
@@ -227,10 +620,15 @@ class MultiHeadAttention(nn.Module):
     *,
     decode_cache: DecodeCache | None = None,
     patch_mask: torch.Tensor | None = None,
+    attn_mask: torch.Tensor | None = None,
+    position: torch.Tensor | None = None,
+    kv_length: int | None = None,
   ) -> tuple[torch.Tensor, DecodeCache | None]:
     b, n_patches, _ = inputs_q.shape
     if patch_mask is None:
       patch_mask = torch.zeros(b, n_patches, dtype=torch.bool, device=inputs_q.device)
+    if attn_mask is None:
+      attn_mask = make_layer_attn_mask(patch_mask, decode_cache, kv_length)
 
     if self.fuse_qkv:
       qkv = self.qkv_proj(inputs_q)
@@ -243,23 +641,32 @@ class MultiHeadAttention(nn.Module):
       key = self.key(inputs_q).view(b, n_patches, self.num_heads, self.head_dim)
       value = self.value(inputs_q).view(b, n_patches, self.num_heads, self.head_dim)
 
+    # int32 like the decode caches, so that cached and fresh calls share
+    # compiled graphs.
+    num_masked = torch.sum(patch_mask, dim=-1, dtype=torch.int32)
     if decode_cache is None:
-      num_masked = torch.sum(patch_mask.to(torch.int32), dim=-1)
-      next_index = torch.zeros_like(num_masked, dtype=torch.int32)
+      next_index = torch.zeros_like(num_masked)
     else:
-      num_masked = (
-        torch.sum(patch_mask.to(torch.int32), dim=-1) + decode_cache.num_masked
-      )
+      num_masked = num_masked + decode_cache.num_masked
       next_index = decode_cache.next_index.clone()
 
     if self.use_rotary_position_embeddings:
-      position = (
-        torch.arange(n_patches, device=inputs_q.device)[None, :]
-        + next_index[:, None]
-        - num_masked[:, None]
+      if position is None:
+        position = (
+          torch.arange(n_patches, device=inputs_q.device)[None, :]
+          + next_index[:, None]
+          - num_masked[:, None]
+        )
+      # Positions lie in (-max_positions, max_positions), so the bound needs
+      # no sync.
+      max_positions = n_patches
+      if decode_cache is not None:
+        max_positions += decode_cache.key.shape[1]
+      sin_cos = self.rotary_position_embedding.sin_cos(
+        position, dtype=query.dtype, max_positions=max_positions
       )
-      query = self.rotary_position_embedding(query, position)
-      key = self.rotary_position_embedding(key, position)
+      query = self.rotary_position_embedding(query, sin_cos=sin_cos)
+      key = self.rotary_position_embedding(key, sin_cos=sin_cos)
 
     query = self.query_ln(query)
     key = self.key_ln(key)
@@ -268,38 +675,44 @@ class MultiHeadAttention(nn.Module):
       query = self.per_dim_scale(query)
 
     if decode_cache is not None:
-      _, decode_cache_size, _, _ = decode_cache.value.shape
-
-      start = decode_cache.next_index[0]
-      end = start + n_patches
-
-      # Perform a single, vectorized slice assignment for the entire batch.
-      # This is vastly more efficient than a Python for-loop.
-
-      decode_cache.key[:, start:end] = key
-      decode_cache.value[:, start:end] = value
-
-      key = decode_cache.key
-      value = decode_cache.value
-      decode_cache.next_index += n_patches
-      decode_cache.num_masked = num_masked
-      attn_mask = make_attn_mask(
-        query_length=n_patches,
-        num_all_masked_kv=num_masked,
-        query_index_offset=next_index,
-        kv_length=decode_cache_size,
+      # The write position is read on the device, never as a host int, so the
+      # cache keeps one shape for the whole decode.
+      index = decode_cache.next_index[0] + torch.arange(
+        n_patches, device=inputs_q.device
       )
-    else:
-      attn_mask = make_attn_mask(query_length=n_patches, num_all_masked_kv=num_masked)
+      if torch.onnx.is_in_onnx_export():
+        # Exported graphs take the cache as inputs and return the updated
+        # cache as outputs, so write functionally.
+        decode_cache = DecodeCache(
+          next_index=decode_cache.next_index + n_patches,
+          num_masked=num_masked,
+          key=decode_cache.key.index_copy(1, index, key.to(decode_cache.key.dtype)),
+          value=decode_cache.value.index_copy(
+            1, index, value.to(decode_cache.value.dtype)
+          ),
+        )
+      else:
+        decode_cache.key.index_copy_(1, index, key.to(decode_cache.key.dtype))
+        decode_cache.value.index_copy_(1, index, value.to(decode_cache.value.dtype))
+        decode_cache.next_index += n_patches
+        decode_cache.num_masked = num_masked
+
+      # Attend over the leading slots that cover the filled ones, whose
+      # unfilled remainder the mask hides. Attention runs in the cache storage
+      # dtype, so a narrower cache is read as stored rather than upcast into a
+      # full-size copy in every layer and step; the few queries are cast down
+      # instead.
+      key = decode_cache.key[:, :kv_length]
+      value = decode_cache.value[:, :kv_length]
 
     x = self.attention_fn(
-      query,
+      query.to(key.dtype),
       key,
       value,
       mask=attn_mask,
     )
 
-    x = x.reshape(b, n_patches, self.in_features)
+    x = x.to(query.dtype).reshape(b, n_patches, self.in_features)
     out = self.out(x)
     return out, decode_cache
 
@@ -356,11 +769,17 @@ class Transformer(nn.Module):
     input_embeddings: torch.Tensor,
     patch_mask: torch.Tensor,
     decode_cache: DecodeCache | None = None,
+    attn_mask: torch.Tensor | None = None,
+    position: torch.Tensor | None = None,
+    kv_length: int | None = None,
   ) -> tuple[torch.Tensor, DecodeCache | None]:
     attn_output, decode_cache = self.attn(
       inputs_q=self.pre_attn_ln(input_embeddings),
       decode_cache=decode_cache,
       patch_mask=patch_mask,
+      attn_mask=attn_mask,
+      position=position,
+      kv_length=kv_length,
     )
     attn_output = self.post_attn_ln(attn_output) + input_embeddings
     output_embeddings = (
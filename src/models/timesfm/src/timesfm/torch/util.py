@@ -74,6 +74,64 @@ def update_running_stats(
   return (w := (new_n, new_mu, new_sigma), w)
 
 
+def running_stats(
+    n: torch.Tensor,
+    mu: torch.Tensor,
+    sigma: torch.Tensor,
+    x: torch.Tensor,
+    mask: torch.Tensor,
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+  """Computes the running stats after every patch with a parallel prefix scan.
+
+  This is equivalent to calling `update_running_stats` once per patch along
+  axis 1, but merges all patches with cumulative sums instead of a Python loop.
+  Patch means are shifted by the overall mean before accumulation to keep the
+  cumulative sums well conditioned.
+
+  Args:
+    n: The initial count, shape (b,).
+    mu: The initial mean, shape (b,).
+    sigma: The initial standard deviation, shape (b,).
+    x: The patched inputs, shape (b, num_patches, p).
+    mask: The patched masks, shape (b, num_patches, p).
+
+  Returns:
+    A tuple (n, mu, sigma) of the stats after each patch, each of shape
+    (b, num_patches).
+  """
+  is_legit = torch.logical_not(mask).to(x.dtype)
+  inc_n = torch.sum(is_legit, dim=-1)
+  inc_n_safe = torch.where(inc_n == 0, 1.0, inc_n)
+  inc_mu = torch.sum(x * is_legit, dim=-1) / inc_n_safe
+  inc_mu = torch.where(inc_n == 0, 0.0, inc_mu)
+  inc_m2 = torch.sum(((x - inc_mu.unsqueeze(-1)) ** 2) * is_legit, dim=-1)
+
+  total_n = n + torch.sum(inc_n, dim=-1)
+  shift = (n * mu + torch.sum(inc_n * inc_mu, dim=-1)) / torch.where(
+      total_n == 0, 1.0, total_n
+  )
+  init_delta = mu - shift
+  inc_delta = inc_mu - shift.unsqueeze(-1)
+
+  new_n = n.unsqueeze(-1) + torch.cumsum(inc_n, dim=-1)
+  sum_delta = (n * init_delta).unsqueeze(-1) + torch.cumsum(
+      inc_n * inc_delta, dim=-1
+  )
+  sum_delta_sq = (n * init_delta.pow(2)).unsqueeze(-1) + torch.cumsum(
+      inc_n * inc_delta.pow(2), dim=-1
+  )
+  sum_m2 = (n * sigma.pow(2)).unsqueeze(-1) + torch.cumsum(inc_m2, dim=-1)
+
+  new_n_safe = torch.where(new_n == 0, 1.0, new_n)
+  new_mu = shift.unsqueeze(-1) + sum_delta / new_n_safe
+  new_mu = torch.where(new_n == 0, 0.0, new_mu)
+  new_var = (sum_m2 + sum_delta_sq - sum_delta.pow(2) / new_n_safe) / new_n_safe
+  new_var = torch.where(new_n == 0, 0.0, new_var)
+  new_sigma = torch.sqrt(torch.clamp(new_var, min=0.0))
+
+  return new_n, new_mu, new_sigma
+
+
 def revin(
     x: torch.Tensor,
     mu: torch.Tensor,
@@ -0,0 +1,152 @@
+import asyncio
+import contextlib
+import random
+import time
+import aiohttp
+from .config import POWER_CONTROL_CONFIG, get_logger
+from . import metrics
+
+logger = get_logger(__name__)
+
+# 전력 제어 API용 공유 세션 (첫 요청 시 생성, 서버 종료 시 close_session으로 정리)
+_session = None
+_session_loop = None
+
+# 재시도 대상 HTTP 상태 코드 (일시적 과부하 / 게이트웨이 오류)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class PowerCommandError(Exception):
+    """
+    재시도 후에도 요청이 예외로 실패했음을 나타내는 예외 (원인 예외는 __cause__)
+
+    Attributes:
+    - attempts: 시도 횟수
+    - status_code: 마지막으로 받은 HTTP 상태 코드 (응답을 받은 적이 없으면 None)
+    """
+
+    def __init__(self, message: str, attempts: int, status_code: int = None):
+        super().__init__(message)
+        self.attempts = attempts
+        self.status_code = status_code
+
+
+def _create_session() -> aiohttp.ClientSession:
+    """keep-alive 커넥션 풀을 사용하는 ClientSession 생성"""
+    connector = aiohttp.TCPConnector(
+        limit=POWER_CONTROL_CONFIG['pool_limit'],
+        limit_per_host=POWER_CONTROL_CONFIG['pool_limit_per_host'],
+        keepalive_timeout=POWER_CONTROL_CONFIG['keepalive_timeout'],
+        ttl_dns_cache=POWER_CONTROL_CONFIG['dns_cache_ttl'],
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=POWER_CONTROL_CONFIG['total_timeout'],
+        connect=POWER_CONTROL_CONFIG['connect_timeout'],
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    공유 ClientSession 반환 (없거나 닫혔으면 새로 생성)
+
+    세션은 생성된 이벤트 루프에 묶이므로, 다른 루프에서 호출되면 새 세션을 만듭니다.
+    """
+    global _session, _session_loop
+
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        if _session is not None and not _session.closed:
+            logger.warning("power_control_client - 이벤트 루프가 변경되어 세션을 새로 생성합니다.")
+        _session = _create_session()
+        _session_loop = loop
+        metrics.increment("power_control.sessions_created")
+        logger.info("power_control_client - 새 HTTP 세션 생성")
+    return _session
+
+
+async def close_session():
+    """공유 ClientSession 종료 (서버 종료 시 호출)"""
+    global _session, _session_loop
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("power_control_client - HTTP 세션 종료")
+    _session = None
+    _session_loop = None
+
+
+async def post_power_command(url: str, payload: dict, headers: dict = None) -> tuple:
+    """
+    전력 제어 API에 POST 요청을 전송하고 (status_code, response_text)를 반환
+
+    Parameters:
+    - url: 전력 제어 API 주소
+    - payload: JSON 본문
+    - headers: 추가 HTTP 헤더
+
+    Raises:
+    - aiohttp.ClientError, asyncio.TimeoutError: 연결 또는 응답 실패
+    """
+    session = get_session()
+    start = time.perf_counter()
+    try:
+        async with session.post(url, json=payload, headers=headers) as response:
+            response_text = await response.text()
+            metrics.increment(f"power_control.status.{response.status}")
+            return response.status, response_text
+    except Exception:
+        metrics.increment("power_control.errors")
+        raise
+    finally:
+        metrics.observe_latency("power_control.request", time.perf_counter() - start)
+
+
+def _backoff_delay(attempt: int) -> float:
+    """지수 백오프 상한 내에서 무작위 대기 시간 선택 (full jitter)"""
+    cap = min(
+        POWER_CONTROL_CONFIG['retry_backoff_max'],
+        POWER_CONTROL_CONFIG['retry_backoff_base'] * (2 ** attempt),
+    )
+    return random.uniform(0, cap)
+
+
+async def post_power_command_with_retry(
+    url: str,
+    payload: dict,
+    headers: dict = None,
+    max_retries: int = None,
+    semaphore: asyncio.Semaphore = None,
+) -> tuple:
+    """
+    일시적 실패(연결 오류, 타임아웃, 429/5xx) 시 지터 백오프로 재시도하며 POST 요청 전송
+
+    동일한 헤더(Idempotency-Key 포함)로 재전송하므로 서버는 중복 요청을 식별할 수 있습니다.
+    semaphore는 각 시도의 요청 동안만 잡으므로, 백오프 대기 중에는 다른 요청이 슬롯을 사용합니다.
+
+    Returns:
+    - tuple: (status_code, response_text, attempts)
+
+    Raises:
+    - PowerCommandError: 마지막 시도가 예외(연결 오류, 타임아웃)로 실패한 경우
+    """
+    if max_retries is None:
+        max_retries = POWER_CONTROL_CONFIG['max_retries']
+
+    status_code = None
+    for attempt in range(max_retries + 1):
+        is_last = attempt == max_retries
+        try:
+            async with semaphore or contextlib.nullcontext():
+                status_code, response_text = await post_power_command(url, payload, headers)
+            if status_code not in RETRYABLE_STATUS_CODES or is_last:
+                return status_code, response_text, attempt + 1
+            logger.warning(f"power_control_client - HTTP {status_code}, 재시도 {attempt + 1}/{max_retries}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if is_last:
+                raise PowerCommandError(
+                    f"{type(e).__name__}: {e}", attempts=attempt + 1, status_code=status_code
+                ) from e
+            logger.warning(f"power_control_client - 요청 실패({type(e).__name__}), 재시도 {attempt + 1}/{max_retries}")
+        metrics.increment("power_control.retries")
+        await asyncio.sleep(_backoff_delay(attempt))
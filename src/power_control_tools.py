@@ -1,5 +1,5 @@
 from .config import get_logger
-from .services import service_control_power
+from .services import service_control_power, service_control_power_batch
 import json
 
 logger = get_logger(__name__)
@@ -43,3 +43,54 @@ def register_power_control_tools(mcp_server):
         except Exception as e:
             logger.error(f"control_power error: {str(e)}", exc_info=True)
             return json.dumps({"error": f"전력 제어 실패: {str(e)}"}, ensure_ascii=False)
+
+    @mcp_server.tool(
+        name="control_power_batch",
+        description="[CRITICAL] 여러 제어 대상에 전력 제어 명령을 한 번에 동시 전송합니다(수요 반응 부하 차단 등). 반드시 매번 이 도구를 직접 호출해야 합니다. 절대 이전 결과를 재사용하거나 캐시하지 마세요."
+    )
+    async def control_power_batch(commands: list[dict[str, str]]) -> str:
+        """
+        여러 제어 대상에 전력 제어 명령을 동시에 전송합니다.
+
+        Args:
+        - commands: 제어 명령 목록
+            [{"target": "<제어 대상>", "action": "<'on' 또는 'off'>"}, ...]
+
+        Returns:
+        - JSON 형식의 대상별 제어 결과:
+        {
+            "batch_id": "<배치 ID>",
+            "success": <전체 성공 여부>,
+            "summary": {"total": <대상 수>, "succeeded": <성공 수>, "failed": <실패 수>, "elapsed_ms": <소요 시간>},
+            "results": [
+                {"target": "<대상>", "action": "<명령>", "success": <성공 여부>, "attempts": <시도 횟수>, ...},
+                ...
+            ]
+        }
+        """
+        try:
+            logger.info(f"control_power_batch called: {len(commands)} commands")
+
+            # 명령 유효성 검증
+            if not commands:
+                return json.dumps({"error": "commands가 비어 있습니다."}, ensure_ascii=False)
+
+            targets = set()
+            for command in commands:
+                target = command.get("target")
+                if not target:
+                    return json.dumps({"error": "모든 명령에 target이 필요합니다."}, ensure_ascii=False)
+                if command.get("action") not in ['on', 'off']:
+                    return json.dumps({
+                        "error": f"'{target}'의 action이 유효하지 않습니다. 'on' 또는 'off'를 사용하세요."
+                    }, ensure_ascii=False)
+                if target in targets:
+                    return json.dumps({"error": f"'{target}' 대상이 중복되었습니다."}, ensure_ascii=False)
+                targets.add(target)
+
+            result = await service_control_power_batch(commands)
+            logger.info(f"control_power_batch result: {result}")
+            return result
+        except Exception as e:
+            logger.error(f"control_power_batch error: {str(e)}", exc_info=True)
+            return json.dumps({"error": f"전력 제어 실패: {str(e)}"}, ensure_ascii=False)
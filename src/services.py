@@ -1,16 +1,193 @@
 import datetime
+import functools
 import json
+import time
+import uuid
 import numpy as np
 import asyncio
 import aiohttp
+from cachetools import LRUCache
+from . import metrics
 from .database import execute_read_query
-from .config import get_logger, get_env
-from .forecast_model import forecasting, model
+from .power_control_client import PowerCommandError, post_power_command, post_power_command_with_retry
+from .inference_executor import run_inference
+from .config import get_logger, get_env, POWER_CONTROL_CONFIG, RANGE_CACHE_CONFIG, USAGE_INDEX_CONFIG
+from .forecast_model import MODEL_VERSION, forecasting, forecasting_multi_horizon, model
+from .forecast_store import forecast_key, load_forecast, save_forecast
+from .usage_index import get_usage_index
 from aiocache import cached
 
 
 logger = get_logger(__name__)
 
+# 진행 중인 호출 (키: 함수 이름과 인자 -> 결과를 계산하는 Task)
+_in_flight = {}
+
+
+def _single_flight_key(func, args, kwargs):
+    """함수 이름과 인자로 진행 중인 호출 키 생성 (list/dict 인자는 tuple로 변환)"""
+    def freeze(value):
+        if isinstance(value, list):
+            return tuple(freeze(v) for v in value)
+        if isinstance(value, dict):
+            return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+        return value
+    return (
+        func.__qualname__,
+        tuple(freeze(a) for a in args),
+        tuple(sorted((k, freeze(v)) for k, v in kwargs.items())),
+    )
+
+
+def single_flight(func):
+    """
+    동시에 들어온 같은 인자의 호출을 진행 중인 하나의 호출로 합치는 데코레이터
+
+    첫 호출만 실제로 계산하고, 계산이 끝나기 전에 들어온 같은 호출은 그 결과를 함께 기다립니다.
+    @cached는 첫 호출이 끝난 뒤에야 값을 저장하므로 동시에 몰린 요청을 막지 못합니다.
+    한 호출자가 취소되어도 다른 호출자가 기다리는 계산은 계속됩니다.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = _single_flight_key(func, args, kwargs)
+        task = _in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            _in_flight[key] = task
+            task.add_done_callback(lambda _: _in_flight.pop(key, None))
+        else:
+            metrics.increment("single_flight.coalesced")
+            metrics.increment(f"single_flight.coalesced.{func.__name__}")
+        return await asyncio.shield(task)
+    return wrapper
+
+# 데이터 수집 주기 (이 간격의 격자 시각에만 데이터가 적재됨)
+_INGESTION_INTERVAL = datetime.timedelta(minutes=RANGE_CACHE_CONFIG['ingestion_interval_minutes'])
+
+# 늦게 도착한 행이 아직 적재될 수 있는 구간 (사용량 인덱스가 다시 읽는 구간과 같음)
+_LATE_ROWS_WINDOW = datetime.timedelta(minutes=USAGE_INDEX_CONFIG['overlap_minutes'])
+
+# 끝난 구간의 조회 결과 (다시 바뀌지 않으므로 만료 없이 LRU 크기로만 제한)
+_historical_cache = LRUCache(maxsize=RANGE_CACHE_CONFIG['max_size'])
+
+# 아직 행이 적재될 수 있는 구간의 (구간의 행 상태, 조회 결과) (행 상태가 바뀌면 다시 조회)
+_live_cache = LRUCache(maxsize=RANGE_CACHE_CONFIG['max_size'])
+
+
+def _to_datetime(value) -> datetime.datetime:
+    """datetime 객체 또는 'YYYY-MM-DD HH:MM:SS' 문자열을 datetime으로 변환"""
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(str(value))
+
+
+def _floor_to_grid(value: datetime.datetime) -> datetime.datetime:
+    """수집 격자 시각으로 내림"""
+    midnight = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value - (value - midnight) % _INGESTION_INTERVAL
+
+
+def _current_tick() -> datetime.datetime:
+    """가장 최근 수집 시점"""
+    return _floor_to_grid(datetime.datetime.now())
+
+
+def _snap_range(start_date_time, end_date_time) -> tuple:
+    """
+    조회 구간을 수집 격자로 정규화하여 (start, end, live) 반환
+
+    격자 시각에만 데이터가 있으므로 시작은 올림, 종료는 내림해도 조회 결과가 같고,
+    아직 수집되지 않은 미래 구간은 현재 수집 시점으로 잘라도 결과가 같습니다.
+    live는 구간에 새로 수집되거나 늦게 도착한 행이 더 적재되어 결과가 바뀔 수 있는지 여부입니다.
+    """
+    start = _to_datetime(start_date_time)
+    floored = _floor_to_grid(start)
+    start = floored if floored == start else floored + _INGESTION_INTERVAL
+    end = _floor_to_grid(_to_datetime(end_date_time))
+    tick = _current_tick()
+    if end >= tick:
+        return start, tick, True
+    return start, end, end >= tick - _LATE_ROWS_WINDOW
+
+
+def _is_error_response(result) -> bool:
+    """서비스 응답이 에러({"error": ...})인지 여부 (JSON 객체로 읽을 수 없는 응답도 에러로 취급)"""
+    try:
+        parsed = json.loads(result)
+    except (TypeError, ValueError):
+        return True
+    return isinstance(parsed, dict) and "error" in parsed
+
+
+async def _probe_live_rows(start: datetime.datetime, end: datetime.datetime) -> tuple:
+    """
+    진행 중 구간에서 아직 바뀔 수 있는 부분의 (마지막 행 시각, 행 수)
+
+    늦게 도착한 행은 수집 시점에서 _LATE_ROWS_WINDOW 안의 시각에만 적재되므로,
+    구간 끝에서 그만큼 앞선 시점 이후만 세면 됩니다. (구간과 관계없이 최대 한 구간 분량의 행만 읽음)
+    """
+    query = """
+    SELECT
+        MAX(datetime) AS latest,
+        COUNT(*) AS num_rows
+    FROM electricity
+    WHERE datetime >= :since AND datetime <= :end_date_time
+    """
+    results = await execute_read_query(query, {
+        "since": max(start, end - _LATE_ROWS_WINDOW),
+        "end_date_time": end
+    })
+    if not results:
+        return None, 0
+    return results[0]["latest"], results[0]["num_rows"]
+
+
+def range_cache(func):
+    """
+    (start_date_time, end_date_time, ...) 기간 조회 결과를 격자로 정규화한 키로 캐시하는 데코레이터
+
+    끝난 구간은 만료 없이 LRU로 보관하고, 아직 행이 적재될 수 있는 구간은
+    구간 끝의 (마지막 행 시각, 행 수)를 가벼운 쿼리로 확인해 바뀌었을 때만 다시 조회합니다.
+    에러 응답은 캐시하지 않습니다.
+    """
+    @functools.wraps(func)
+    async def wrapper(start_date_time, end_date_time, *args, **kwargs):
+        try:
+            start, end, live = _snap_range(start_date_time, end_date_time)
+        except (TypeError, ValueError):
+            return await func(start_date_time, end_date_time, *args, **kwargs)
+
+        rows_state = None
+        if live:
+            try:
+                rows_state = await _probe_live_rows(start, end)
+            except Exception as e:
+                logger.warning(f"range_cache - 진행 중 구간 확인 실패, 캐시 없이 조회: {e}")
+                return await func(start_date_time, end_date_time, *args, **kwargs)
+            cache = _live_cache
+        else:
+            cache = _historical_cache
+
+        key = _single_flight_key(func, (start, end) + args, kwargs)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == rows_state:
+            metrics.increment("range_cache.hits")
+            return entry[1]
+        metrics.increment("range_cache.misses")
+
+        result = await func(start_date_time, end_date_time, *args, **kwargs)
+        if not _is_error_response(result):
+            cache[key] = (rows_state, result)
+        return result
+    return wrapper
+
+
+def clear_range_cache():
+    """기간 조회 캐시 비우기"""
+    _historical_cache.clear()
+    _live_cache.clear()
+
+
 class DateTimeEncoder(json.JSONEncoder):
     """datetime 객체를 JSON 직렬화 가능하게 변환하는 커스텀 인코더"""
     def default(self, obj):
@@ -23,6 +200,7 @@ def service_get_current_time() -> str:
     return datetime.datetime.now()
 
 @cached(ttl=3600)
+@single_flight
 async def service_get_monitored_buildings() -> str:
     """10분마다 누적 유효전력량(KWH)이 수집되는 건물들의 목록을 반환"""
     query = """
@@ -37,6 +215,7 @@ async def service_get_monitored_buildings() -> str:
     else:
         return json.dumps({"error": "데이터를 찾을 수 없습니다."}, ensure_ascii=False)
 
+@single_flight
 async def service_get_building_data_range(building: str) -> str:
     """electricity 테이블에서 지정된 건물의 datetime 최소(시작)/최대(종료) 값을 조회"""
 
@@ -57,6 +236,8 @@ async def service_get_building_data_range(building: str) -> str:
     else:
         return json.dumps({"error": f"'{building}'에 대한 데이터를 찾을 수 없습니다."}, ensure_ascii=False)
 
+@range_cache
+@single_flight
 async def service_get_energy_usages_range(start_date_time: datetime.datetime, end_date_time: datetime.datetime, building: str) -> str:
     """
     기간별 에너지 사용량 반환
@@ -96,10 +277,15 @@ async def service_get_energy_usages_range(start_date_time: datetime.datetime, en
         return json.dumps({"error": "해당 기간의 에너지 사용량 데이터를 조회할 수 없습니다."}, ensure_ascii=False)
 
 
+@range_cache
+@single_flight
 async def service_get_total_energy_usage(start_date_time: datetime.datetime, end_date_time: datetime.datetime, building: str) -> str:
     """
     특정 기간(start_date_time ~ end_date_time) 동안의 총 전력 사용량(kWh)을
-    누적값(datavalue)의 차이로 계산하여 반환합니다.
+    구간의 첫 시점과 마지막 시점 사이의 사용량(powerusage) 누적합 차이로 계산하여 반환합니다.
+
+    건물별 누적 인덱스(usage_index)에서 이진 탐색으로 계산하므로 구간 크기와 관계없이 DB를 다시 조회하지 않으며,
+    계량기 누적값(datavalue)의 리셋이나 rollover가 있어도 사용량이 맞게 계산됩니다.
 
     Args:
     - start_date_time: 시작 시간 (datetime 객체)
@@ -109,42 +295,242 @@ async def service_get_total_energy_usage(start_date_time: datetime.datetime, end
     Returns:
     - JSON 형식의 조회 결과
     """
+    index = get_usage_index()
+    await index.refresh([building])
+
+    calculated_usage = index.totals(building, [start_date_time], [end_date_time])[0]
+
+    if not np.isnan(calculated_usage):
+        response = {
+            "meta": {
+                "building": building
+            },
+            "total_usage_kwh": float(calculated_usage)
+        }
+        return json.dumps(response, ensure_ascii=False, indent=2)
+    else:
+        return json.dumps({"error": "해당 기간에 데이터를 찾을 수 없습니다."}, ensure_ascii=False)
+
+async def service_get_total_energy_usage_batch(queries: list) -> str:
+    """
+    여러 (건물, 기간)의 총 전력 사용량(kWh)을 한 번에 계산
+
+    건물별로 기간을 모아 누적 인덱스에서 벡터화된 이진 탐색 한 번으로 계산합니다.
+    (예: 한 학기 동안의 건물별 일일 사용량)
+
+    Args:
+    - queries: [{"building": <건물명>, "start_date_time": <시작 시간>, "end_date_time": <종료 시간>}, ...]
+
+    Returns:
+    - JSON 형식의 기간별 총 사용량과 요약 (데이터가 없는 기간의 total_usage_kwh는 null)
+    """
+    logger.info(f"service_get_total_energy_usage_batch 시작 - 기간 수: {len(queries)}")
+
+    positions_by_building = {}
+    for position, query in enumerate(queries):
+        positions_by_building.setdefault(query["building"], []).append(position)
+
+    index = get_usage_index()
+    await index.refresh(list(positions_by_building))
+
+    totals = np.full(len(queries), np.nan)
+
+    for building, positions in positions_by_building.items():
+        totals[positions] = index.totals(
+            building,
+            [queries[p]["start_date_time"] for p in positions],
+            [queries[p]["end_date_time"] for p in positions],
+        )
+
+    results = [
+        {
+            "building": query["building"],
+            "start_date_time": query["start_date_time"],
+            "end_date_time": query["end_date_time"],
+            "total_usage_kwh": None if np.isnan(total) else float(total),
+        }
+        for query, total in zip(queries, totals)
+    ]
+    found = int(np.count_nonzero(~np.isnan(totals)))
+
+    return json.dumps({
+        "summary": {
+            "total": len(results),
+            "found": found,
+            "missing": len(results) - found,
+        },
+        "results": results,
+    }, ensure_ascii=False, indent=2, cls=DateTimeEncoder)
+
+# get_energy_usage_by_period에서 지원하는 달력 구간 (PostgreSQL date_trunc 단위, week는 월요일 시작)
+ENERGY_USAGE_PERIODS = ('hour', 'day', 'week', 'month')
+
+@range_cache
+@single_flight
+async def service_get_energy_usage_by_period(start_date_time: datetime.datetime, end_date_time: datetime.datetime, buildings: list, period: str = 'day', intervals: list = None) -> str:
+    """
+    여러 건물의 구간별 총 전력 사용량(kWh)을 한 번의 쿼리로 계산
+
+    각 구간의 사용량은 get_total_energy_usage와 같이 구간의 첫 시점과 마지막 시점 사이의 사용량이며,
+    구간별 powerusage 합에서 첫 시점의 powerusage를 빼서 계산하므로 계량기 리셋의 영향을 받지 않습니다.
+    데이터가 없는 구간은 결과에서 빠집니다.
+
+    Args:
+    - start_date_time: 조회 시작 시간 (datetime 객체)
+    - end_date_time: 조회 종료 시간 (datetime 객체)
+    - buildings: 건물명 목록
+    - period: 'hour', 'day', 'week', 'month' (date_trunc 달력 구간) 또는 'custom'
+    - intervals: period가 'custom'일 때의 구간 목록 [{"start_date_time": ..., "end_date_time": ...}, ...]
+      (조회 시작/종료 시간 밖의 데이터는 포함하지 않음)
+
+    Returns:
+    - JSON 형식의 열(column) 단위 결과
+    """
+    if period == 'custom':
+        if not intervals:
+            return json.dumps({"error": "period가 'custom'이면 intervals가 필요합니다."}, ensure_ascii=False)
+        query = """
+        SELECT
+            e.building,
+            p.period_index,
+            COALESCE(SUM(e.powerusage), 0)
+                - COALESCE((ARRAY_AGG(e.powerusage ORDER BY e.datetime))[1], 0) AS total_usage_kwh,
+            COUNT(*) AS data_points
+        FROM unnest(CAST(:period_starts AS timestamp[]), CAST(:period_ends AS timestamp[]))
+            WITH ORDINALITY AS p(period_start, period_end, period_index)
+        JOIN electricity e
+            ON e.datetime >= p.period_start AND e.datetime <= p.period_end
+        WHERE e.building = ANY(CAST(:buildings AS text[]))
+          AND e.datetime >= :start_date_time
+          AND e.datetime <= :end_date_time
+        GROUP BY e.building, p.period_index
+        ORDER BY e.building, p.period_index
+        """
+        params = {
+            "period_starts": [_to_datetime(i["start_date_time"]) for i in intervals],
+            "period_ends": [_to_datetime(i["end_date_time"]) for i in intervals],
+        }
+    elif period in ENERGY_USAGE_PERIODS:
+        query = """
+        SELECT
+            building,
+            date_trunc(CAST(:period AS text), datetime) AS period_start,
+            COALESCE(SUM(powerusage), 0)
+                - COALESCE((ARRAY_AGG(powerusage ORDER BY datetime))[1], 0) AS total_usage_kwh,
+            COUNT(*) AS data_points
+        FROM electricity
+        WHERE building = ANY(CAST(:buildings AS text[]))
+          AND datetime >= :start_date_time
+          AND datetime <= :end_date_time
+        GROUP BY building, period_start
+        ORDER BY building, period_start
+        """
+        params = {"period": period}
+    else:
+        return json.dumps({"error": f"지원하지 않는 period입니다: {period}. {', '.join(ENERGY_USAGE_PERIODS)} 또는 custom을 사용하세요."}, ensure_ascii=False)
+
+    results = await execute_read_query(query, {
+        **params,
+        "buildings": list(buildings),
+        "start_date_time": start_date_time,
+        "end_date_time": end_date_time
+    })
 
+    if not results:
+        return json.dumps({"error": "해당 기간의 에너지 사용량 데이터를 조회할 수 없습니다."}, ensure_ascii=False)
+
+    columns = {"building": [r["building"] for r in results]}
+    if period == 'custom':
+        # ORDINALITY는 1부터 시작
+        columns["period_start"] = [intervals[r["period_index"] - 1]["start_date_time"] for r in results]
+        columns["period_end"] = [intervals[r["period_index"] - 1]["end_date_time"] for r in results]
+    else:
+        columns["period_start"] = [r["period_start"] for r in results]
+    columns["total_usage_kwh"] = [float(r["total_usage_kwh"]) for r in results]
+    columns["data_points"] = [int(r["data_points"]) for r in results]
+
+    response = {
+        "meta": {
+            "buildings": list(buildings),
+            "period": period,
+            "rows": len(results)
+        },
+        "columns": columns
+    }
+    return json.dumps(response, ensure_ascii=False, indent=2, cls=DateTimeEncoder)
+
+async def _fetch_forecast_inputs(start_date_time: datetime.datetime, end_date_time: datetime.datetime, building: str) -> list:
+    """예측 입력으로 사용할 건물의 과거 전력량을 시간순으로 조회"""
     query = """
     SELECT
-        MIN(datavalue) as start_accumulated_val,
-        MAX(datavalue) as end_accumulated_val
+        powerusage
     FROM electricity
-    WHERE building = :building
-      AND datetime >= :start_date_time
-      AND datetime <= :end_date_time
+    WHERE building = :building AND datetime >= :start_date_time AND datetime <= :end_date_time
+    ORDER BY datetime ASC
     """
 
-    results = await execute_read_query(query, {
+    return await execute_read_query(query, {
         "building": building,
         "start_date_time": start_date_time,
         "end_date_time": end_date_time
     })
 
-    if results and results[0].get('start_accumulated_val') is not None:
-        row = results[0]
+async def _load_or_forecast(start_date_time, end_date_time, building: str, horizons: list):
+    """
+    예측 저장소(forecast_store)에서 예측을 읽고, 없으면 과거 데이터를 조회해 예측한 뒤 저장
 
-        val_at_start = row['start_accumulated_val']
-        val_at_end = row['end_accumulated_val']
+    저장소 키에는 수집 격자로 정규화한 구간을 사용하므로, 같은 격자 구간을 가리키는 요청과
+    다른 worker, 재시작 후의 요청이 같은 예측을 공유합니다.
+    짧은 horizon의 예측은 가장 긴 horizon 예측의 앞부분이므로 가장 긴 horizon의 키로 조회하고,
+    저장소에 없으면 한 번의 디코딩(forecasting_multi_horizon)으로 예측해 horizon마다 저장합니다.
 
-        calculated_usage = abs(val_at_end - val_at_start)
+    Args:
+    - horizons: 오름차순으로 정렬된 예측할 타임스텝 수 목록
 
-        response = {
-            "meta": {
-                "building": building
-            },
-            "total_usage_kwh": calculated_usage
+    Returns:
+    - ({horizon: (point_forecast, quantile_forecast)}, data_points), 과거 데이터가 없으면 None
+    """
+    try:
+        snapped_start, snapped_end, _ = _snap_range(start_date_time, end_date_time)
+    except (TypeError, ValueError):
+        snapped_start, snapped_end = start_date_time, end_date_time
+    keys = {horizon: forecast_key(MODEL_VERSION, building, snapped_start, snapped_end, horizon) for horizon in horizons}
+    stored = await load_forecast(keys[horizons[-1]])
+
+    if stored is not None:
+        point_forecast, quantile_forecast, stored_meta = stored
+        logger.info(f"forecast_store - 저장된 예측 사용: {keys[horizons[-1]]}")
+        forecasts = {
+            horizon: (point_forecast[:, :horizon], quantile_forecast[:, :horizon])
+            for horizon in horizons
         }
-        return json.dumps(response, ensure_ascii=False, indent=2)
+        return forecasts, stored_meta["data_points"]
+
+    # 1. DB에서 과거 데이터 조회
+    results = await _fetch_forecast_inputs(start_date_time, end_date_time, building)
+
+    if not results or len(results) == 0:
+        return None
+
+    # 2. datavalue 추출
+    energy_values = [float(r['powerusage']) for r in results]
+    data_points = len(energy_values)
+    logger.info(f"forecast_store - {building} 수집된 데이터 개수: {data_points}")
+
+    # 3. numpy 배열로 변환
+    input_data = np.array(energy_values)
+
+    # 4. TimesFM 모델로 예측 (CPU-intensive 작업을 전용 추론 executor에서 실행)
+    if len(horizons) == 1:
+        forecasts = {horizons[0]: await run_inference(forecasting, model, horizons[0], input_data)}
     else:
-        return json.dumps({"error": "해당 기간에 데이터를 찾을 수 없습니다."}, ensure_ascii=False)
+        forecasts = await run_inference(forecasting_multi_horizon, model, horizons, input_data)
 
-@cached(ttl=3600)
+    for horizon, (point_forecast, quantile_forecast) in forecasts.items():
+        await save_forecast(keys[horizon], point_forecast, quantile_forecast, {"data_points": data_points})
+    return forecasts, data_points
+
+@single_flight
 async def service_forecast_energy_usage(start_date_time: datetime.datetime, end_date_time: datetime.datetime, building: str, horizon: int = 24) -> str:
     """
     TimesFM 모델을 사용하여 전력량 예측
@@ -157,41 +543,22 @@ async def service_forecast_energy_usage(start_date_time: datetime.datetime, end_
 
     Returns:
     - JSON 형식의 예측 결과
+
+    예측 결과는 예측 저장소(forecast_store)를 거쳐 읽으므로, 저장된 예측은
+    재시작 후에도, 저장소를 공유하는 다른 worker에서도 다시 계산하지 않습니다.
+    저장소 키에는 수집 격자로 정규화한 구간을 사용합니다.
     """
     try:
         logger.info(f"forecast_energy_usage 시작 - building: {building}, horizon: {horizon}")
 
-        # 1. DB에서 과거 데이터 조회
-        query = """
-        SELECT
-            powerusage
-        FROM electricity
-        WHERE building = :building AND datetime >= :start_date_time AND datetime <= :end_date_time
-        ORDER BY datetime ASC
-        """
+        forecast = await _load_or_forecast(start_date_time, end_date_time, building, [horizon])
 
-        results = await execute_read_query(query, {
-            "building": building,
-            "start_date_time": start_date_time,
-            "end_date_time": end_date_time
-        })
-
-        if not results or len(results) == 0:
+        if forecast is None:
             logger.warning(f"forecast_energy_usage - {building}에 대한 데이터 없음")
             return json.dumps({"error": "해당 건물의 데이터가 없습니다."}, ensure_ascii=False)
 
-        # 2. datavalue 추출
-        energy_values = [float(r['powerusage']) for r in results]
-        logger.info(f"forecast_energy_usage - 수집된 데이터 개수: {len(energy_values)}")
-
-        # 3. numpy 배열로 변환
-        input_data = np.array(energy_values)
-
-        # 4. TimesFM 모델로 예측 (CPU-intensive 작업을 thread로 실행)
-        point_forecast, quantile_forecast = await asyncio.to_thread(
-            forecasting, model, horizon, input_data
-        )
-
+        forecasts, data_points = forecast
+        point_forecast, quantile_forecast = forecasts[horizon]
         logger.info(f"forecast_energy_usage - 예측 완료: {horizon}시간")
 
         # 5. 결과 포맷팅
@@ -204,7 +571,7 @@ async def service_forecast_energy_usage(start_date_time: datetime.datetime, end_
             "meta": {
                 "building": building,
                 "horizon": horizon,
-                "data_points": len(energy_values)
+                "data_points": data_points
             },
             "forecast": {
                 "point_forecast": forecast_values,  # 예측값
@@ -218,6 +585,59 @@ async def service_forecast_energy_usage(start_date_time: datetime.datetime, end_
         logger.error(f"forecast_energy_usage error: {str(e)}", exc_info=True)
         return json.dumps({"error": f"전력량 예측 실패: {str(e)}"}, ensure_ascii=False)
 
+@single_flight
+async def service_forecast_energy_usage_multi_horizon(start_date_time: datetime.datetime, end_date_time: datetime.datetime, building: str, horizons: list) -> str:
+    """
+    같은 과거 데이터로 여러 horizon의 전력량을 한 번의 예측으로 계산
+
+    가장 긴 horizon의 예측을 service_forecast_energy_usage와 같은 키로 예측 저장소에서 읽고
+    짧은 horizon의 예측은 그 앞부분을 잘라 반환합니다. 저장소에 없으면 model.forecast_multi_horizon으로
+    한 번 디코딩하고, 각 horizon의 예측을 단일 horizon 요청과 같은 키로 저장합니다.
+
+    Args:
+    - start_date_time: 과거 데이터 시작 시간 (datetime 객체)
+    - end_date_time: 과거 데이터 종료 시간 (datetime 객체)
+    - building: 건물명
+    - horizons: 예측할 타임스텝 수 목록 (단위: 10분)
+
+    Returns:
+    - JSON 형식의 horizon별 예측 결과
+    """
+    try:
+        logger.info(f"forecast_energy_usage_multi_horizon 시작 - building: {building}, horizons: {horizons}")
+
+        horizons = sorted(set(int(h) for h in horizons))
+        if not horizons or horizons[0] <= 0:
+            return json.dumps({"error": "horizons는 1 이상의 정수 목록이어야 합니다."}, ensure_ascii=False)
+
+        forecast = await _load_or_forecast(start_date_time, end_date_time, building, horizons)
+
+        if forecast is None:
+            logger.warning(f"forecast_energy_usage_multi_horizon - {building}에 대한 데이터 없음")
+            return json.dumps({"error": "해당 건물의 데이터가 없습니다."}, ensure_ascii=False)
+
+        forecasts, data_points = forecast
+        logger.info(f"forecast_energy_usage_multi_horizon - 예측 완료: {horizons}")
+
+        response = {
+            "meta": {
+                "building": building,
+                "horizons": horizons,
+                "data_points": data_points
+            },
+            "forecasts": {
+                str(horizon): {
+                    "point_forecast": forecasts[horizon][0][0].tolist(),
+                }
+                for horizon in horizons
+            }
+        }
+        return json.dumps(response, ensure_ascii=False, indent=2)
+
+    except Exception as e:
+        logger.error(f"forecast_energy_usage_multi_horizon error: {str(e)}", exc_info=True)
+        return json.dumps({"error": f"전력량 예측 실패: {str(e)}"}, ensure_ascii=False)
+
 async def service_control_power(action: str) -> str:
     """
     전력 제어 시스템에 명령을 전송
@@ -247,46 +667,122 @@ async def service_control_power(action: str) -> str:
             "action": action
         }
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(
-                    power_control_url,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    status_code = response.status
-                    response_text = await response.text()
-
-                    logger.info(f"service_control_power - API 응답: status={status_code}, body={response_text}")
-
-                    if status_code == 200:
-                        action_kr = "중단" if action == "off" else "재개"
-                        return json.dumps({
-                            "action": action,
-                            "success": True,
-                            "message": f"전력 사용을 {action_kr}했습니다.",
-                            "api_response": response_text
-                        }, ensure_ascii=False, indent=2)
-                    else:
-                        return json.dumps({
-                            "action": action,
-                            "success": False,
-                            "message": f"전력 제어 API 요청 실패 (HTTP {status_code})",
-                            "api_response": response_text
-                        }, ensure_ascii=False, indent=2)
-
-            except aiohttp.ClientConnectorError as e:
-                logger.error(f"service_control_power - 연결 실패: {str(e)}", exc_info=True)
+        try:
+            status_code, response_text = await post_power_command(power_control_url, payload)
+
+            logger.info(f"service_control_power - API 응답: status={status_code}, body={response_text}")
+
+            if status_code == 200:
+                action_kr = "중단" if action == "off" else "재개"
+                return json.dumps({
+                    "action": action,
+                    "success": True,
+                    "message": f"전력 사용을 {action_kr}했습니다.",
+                    "api_response": response_text
+                }, ensure_ascii=False, indent=2)
+            else:
                 return json.dumps({
                     "action": action,
                     "success": False,
-                    "message": f"전력 제어 시스템에 연결할 수 없습니다: {str(e)}"
+                    "message": f"전력 제어 API 요청 실패 (HTTP {status_code})",
+                    "api_response": response_text
                 }, ensure_ascii=False, indent=2)
 
+        except aiohttp.ClientConnectorError as e:
+            logger.error(f"service_control_power - 연결 실패: {str(e)}", exc_info=True)
+            return json.dumps({
+                "action": action,
+                "success": False,
+                "message": f"전력 제어 시스템에 연결할 수 없습니다: {str(e)}"
+            }, ensure_ascii=False, indent=2)
+
     except Exception as e:
         logger.error(f"service_control_power error: {str(e)}", exc_info=True)
         return json.dumps({
             "action": action,
             "success": False,
             "message": f"전력 제어 실패: {str(e)}"
-        }, ensure_ascii=False, indent=2)
\ No newline at end of file
+        }, ensure_ascii=False, indent=2)
+
+async def service_control_power_batch(commands: list) -> str:
+    """
+    여러 대상에 대한 전력 제어 명령을 동시에 전송
+
+    각 명령에는 고유한 Idempotency-Key가 부여되며, 일시적 실패는 지터 백오프로 재시도합니다.
+    동시 요청 수는 POWER_CONTROL_BATCH_CONCURRENCY로 제한됩니다.
+
+    Args:
+    - commands: [{"target": <제어 대상>, "action": <'on' 또는 'off'>}, ...]
+
+    Returns:
+    - JSON 형식의 대상별 제어 결과와 요약
+    """
+    batch_id = str(uuid.uuid4())
+    logger.info(f"service_control_power_batch 시작 - batch_id: {batch_id}, 대상 수: {len(commands)}")
+
+    power_control_url = get_env('POWER_CONTROL_URL')
+    if not power_control_url:
+        logger.error("POWER_CONTROL_URL이 .env에 설정되지 않았습니다.")
+        return json.dumps({
+            "batch_id": batch_id,
+            "success": False,
+            "message": "POWER_CONTROL_URL이 설정되지 않았습니다."
+        }, ensure_ascii=False)
+
+    semaphore = asyncio.Semaphore(POWER_CONTROL_CONFIG['batch_concurrency'])
+
+    async def send(command: dict) -> dict:
+        target, action = command["target"], command["action"]
+        idempotency_key = f"{batch_id}:{uuid.uuid4()}"
+        result = {
+            "target": target,
+            "action": action,
+            "idempotency_key": idempotency_key,
+        }
+        try:
+            status_code, response_text, attempts = await post_power_command_with_retry(
+                power_control_url,
+                {"target": target, "action": action},
+                headers={"Idempotency-Key": idempotency_key},
+                semaphore=semaphore,
+            )
+            result.update({
+                "success": status_code == 200,
+                "status_code": status_code,
+                "attempts": attempts,
+                "api_response": response_text,
+            })
+        except PowerCommandError as e:
+            logger.error(f"service_control_power_batch - {target} 제어 실패 ({e.attempts}회 시도): {str(e)}")
+            result.update({
+                "success": False,
+                "status_code": e.status_code,
+                "attempts": e.attempts,
+                "message": f"전력 제어 실패: {str(e)}",
+            })
+        except Exception as e:
+            logger.error(f"service_control_power_batch - {target} 제어 실패: {str(e)}")
+            result.update({
+                "success": False,
+                "message": f"전력 제어 실패: {str(e)}",
+            })
+        return result
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(send(command) for command in commands))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    succeeded = sum(1 for r in results if r["success"])
+    logger.info(f"service_control_power_batch 완료 - batch_id: {batch_id}, 성공: {succeeded}/{len(results)}, {elapsed_ms:.1f}ms")
+
+    return json.dumps({
+        "batch_id": batch_id,
+        "success": succeeded == len(results),
+        "summary": {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "elapsed_ms": round(elapsed_ms, 1),
+        },
+        "results": results,
+    }, ensure_ascii=False, indent=2)
@@ -0,0 +1,188 @@
+import asyncio
+import datetime
+import time
+import numpy as np
+from .config import USAGE_INDEX_CONFIG, get_logger
+from .database import execute_read_query
+from . import metrics
+
+logger = get_logger(__name__)
+
+# 공유 인덱스 (첫 사용 시 생성, 수집 시점마다 새로 들어온 행만 추가)
+_index = None
+
+
+def to_datetime64(values) -> np.ndarray:
+    """datetime 객체 또는 'YYYY-MM-DD HH:MM:SS' 문자열 목록을 datetime64[us] 배열로 변환"""
+    return np.asarray(values, dtype="datetime64[us]")
+
+
+class BuildingUsageIndex:
+    """
+    한 건물의 정렬된 시각과 powerusage 누적합
+
+    powerusage는 10분 구간별 사용량이므로 누적합은 계량기 리셋이나 rollover의 영향을 받지 않습니다.
+    구간 총 사용량은 구간의 첫 행과 마지막 행 사이의 누적합 차이(두 번의 이진 탐색)입니다.
+    """
+
+    def __init__(self, timestamps: np.ndarray, usages: np.ndarray):
+        order = np.argsort(timestamps, kind="stable")
+        self.timestamps = timestamps[order]
+        self.cumulative = np.cumsum(usages[order])
+
+    def extend(self, timestamps: np.ndarray, usages: np.ndarray) -> "BuildingUsageIndex":
+        """
+        새로 수집된 행을 추가한 인덱스 반환 (기존 시각 뒤에 오면 누적합만 이어서 계산)
+
+        이미 인덱스에 있는 시각의 행은 건너뛰므로 겹치는 구간을 다시 읽어도 중복 집계되지 않습니다.
+        """
+        if len(self.timestamps):
+            position = np.minimum(np.searchsorted(self.timestamps, timestamps), len(self.timestamps) - 1)
+            new = self.timestamps[position] != timestamps
+            timestamps, usages = timestamps[new], usages[new]
+        if not len(timestamps):
+            return self
+        if len(self.timestamps) and timestamps.min() <= self.timestamps[-1]:
+            usages_so_far = np.diff(self.cumulative, prepend=0.0)
+            return BuildingUsageIndex(
+                np.concatenate([self.timestamps, timestamps]),
+                np.concatenate([usages_so_far, usages]),
+            )
+        order = np.argsort(timestamps, kind="stable")
+        offset = self.cumulative[-1] if len(self.cumulative) else 0.0
+        extended = BuildingUsageIndex.__new__(BuildingUsageIndex)
+        extended.timestamps = np.concatenate([self.timestamps, timestamps[order]])
+        extended.cumulative = np.concatenate([self.cumulative, offset + np.cumsum(usages[order])])
+        return extended
+
+    def totals(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """[start, end] 구간별 총 사용량 (구간에 데이터가 없으면 nan)"""
+        if not len(self.cumulative):
+            return np.full(len(starts), np.nan)
+        first = np.searchsorted(self.timestamps, starts, side="left")
+        last = np.searchsorted(self.timestamps, ends, side="right") - 1
+        found = last >= first
+        first = np.minimum(first, len(self.cumulative) - 1)
+        last = np.maximum(last, 0)
+        return np.where(found, self.cumulative[last] - self.cumulative[first], np.nan)
+
+
+class UsageIndex:
+    """
+    건물별 BuildingUsageIndex 모음 (요청된 건물만 electricity 테이블에서 증분 적재)
+
+    건물은 처음 요청될 때 전체 기간을 적재하고, 이후에는 마지막으로 적재한 시각에서 overlap만큼 앞선 시점
+    이후의 행만 다시 읽으므로, 다른 건물보다 늦게 수집된 건물의 행이나 겹치는 구간 안에서 늦게 도착한 행도 반영됩니다.
+    모든 조회는 건물 하나의 시각 범위 조회이며, chunk_size 행씩 나누어 읽어 한 번에 메모리에 올리는 행 수를 제한합니다.
+    """
+
+    def __init__(self, refresh_interval=None, overlap=None, chunk_size=None):
+        self.buildings = {}
+        self.refresh_interval = (
+            USAGE_INDEX_CONFIG['refresh_interval_seconds'] if refresh_interval is None else refresh_interval
+        )
+        if overlap is None:
+            overlap = datetime.timedelta(minutes=USAGE_INDEX_CONFIG['overlap_minutes'])
+        self.overlap = np.timedelta64(overlap).astype("timedelta64[us]")
+        self.chunk_size = USAGE_INDEX_CONFIG['chunk_size'] if chunk_size is None else chunk_size
+        # 건물별 마지막 조회 시각 (time.monotonic)
+        self.refreshed_at = {}
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, buildings):
+        """
+        요청된 건물에 새로 수집된 행을 인덱스에 추가 (처음 요청된 건물은 전체 기간 적재)
+
+        건물마다 마지막 조회 후 refresh_interval초 안에는 DB를 다시 조회하지 않습니다.
+        """
+        buildings = list(dict.fromkeys(buildings))
+        if not self._stale(buildings):
+            return
+        async with self._lock:
+            stale = self._stale(buildings)
+            if not stale:
+                return
+
+            with metrics.timer("usage_index.refresh"):
+                loaded = await asyncio.gather(*(self._read_building(building) for building in stale))
+            for building, (timestamps, usages) in zip(stale, loaded):
+                self._add(building, timestamps, usages)
+            refreshed_at = time.monotonic()
+            for building in stale:
+                self.refreshed_at[building] = refreshed_at
+
+            num_rows = sum(len(timestamps) for timestamps, _ in loaded)
+            metrics.set_gauge("usage_index.rows", sum(len(b.timestamps) for b in self.buildings.values()))
+            logger.info(f"usage_index - 건물 {len(stale)}곳에서 {num_rows}개 행 조회, 적재된 건물 수: {len(self.buildings)}")
+
+    def _stale(self, buildings: list) -> list:
+        """마지막 조회 후 refresh_interval초가 지났거나 아직 조회하지 않은 건물"""
+        now = time.monotonic()
+        return [
+            building for building in buildings
+            if building not in self.refreshed_at or now - self.refreshed_at[building] >= self.refresh_interval
+        ]
+
+    async def _read_building(self, building: str) -> tuple:
+        """
+        건물의 마지막 적재 시각 - overlap 이후(처음이면 전체 기간)의 행을 (timestamps, usages) 배열로 반환
+
+        datetime 기준 키셋 페이지네이션으로 chunk_size 행씩 읽고, 각 chunk는 바로 numpy 배열로 변환합니다.
+        """
+        index = self.buildings.get(building)
+        since = None
+        if index is not None:
+            since = (index.timestamps[-1] - self.overlap).astype(datetime.datetime)
+
+        timestamps, usages = [], []
+        while True:
+            query = """
+            SELECT
+                datetime,
+                powerusage
+            FROM electricity
+            WHERE building = :building
+            """
+            params = {"building": building, "limit": self.chunk_size}
+            if since is not None:
+                query += "AND datetime > :since\n"
+                params["since"] = since
+            query += "ORDER BY datetime\nLIMIT :limit"
+
+            rows = await execute_read_query(query, params)
+            if rows:
+                timestamps.append(to_datetime64([r["datetime"] for r in rows]))
+                usages.append(np.array([r["powerusage"] for r in rows], dtype=np.float64))
+                since = rows[-1]["datetime"]
+            if len(rows) < self.chunk_size:
+                break
+
+        if not timestamps:
+            return np.empty(0, dtype="datetime64[us]"), np.empty(0)
+        return np.concatenate(timestamps), np.nan_to_num(np.concatenate(usages))
+
+    def _add(self, building: str, timestamps: np.ndarray, usages: np.ndarray):
+        if not len(timestamps):
+            return
+        index = self.buildings.get(building)
+        if index is None:
+            self.buildings[building] = BuildingUsageIndex(timestamps, usages)
+        else:
+            self.buildings[building] = index.extend(timestamps, usages)
+
+    def totals(self, building: str, starts, ends) -> np.ndarray:
+        """건물의 [start, end] 구간별 총 사용량 (건물이나 구간에 데이터가 없으면 nan)"""
+        starts, ends = to_datetime64(starts), to_datetime64(ends)
+        index = self.buildings.get(building)
+        if index is None:
+            return np.full(len(starts), np.nan)
+        return index.totals(starts, ends)
+
+
+def get_usage_index() -> UsageIndex:
+    """공유 사용량 인덱스 반환 (없으면 생성)"""
+    global _index
+
+    if _index is None:
+        _index = UsageIndex()
+    return _index
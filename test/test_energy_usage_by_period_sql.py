@@ -0,0 +1,238 @@
+"""
+service_get_energy_usage_by_period SQL 테스트
+date_trunc / unnest 쿼리의 결과를 Python으로 계산한 구간 경계와 비교합니다.
+
+- stand-in: 쿼리 파라미터의 형태(배열 길이, 타입, date_trunc 단위)를 검사하고 SQL 의미대로 집계하는 대역
+- postgres: TEST_DATABASE_URL(postgresql+asyncpg://...)이 설정된 경우 임시 테이블에서 실제 쿼리 실행
+  (설정되지 않았거나 연결할 수 없으면 건너뜀)
+"""
+
+import json
+import os
+import numpy as np
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from src import services
+from src.services import ENERGY_USAGE_PERIODS, service_get_energy_usage_by_period
+
+BUILDINGS = ["bldg-a", "bldg-b"]
+START = datetime(2024, 9, 28, 5, 0)
+END = datetime(2024, 10, 5, 12, 35)
+# 시작/종료 경계, 서로 겹치는 구간, 조회 기간 밖으로 걸친 구간, 데이터가 없는 구간
+INTERVALS = [
+    {"start_date_time": datetime(2024, 9, 28, 0, 0), "end_date_time": datetime(2024, 9, 28, 9, 0)},
+    {"start_date_time": datetime(2024, 9, 30, 9, 0), "end_date_time": datetime(2024, 9, 30, 18, 0)},
+    {"start_date_time": datetime(2024, 9, 30, 12, 0), "end_date_time": datetime(2024, 10, 1, 12, 0)},
+    {"start_date_time": datetime(2024, 10, 2, 0, 0), "end_date_time": datetime(2024, 10, 2, 23, 50)},
+    {"start_date_time": datetime(2024, 10, 5, 12, 0), "end_date_time": datetime(2024, 10, 6, 0, 0)},
+    {"start_date_time": datetime(2024, 11, 1, 0, 0), "end_date_time": datetime(2024, 11, 2, 0, 0)},
+]
+
+
+def make_rows():
+    """2024-09-27 ~ 2024-10-06의 10분 간격 행 (bldg-b는 10월 2일 수집 누락)"""
+    rng = np.random.default_rng(0)
+    rows = []
+    for building in BUILDINGS:
+        for i in range(10 * 144):
+            timestamp = datetime(2024, 9, 27) + timedelta(minutes=10 * i)
+            if building == "bldg-b" and timestamp.date() == datetime(2024, 10, 2).date():
+                continue
+            rows.append({"building": building, "datetime": timestamp, "powerusage": round(float(rng.uniform(0, 5)), 2)})
+    return rows
+
+
+def date_trunc(period: str, timestamp: datetime) -> datetime:
+    """PostgreSQL date_trunc (week는 월요일 시작)"""
+    if period == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_boundary(period: str, boundary: datetime) -> datetime:
+    if period == "hour":
+        return boundary + timedelta(hours=1)
+    if period == "day":
+        return boundary + timedelta(days=1)
+    if period == "week":
+        return boundary + timedelta(weeks=1)
+    return (boundary + timedelta(days=32)).replace(day=1)
+
+
+def period_boundaries(period: str, start: datetime, end: datetime) -> list:
+    """start가 속한 구간부터 end가 속한 구간까지의 [시작, 다음 구간 시작) 목록"""
+    boundaries = []
+    boundary = date_trunc(period, start)
+    while boundary <= end:
+        boundaries.append((boundary, next_boundary(period, boundary)))
+        boundary = next_boundary(period, boundary)
+    return boundaries
+
+
+def expected_columns(rows, period, intervals=None) -> dict:
+    """구간 경계를 Python으로 계산해 구간별 (합 - 첫 시점 사용량)과 행 수를 구한 열 단위 기대값"""
+    if period == "custom":
+        periods = [(i["start_date_time"], i["end_date_time"], True) for i in intervals]
+    else:
+        periods = [(b, e, False) for b, e in period_boundaries(period, START, END)]
+
+    columns = {"building": [], "period_start": []}
+    if period == "custom":
+        columns["period_end"] = []
+    columns.update({"total_usage_kwh": [], "data_points": []})
+    for building in sorted(BUILDINGS):
+        for period_start, period_end, inclusive in periods:
+            selected = [
+                r["powerusage"] for r in sorted(rows, key=lambda r: r["datetime"])
+                if r["building"] == building and START <= r["datetime"] <= END
+                and period_start <= r["datetime"] and (r["datetime"] <= period_end if inclusive else r["datetime"] < period_end)
+            ]
+            if not selected:
+                continue
+            columns["building"].append(building)
+            columns["period_start"].append(period_start.isoformat())
+            if period == "custom":
+                columns["period_end"].append(period_end.isoformat())
+            columns["total_usage_kwh"].append(sum(selected) - selected[0])
+            columns["data_points"].append(len(selected))
+    return columns
+
+
+def stand_in_query(rows):
+    """쿼리 파라미터 형태를 검사하고 SQL과 같은 의미로 집계하는 execute_read_query 대역"""
+    async def query(sql, params):
+        assert isinstance(params["buildings"], list) and all(isinstance(b, str) for b in params["buildings"])
+        assert isinstance(params["start_date_time"], datetime) and isinstance(params["end_date_time"], datetime)
+        selected = sorted(
+            (r for r in rows
+             if r["building"] in params["buildings"]
+             and params["start_date_time"] <= r["datetime"] <= params["end_date_time"]),
+            key=lambda r: (r["building"], r["datetime"]),
+        )
+
+        groups = {}
+        if "period_starts" in params:
+            # unnest(:period_starts, :period_ends) WITH ORDINALITY: 같은 길이의 timestamp 배열, 1부터 시작
+            assert "WITH ORDINALITY" in sql
+            starts, ends = params["period_starts"], params["period_ends"]
+            assert isinstance(starts, list) and isinstance(ends, list) and len(starts) == len(ends)
+            assert all(isinstance(t, datetime) for t in starts + ends)
+            for index, (start, end) in enumerate(zip(starts, ends), start=1):
+                for r in selected:
+                    if start <= r["datetime"] <= end:
+                        groups.setdefault((r["building"], index), []).append(r["powerusage"])
+            key_column = "period_index"
+        else:
+            assert "date_trunc" in sql and params["period"] in ("hour", "day", "week", "month")
+            for r in selected:
+                groups.setdefault((r["building"], date_trunc(params["period"], r["datetime"])), []).append(r["powerusage"])
+            key_column = "period_start"
+
+        return [
+            {"building": building, key_column: key, "total_usage_kwh": sum(usages) - usages[0], "data_points": len(usages)}
+            for (building, key), usages in sorted(groups.items())
+        ]
+    return query
+
+
+@pytest_asyncio.fixture
+async def postgres_query():
+    """TEST_DATABASE_URL의 연결에 임시 electricity 테이블을 만들고 그 연결로 쿼리하는 execute_read_query 대역"""
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL이 설정되지 않았습니다.")
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(url)
+    try:
+        conn = await engine.connect()
+    except Exception as e:
+        await engine.dispose()
+        pytest.skip(f"PostgreSQL에 연결할 수 없습니다: {e}")
+
+    # 임시 테이블은 이 연결에서만 보이며, 같은 이름의 테이블보다 먼저 조회됨
+    await conn.execute(text(
+        "CREATE TEMP TABLE electricity (building text, datetime timestamp, powerusage double precision)"
+    ))
+    await conn.execute(
+        text("INSERT INTO electricity (building, datetime, powerusage) VALUES (:building, :datetime, :powerusage)"),
+        make_rows(),
+    )
+
+    async def query(sql, params):
+        result = await conn.execute(text(sql), params)
+        return [dict(row._mapping) for row in result]
+
+    yield query
+    await conn.close()
+    await engine.dispose()
+
+
+@pytest.fixture(params=["stand-in", "postgres"])
+def execute_read_query(request):
+    if request.param == "stand-in":
+        return stand_in_query(make_rows())
+    return request.getfixturevalue("postgres_query")
+
+
+@pytest.fixture(autouse=True)
+def empty_range_cache():
+    """테스트마다 빈 기간 조회 캐시 사용"""
+    services.clear_range_cache()
+    yield
+    services.clear_range_cache()
+
+
+class TestEnergyUsageByPeriodSQL:
+    """date_trunc / unnest 쿼리의 구간 경계 테스트"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("period", ENERGY_USAGE_PERIODS)
+    async def test_calendar_periods_match_python_boundaries(self, execute_read_query, period):
+        """달력 구간별 사용량이 Python으로 계산한 구간 경계의 사용량과 같은지 확인"""
+        print("\n" + "=" * 60)
+        print(f"TEST: service_get_energy_usage_by_period - {period} 구간 경계")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', side_effect=execute_read_query):
+            result_dict = json.loads(await service_get_energy_usage_by_period(START, END, BUILDINGS, period))
+
+        expected = expected_columns(make_rows(), period)
+        columns = result_dict["columns"]
+        assert {k: v for k, v in columns.items() if k != "total_usage_kwh"} == {
+            k: v for k, v in expected.items() if k != "total_usage_kwh"
+        }
+        np.testing.assert_allclose(columns["total_usage_kwh"], expected["total_usage_kwh"], rtol=1e-9)
+        print(f"✓ {result_dict['meta']['rows']}개 구간 일치")
+
+    @pytest.mark.asyncio
+    async def test_custom_intervals_match_python_boundaries(self, execute_read_query):
+        """겹치거나 조회 기간 밖으로 걸친 지정 구간의 사용량이 Python 계산과 같은지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_get_energy_usage_by_period - 지정 구간 경계")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', side_effect=execute_read_query):
+            result_dict = json.loads(
+                await service_get_energy_usage_by_period(START, END, BUILDINGS, "custom", INTERVALS)
+            )
+
+        expected = expected_columns(make_rows(), "custom", INTERVALS)
+        columns = result_dict["columns"]
+        assert {k: v for k, v in columns.items() if k != "total_usage_kwh"} == {
+            k: v for k, v in expected.items() if k != "total_usage_kwh"
+        }
+        np.testing.assert_allclose(columns["total_usage_kwh"], expected["total_usage_kwh"], rtol=1e-9)
+        print(f"✓ {result_dict['meta']['rows']}개 구간 일치")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
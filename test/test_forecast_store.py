@@ -0,0 +1,251 @@
+"""
+예측 저장소(forecast_store) 테스트
+memory / sqlite / redis(로컬 stand-in 클라이언트) 백엔드와 service_forecast_energy_usage의 read-through를 검증합니다.
+"""
+
+import asyncio
+import json
+import os
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch, AsyncMock
+from src import forecast_store, metrics
+from src.config import FORECAST_STORE_CONFIG, PROJECT_ROOT, resolve_project_path
+from src.forecast_store import (
+    MemoryForecastStore,
+    RedisForecastStore,
+    SQLiteForecastStore,
+    decode_forecast,
+    encode_forecast,
+    forecast_key,
+)
+from src.services import service_forecast_energy_usage
+
+
+class StandInRedis:
+    """redis.asyncio 클라이언트를 대신하는 로컬 stand-in (get / set ex / aclose)"""
+
+    def __init__(self):
+        self.data = {}
+        self.closed = False
+
+    async def get(self, key):
+        item = self.data.get(key)
+        if item is None or item[1] <= time.time():
+            return None
+        return item[0]
+
+    async def set(self, key, value, ex=None):
+        if ex is not None and ex <= 0:
+            raise ValueError("invalid expire time in 'set' command")
+        self.data[key] = (bytes(value), time.time() + ex if ex else float("inf"))
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    """백엔드별 예측 저장소"""
+    if request.param == "memory":
+        return MemoryForecastStore()
+    if request.param == "sqlite":
+        return SQLiteForecastStore(str(tmp_path / "forecast_store.sqlite3"))
+    return RedisForecastStore(client=StandInRedis())
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+
+
+class TestForecastBlob:
+    """encode_forecast / decode_forecast 테스트"""
+
+    def test_round_trip(self):
+        """point/quantile 배열과 meta가 그대로 복원되는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: encode_forecast / decode_forecast - 왕복 변환")
+        print("=" * 60)
+
+        point = np.arange(24, dtype=np.float64)[None, :] * 1.5
+        quantile = np.random.default_rng(0).normal(size=(1, 24, 10))
+
+        decoded_point, decoded_quantile, meta = decode_forecast(
+            encode_forecast(point, quantile, {"data_points": 144})
+        )
+
+        np.testing.assert_array_equal(decoded_point, point.astype(np.float32))
+        np.testing.assert_array_equal(decoded_quantile, quantile.astype(np.float32))
+        assert decoded_point.dtype == np.float32 and decoded_quantile.shape == (1, 24, 10)
+        assert meta == {"data_points": 144}
+        print("✓ 배열과 meta 복원 확인")
+
+    def test_stores_float32_compactly(self):
+        """blob이 float32 배열 크기와 작은 헤더만으로 구성되는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: encode_forecast - float32 blob 크기")
+        print("=" * 60)
+
+        point = np.zeros((1, 1024))
+        quantile = np.zeros((1, 1024, 10))
+
+        blob = encode_forecast(point, quantile, {"data_points": 4096})
+        json_size = len(json.dumps({"point_forecast": point.tolist(), "quantile_forecast": quantile.tolist()}))
+
+        assert len(blob) - 4 * (point.size + quantile.size) < 128
+        print(f"✓ blob {len(blob)} bytes (JSON {json_size} bytes)")
+
+
+class TestForecastStoreBackends:
+    """MemoryForecastStore / SQLiteForecastStore / RedisForecastStore 공통 테스트"""
+
+    @pytest.mark.asyncio
+    async def test_get_and_set(self, store):
+        """저장한 blob을 그대로 읽고, 없는 키는 None을 반환하는지 확인"""
+        await store.set("key", b"blob", 60)
+
+        assert await store.get("key") == b"blob"
+        assert await store.get("missing") is None
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_expires_after_ttl(self, store):
+        """TTL이 지나면 항목이 만료되는지 확인"""
+        await store.set("key", b"blob", 1)
+        await asyncio.sleep(1.1)
+
+        assert await store.get("key") is None
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_sqlite_survives_restart(self, tmp_path):
+        """SQLite 저장소를 다시 열어도 저장된 예측이 남아있는지 확인"""
+        path = str(tmp_path / "forecast_store.sqlite3")
+        first = SQLiteForecastStore(path)
+        await first.set("key", b"blob", 60)
+        await first.close()
+
+        second = SQLiteForecastStore(path)
+        assert await second.get("key") == b"blob"
+        await second.close()
+
+    @pytest.mark.asyncio
+    async def test_redis_is_shared_across_replicas(self):
+        """같은 Redis 서버를 쓰는 replica끼리 예측을 공유하는지 확인"""
+        server = StandInRedis()
+        replica_a = RedisForecastStore(client=server)
+        replica_b = RedisForecastStore(client=server)
+
+        await replica_a.set("key", b"blob", 60)
+
+        assert await replica_b.get("key") == b"blob"
+
+    @pytest.mark.asyncio
+    async def test_memory_store_evicts_least_recently_used(self):
+        """메모리 저장소가 만료되지 않은 항목도 최대 항목 수를 넘으면 가장 오래 사용되지 않은 것부터 제거하는지 확인"""
+        store = MemoryForecastStore(max_entries=3)
+        for key in ("a", "b", "c"):
+            await store.set(key, key.encode(), 60)
+        await store.get("a")
+        await store.set("c", b"c2", 60)
+        await store.set("d", b"d", 60)
+
+        assert len(store._items) == 3
+        assert await store.get("b") is None
+        assert [await store.get(key) for key in ("a", "c", "d")] == [b"a", b"c2", b"d"]
+
+    @pytest.mark.asyncio
+    async def test_redis_close_falls_back_to_close(self):
+        """aclose가 없는 이전 redis-py 클라이언트는 close로 종료하는지 확인"""
+        class LegacyRedis:
+            closed = False
+
+            async def close(self):
+                self.closed = True
+
+        client = LegacyRedis()
+        await RedisForecastStore(client=client).close()
+
+        assert client.closed
+
+    def test_sqlite_path_is_absolute(self, tmp_path):
+        """SQLite 경로가 실행 위치와 관계없이 프로젝트 루트 기준 절대 경로인지 확인"""
+        assert os.path.isabs(FORECAST_STORE_CONFIG['sqlite_path'])
+        assert resolve_project_path("forecast_store.sqlite3") == os.path.join(PROJECT_ROOT, "forecast_store.sqlite3")
+        assert resolve_project_path(str(tmp_path / "store.sqlite3")) == str(tmp_path / "store.sqlite3")
+
+    def test_key_includes_model_version(self):
+        """모델/설정 식별자가 다르면 키가 달라지는지 확인"""
+        args = ("하이테크센터", "2024-09-01 00:00:00", "2024-09-01 23:59:59", 24)
+
+        assert forecast_key("model-a", *args) != forecast_key("model-b", *args)
+        assert forecast_key("model-a", *args).startswith(f"forecast:v{forecast_store.STORE_FORMAT_VERSION}:model-a:")
+
+
+class TestServiceReadThrough:
+    """service_forecast_energy_usage의 예측 저장소 read-through 테스트"""
+
+    ARGS = ("2024-09-01 00:00:00", "2024-09-01 23:59:59", "하이테크센터", 24)
+
+    @pytest.mark.asyncio
+    async def test_reuses_forecast_after_restart(self, tmp_path):
+        """저장된 예측을 재시작 후에도 DB 조회와 추론 없이 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_forecast_energy_usage - 재시작 후 저장소 재사용")
+        print("=" * 60)
+
+        path = str(tmp_path / "forecast_store.sqlite3")
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
+             patch('src.services.run_inference', new_callable=AsyncMock) as mock_run_inference:
+            mock_query.return_value = [{"powerusage": 100.0 + i} for i in range(144)]
+            mock_run_inference.return_value = (
+                np.array([[105.0 + i for i in range(24)]]),
+                np.array([[[i] * 10 for i in range(24)]]),
+            )
+
+            with patch('src.forecast_store._store', SQLiteForecastStore(path)):
+                cold = json.loads(await service_forecast_energy_usage(*self.ARGS))
+                await forecast_store.get_store().close()
+            with patch('src.forecast_store._store', SQLiteForecastStore(path)):
+                warm = json.loads(await service_forecast_energy_usage(*self.ARGS))
+                await forecast_store.get_store().close()
+
+            assert warm == cold
+            assert mock_query.await_count == 1
+            assert mock_run_inference.await_count == 1
+
+        counters = metrics.snapshot()["counters"]
+        assert counters["forecast_store.misses"] == 1
+        assert counters["forecast_store.hits"] == 1
+        print(f"✓ 재시작 후 응답 일치, 지표: {counters}")
+
+    @pytest.mark.asyncio
+    async def test_store_errors_fall_back_to_inference(self):
+        """저장소 오류가 있어도 예측을 계산해 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_forecast_energy_usage - 저장소 오류")
+        print("=" * 60)
+
+        broken = MemoryForecastStore()
+        broken.get = AsyncMock(side_effect=ConnectionError("store down"))
+        broken.set = AsyncMock(side_effect=ConnectionError("store down"))
+
+        with patch('src.forecast_store._store', broken), \
+             patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
+             patch('src.services.run_inference', new_callable=AsyncMock) as mock_run_inference:
+            mock_query.return_value = [{"powerusage": 100.0 + i} for i in range(144)]
+            mock_run_inference.return_value = (np.zeros((1, 24)), np.zeros((1, 24, 10)))
+
+            result_dict = json.loads(await service_forecast_energy_usage(*self.ARGS))
+
+        assert len(result_dict["forecast"]["point_forecast"]) == 24
+        assert metrics.snapshot()["counters"]["forecast_store.errors"] == 2
+        print("✓ 저장소 오류 시 추론 결과 반환")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
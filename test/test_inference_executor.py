@@ -0,0 +1,134 @@
+"""
+전용 추론 executor 테스트
+슬롯 수 제한, 슬롯별 스레드 예산/코어 고정, 대기열 지표를 검증합니다.
+"""
+
+import asyncio
+import os
+import threading
+import time
+import pytest
+import torch
+from src import inference_executor, metrics
+from src.config import INFERENCE_CONFIG
+from src.inference_executor import run_inference
+
+
+@pytest.fixture(autouse=True)
+def fresh_executor(monkeypatch):
+    """테스트마다 executor와 지표를 새로 시작"""
+    monkeypatch.setitem(INFERENCE_CONFIG, "slots", 2)
+    monkeypatch.setitem(INFERENCE_CONFIG, "threads_per_slot", 1)
+    monkeypatch.setitem(INFERENCE_CONFIG, "pin_cores", False)
+    inference_executor.shutdown_executor()
+    metrics.reset()
+    yield
+    inference_executor.shutdown_executor()
+
+
+class TestRunInference:
+    """run_inference 테스트"""
+
+    @pytest.mark.asyncio
+    async def test_returns_result_from_worker_thread(self):
+        """함수가 전용 worker 스레드에서 실행되고 결과를 반환하는지 확인"""
+        result, thread_name = await run_inference(lambda x: (x * 2, threading.current_thread().name), 21)
+
+        assert result == 42
+        assert thread_name.startswith("inference")
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrency_to_slots(self):
+        """동시 실행 수가 슬롯 수로 제한되는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: run_inference - 슬롯 수 제한")
+        print("=" * 60)
+
+        running, peak = 0, 0
+        lock = threading.Lock()
+
+        def work():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.1)
+            with lock:
+                running -= 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run_inference(work) for _ in range(6)))
+        elapsed = time.perf_counter() - start
+
+        assert peak == 2
+        assert elapsed >= 0.3, "슬롯 2개로 3회 이상 나누어 처리되어야 합니다"
+        print(f"✓ 최대 동시 실행: {peak}, 소요 시간: {elapsed:.2f}s")
+
+    @pytest.mark.asyncio
+    async def test_applies_thread_budget_per_slot(self):
+        """각 슬롯이 설정된 torch 스레드 수로 실행되는지 확인"""
+        threads_before = torch.get_num_threads()
+
+        threads = await run_inference(torch.get_num_threads)
+
+        assert threads == 1
+        assert torch.get_num_threads() == threads_before, "이벤트 루프 스레드 설정은 바뀌지 않아야 합니다"
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="sched_setaffinity 미지원 플랫폼")
+    async def test_pins_slot_to_planned_cores(self, monkeypatch):
+        """코어 고정 시 슬롯 스레드가 계획된 코어에서만 실행되는지 확인"""
+        monkeypatch.setitem(INFERENCE_CONFIG, "pin_cores", True)
+        process_cores = os.sched_getaffinity(0)
+
+        cores = await run_inference(lambda: os.sched_getaffinity(0))
+
+        assert cores == set(inference_executor.slot_plan()[0][1])
+        assert os.sched_getaffinity(0) == process_cores, "프로세스 전체의 코어 설정은 바뀌지 않아야 합니다"
+
+    @pytest.mark.asyncio
+    async def test_records_queue_metrics(self):
+        """대기열 깊이와 대기 시간 지표를 기록하는지 확인"""
+        depths = []
+
+        def work():
+            depths.append(metrics.snapshot()["gauges"]["inference.queue_depth"])
+            time.sleep(0.05)
+
+        await asyncio.gather(*(run_inference(work) for _ in range(4)))
+        snapshot = metrics.snapshot()
+
+        assert max(depths) >= 1, "슬롯보다 많은 작업은 대기열에서 기다려야 합니다"
+        assert snapshot["gauges"]["inference.queue_depth"] == 0
+        assert snapshot["latencies"]["inference.queue_wait"]["count"] == 4
+        assert snapshot["latencies"]["inference.queue_wait"]["max_ms"] >= 40
+        assert snapshot["latencies"]["inference.run"]["count"] == 4
+        print(f"✓ 대기 시간 지표: {snapshot['latencies']['inference.queue_wait']}")
+
+
+class TestSlotPlan:
+    """slot_plan 테스트"""
+
+    def test_splits_available_cores(self, monkeypatch):
+        """threads_per_slot이 0이면 코어를 슬롯 수로 나누는지 확인"""
+        monkeypatch.setattr(inference_executor, "_available_cores", lambda: list(range(8)))
+        monkeypatch.setitem(INFERENCE_CONFIG, "slots", 3)
+        monkeypatch.setitem(INFERENCE_CONFIG, "threads_per_slot", 0)
+
+        plan = inference_executor.slot_plan()
+
+        assert plan == [(2, [0, 1]), (2, [2, 3]), (2, [4, 5])]
+
+    def test_wraps_when_cores_are_short(self, monkeypatch):
+        """코어가 부족하면 순환해 할당하는지 확인"""
+        monkeypatch.setattr(inference_executor, "_available_cores", lambda: [0, 1])
+        monkeypatch.setitem(INFERENCE_CONFIG, "slots", 2)
+        monkeypatch.setitem(INFERENCE_CONFIG, "threads_per_slot", 2)
+
+        plan = inference_executor.slot_plan()
+
+        assert plan == [(2, [0, 1]), (2, [0, 1])]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,296 @@
+"""
+전력 제어 서비스 비동기 테스트
+로컬 stub HTTP 서버(aiohttp.web)를 띄워 실제 HTTP 왕복으로 검증합니다.
+"""
+
+import asyncio
+import json
+import time
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from src import metrics
+from src import power_control_client
+from src.config import POWER_CONTROL_CONFIG
+from src.services import service_control_power, service_control_power_batch
+
+
+@pytest_asyncio.fixture
+async def stub_server():
+    """
+    요청 본문과 클라이언트 소켓(peername)을 기록하는 stub 전력 제어 서버
+
+    - action이 'fail'이면 HTTP 500
+    - target이 'flaky'로 시작하면 같은 Idempotency-Key의 첫 요청에 HTTP 503
+    - server.delay 초만큼 응답 지연
+    """
+    received = []
+
+    async def handle_control(request):
+        body = await request.json()
+        key = request.headers.get("Idempotency-Key")
+        received.append({
+            "body": body,
+            "idempotency_key": key,
+            "peer": request.transport.get_extra_info("peername"),
+        })
+        await asyncio.sleep(server.delay)
+        if body.get("action") == "fail":
+            status = 500
+        elif body.get("target", "").startswith("flaky") and [r["idempotency_key"] for r in received].count(key) == 1:
+            status = 503
+        else:
+            status = 200
+        return web.json_response({"result": "ok"}, status=status)
+
+    app = web.Application()
+    app.router.add_post("/control", handle_control)
+    server = TestServer(app)
+    await server.start_server()
+    server.received = received
+    server.delay = 0
+    yield server
+    await power_control_client.close_session()
+    await server.close()
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+
+
+class TestServiceControlPower:
+    """service_control_power 테스트"""
+
+    @pytest.mark.asyncio
+    async def test_sends_action(self, stub_server, monkeypatch):
+        """제어 명령이 API로 전달되는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_control_power - 명령 전송")
+        print("=" * 60)
+
+        monkeypatch.setenv("POWER_CONTROL_URL", str(stub_server.make_url("/control")))
+
+        result_dict = json.loads(await service_control_power("off"))
+
+        assert result_dict["success"] is True
+        assert result_dict["action"] == "off"
+        assert stub_server.received[0]["body"] == {"action": "off"}
+        print(f"✓ 결과 메시지: {result_dict['message']}")
+
+    @pytest.mark.asyncio
+    async def test_reuses_warm_connection(self, stub_server, monkeypatch):
+        """연속 호출이 하나의 keep-alive 커넥션을 재사용하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_control_power - 커넥션 재사용")
+        print("=" * 60)
+
+        monkeypatch.setenv("POWER_CONTROL_URL", str(stub_server.make_url("/control")))
+
+        cold_start = time.perf_counter()
+        await service_control_power("off")
+        cold_elapsed = time.perf_counter() - cold_start
+
+        warm_start = time.perf_counter()
+        for _ in range(20):
+            await service_control_power("on")
+        warm_elapsed = (time.perf_counter() - warm_start) / 20
+
+        peers = {r["peer"] for r in stub_server.received}
+        assert len(stub_server.received) == 21
+        assert len(peers) == 1, "모든 요청이 같은 커넥션을 사용해야 합니다"
+
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["power_control.sessions_created"] == 1
+        assert snapshot["latencies"]["power_control.request"]["count"] == 21
+        print(f"✓ cold 요청: {cold_elapsed * 1000:.2f}ms")
+        print(f"✓ warm 요청 평균: {warm_elapsed * 1000:.2f}ms")
+        print(f"✓ 지연 시간 지표: {snapshot['latencies']['power_control.request']}")
+
+    @pytest.mark.asyncio
+    async def test_recreates_session_after_close(self, stub_server, monkeypatch):
+        """세션 종료 후 호출 시 새 세션을 생성하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_control_power - 세션 재생성")
+        print("=" * 60)
+
+        monkeypatch.setenv("POWER_CONTROL_URL", str(stub_server.make_url("/control")))
+
+        await service_control_power("off")
+        await power_control_client.close_session()
+        result_dict = json.loads(await service_control_power("on"))
+
+        assert result_dict["success"] is True
+        assert metrics.snapshot()["counters"]["power_control.sessions_created"] == 2
+        print("✓ 세션 재생성 확인")
+
+    @pytest.mark.asyncio
+    async def test_returns_failure_on_http_error(self, stub_server, monkeypatch):
+        """API가 200이 아닌 응답을 주면 실패를 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_control_power - HTTP 오류")
+        print("=" * 60)
+
+        monkeypatch.setenv("POWER_CONTROL_URL", str(stub_server.make_url("/control")))
+
+        result_dict = json.loads(await service_control_power("fail"))
+
+        assert result_dict["success"] is False
+        assert "HTTP 500" in result_dict["message"]
+        print(f"✓ 에러 메시지: {result_dict['message']}")
+
+    @pytest.mark.asyncio
+    async def test_returns_failure_without_url(self, monkeypatch):
+        """POWER_CONTROL_URL이 없으면 실패를 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_control_power - URL 미설정")
+        print("=" * 60)
+
+        monkeypatch.delenv("POWER_CONTROL_URL", raising=False)
+
+        result_dict = json.loads(await service_control_power("off"))
+
+        assert result_dict["success"] is False
+        print(f"✓ 에러 메시지: {result_dict['message']}")
+
+
+class TestServiceControlPowerBatch:
+    """service_control_power_batch 테스트"""
+
+    @pytest.fixture(autouse=True)
+    def fast_backoff(self, monkeypatch):
+        """테스트 중 재시도 대기 시간 단축"""
+        monkeypatch.setitem(POWER_CONTROL_CONFIG, "retry_backoff_base", 0.01)
+        monkeypatch.setitem(POWER_CONTROL_CONFIG, "retry_backoff_max", 0.02)
+
+    @pytest.mark.asyncio
+    async def test_sheds_many_loads_concurrently(self, stub_server, monkeypatch):
+        """50개 대상 제어가 단일 호출 수준의 시간에 끝나는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_control_power_batch - 50개 대상 동시 제어")
+        print("=" * 60)
+
+        monkeypatch.setenv("POWER_CONTROL_URL", str(stub_server.make_url("/control")))
+        stub_server.delay = 0.2
+        commands = [{"target": f"load-{i}", "action": "off"} for i in range(50)]
+
+        start = time.perf_counter()
+        result_dict = json.loads(await service_control_power_batch(commands))
+        elapsed = time.perf_counter() - start
+
+        assert result_dict["success"] is True
+        assert result_dict["summary"]["succeeded"] == 50
+        assert {r["target"] for r in result_dict["results"]} == {c["target"] for c in commands}
+        assert elapsed < 1.0, f"순차 실행 수준의 소요 시간: {elapsed:.2f}s"
+        print(f"✓ 소요 시간: {elapsed:.2f}s (단일 호출 {stub_server.delay}s, 순차 실행 시 {stub_server.delay * 50:.0f}s)")
+
+    @pytest.mark.asyncio
+    async def test_respects_concurrency_limit(self, stub_server, monkeypatch):
+        """동시 요청 수가 설정값으로 제한되는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_control_power_batch - 동시성 제한")
+        print("=" * 60)
+
+        monkeypatch.setenv("POWER_CONTROL_URL", str(stub_server.make_url("/control")))
+        monkeypatch.setitem(POWER_CONTROL_CONFIG, "batch_concurrency", 5)
+        stub_server.delay = 0.1
+        commands = [{"target": f"load-{i}", "action": "off"} for i in range(20)]
+
+        start = time.perf_counter()
+        result_dict = json.loads(await service_control_power_batch(commands))
+        elapsed = time.perf_counter() - start
+
+        assert result_dict["summary"]["succeeded"] == 20
+        assert elapsed >= 0.4, "동시 요청 수 5로 4회 이상 나누어 처리되어야 합니다"
+        print(f"✓ 소요 시간: {elapsed:.2f}s")
+
+    @pytest.mark.asyncio
+    async def test_retries_with_same_idempotency_key(self, stub_server, monkeypatch):
+        """일시적 실패를 같은 Idempotency-Key로 재시도하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_control_power_batch - 재시도와 멱등성 키")
+        print("=" * 60)
+
+        monkeypatch.setenv("POWER_CONTROL_URL", str(stub_server.make_url("/control")))
+        commands = [
+            {"target": "flaky-1", "action": "off"},
+            {"target": "load-1", "action": "off"},
+        ]
+
+        result_dict = json.loads(await service_control_power_batch(commands))
+        results = {r["target"]: r for r in result_dict["results"]}
+
+        assert result_dict["success"] is True
+        assert results["flaky-1"]["attempts"] == 2
+        assert results["load-1"]["attempts"] == 1
+        flaky_keys = [r["idempotency_key"] for r in stub_server.received if r["body"]["target"] == "flaky-1"]
+        assert flaky_keys == [results["flaky-1"]["idempotency_key"]] * 2
+        assert results["flaky-1"]["idempotency_key"] != results["load-1"]["idempotency_key"]
+        assert metrics.snapshot()["counters"]["power_control.retries"] == 1
+        print(f"✓ flaky-1 시도 횟수: {results['flaky-1']['attempts']}")
+
+    @pytest.mark.asyncio
+    async def test_reports_per_target_failures(self, stub_server, monkeypatch):
+        """일부 대상 실패 시 대상별 결과와 요약을 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_control_power_batch - 부분 실패")
+        print("=" * 60)
+
+        monkeypatch.setenv("POWER_CONTROL_URL", str(stub_server.make_url("/control")))
+        monkeypatch.setitem(POWER_CONTROL_CONFIG, "max_retries", 1)
+        commands = [
+            {"target": "load-1", "action": "off"},
+            {"target": "load-2", "action": "fail"},
+        ]
+
+        result_dict = json.loads(await service_control_power_batch(commands))
+        results = {r["target"]: r for r in result_dict["results"]}
+
+        assert result_dict["success"] is False
+        assert result_dict["summary"]["succeeded"] == 1
+        assert result_dict["summary"]["failed"] == 1
+        assert results["load-2"]["status_code"] == 500
+        assert results["load-2"]["attempts"] == 2
+        print(f"✓ 요약: {result_dict['summary']}")
+
+    @pytest.mark.asyncio
+    async def test_reports_attempts_on_connection_failure(self, monkeypatch):
+        """모든 시도가 연결 오류로 실패해도 시도 횟수와 상태 코드를 반환하는지 확인"""
+        monkeypatch.setenv("POWER_CONTROL_URL", "http://127.0.0.1:1/control")
+        monkeypatch.setitem(POWER_CONTROL_CONFIG, "max_retries", 1)
+
+        result_dict = json.loads(await service_control_power_batch([{"target": "load-1", "action": "off"}]))
+        await power_control_client.close_session()
+        result = result_dict["results"][0]
+
+        assert result["success"] is False
+        assert result["attempts"] == 2
+        assert result["status_code"] is None
+        assert "message" in result
+
+    @pytest.mark.asyncio
+    async def test_backoff_releases_concurrency_slot(self, stub_server, monkeypatch):
+        """재시도 대기 중에는 동시성 슬롯을 놓아 다른 대상의 요청이 먼저 전송되는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_control_power_batch - 백오프 중 슬롯 반환")
+        print("=" * 60)
+
+        monkeypatch.setenv("POWER_CONTROL_URL", str(stub_server.make_url("/control")))
+        monkeypatch.setitem(POWER_CONTROL_CONFIG, "batch_concurrency", 1)
+        monkeypatch.setattr(power_control_client, "_backoff_delay", lambda attempt: 0.2)
+        commands = [
+            {"target": "flaky-1", "action": "off"},
+            {"target": "load-1", "action": "off"},
+        ]
+
+        result_dict = json.loads(await service_control_power_batch(commands))
+
+        assert result_dict["success"] is True
+        assert [r["body"]["target"] for r in stub_server.received] == ["flaky-1", "load-1", "flaky-1"]
+        print("✓ 요청 순서: flaky-1(503) → load-1 → flaky-1(재시도)")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -3,21 +3,42 @@
 pytest-asyncio를 사용하여 비동기 테스트를 실행합니다.
 """
 
+import asyncio
 import json
 import pytest
 import pytest_asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
 from unittest.mock import patch, AsyncMock
+from src import metrics
+from src import services
 from src.services import (
     service_get_current_time,
     service_get_monitored_buildings,
     service_get_building_data_range,
     service_get_energy_usages_range,
     service_get_total_energy_usage,
+    service_get_energy_usage_by_period,
     service_forecast_energy_usage,
+    service_forecast_energy_usage_multi_horizon,
 )
 
 
+@pytest.fixture(autouse=True)
+def empty_range_cache():
+    """테스트마다 빈 기간 조회 캐시 사용"""
+    services.clear_range_cache()
+    yield
+    services.clear_range_cache()
+
+
+@pytest.fixture(autouse=True)
+def empty_usage_index():
+    """테스트마다 빈 사용량 인덱스 사용 (조회 간격 없이 호출마다 증분 적재)"""
+    from src.usage_index import UsageIndex
+    with patch('src.usage_index._index', UsageIndex(refresh_interval=0)):
+        yield
+
+
 class TestServiceGetCurrentTime:
     """service_get_current_time 테스트"""
 
@@ -209,13 +230,15 @@ class TestServiceGetTotalEnergyUsage:
         print("TEST: service_get_total_energy_usage - 총 사용량 계산")
         print("=" * 60)
 
-        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
-            # Mock 데이터 설정
+        with patch('src.usage_index.execute_read_query', new_callable=AsyncMock) as mock_query:
+            # Mock 데이터 설정: 10분마다 powerusage 5.0 (첫 시점과 마지막 시점 사이 100구간)
             mock_query.return_value = [
                 {
-                    "start_accumulated_val": 1000.0,
-                    "end_accumulated_val": 1500.0
+                    "building": "하이테크센터",
+                    "datetime": datetime(2024, 9, 1) + timedelta(minutes=10 * i),
+                    "powerusage": 5.0
                 }
+                for i in range(101)
             ]
 
             result = await service_get_total_energy_usage(
@@ -233,19 +256,19 @@ class TestServiceGetTotalEnergyUsage:
             print(f"✓ 총 사용량: {result_dict['total_usage_kwh']} kWh")
 
     @pytest.mark.asyncio
-    async def test_handles_negative_difference(self):
-        """음수 차이도 절댓값으로 처리하는지 확인"""
+    async def test_handles_meter_reset(self):
+        """누적값(datavalue)이 리셋되어도 구간 사용량을 맞게 계산하는지 확인"""
         print("\n" + "=" * 60)
-        print("TEST: service_get_total_energy_usage - 음수 차이 처리")
+        print("TEST: service_get_total_energy_usage - 계량기 리셋 처리")
         print("=" * 60)
 
-        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
-            # Mock: 시작값이 끝값보다 큰 경우
+        with patch('src.usage_index.execute_read_query', new_callable=AsyncMock) as mock_query:
+            # Mock: 누적값 1490 -> 1500 -> (리셋) 5 -> 15, 구간별 사용량은 10씩
             mock_query.return_value = [
-                {
-                    "start_accumulated_val": 1500.0,
-                    "end_accumulated_val": 1000.0
-                }
+                {"building": "하이테크센터", "datetime": datetime(2024, 9, 1, 0, 0), "datavalue": 1490.0, "powerusage": 10.0},
+                {"building": "하이테크센터", "datetime": datetime(2024, 9, 1, 0, 10), "datavalue": 1500.0, "powerusage": 10.0},
+                {"building": "하이테크센터", "datetime": datetime(2024, 9, 1, 0, 20), "datavalue": 5.0, "powerusage": 10.0},
+                {"building": "하이테크센터", "datetime": datetime(2024, 9, 1, 0, 30), "datavalue": 15.0, "powerusage": 10.0},
             ]
 
             result = await service_get_total_energy_usage(
@@ -255,9 +278,9 @@ class TestServiceGetTotalEnergyUsage:
             )
             result_dict = json.loads(result)
 
-            # abs() 함수로 처리되므로 양수여야 함
-            assert result_dict["total_usage_kwh"] == 500.0
-            print(f"✓ 절댓값 처리 확인: {result_dict['total_usage_kwh']} kWh")
+            # MAX(datavalue) - MIN(datavalue)이라면 1495가 됨
+            assert result_dict["total_usage_kwh"] == 30.0
+            print(f"✓ 리셋 구간 사용량: {result_dict['total_usage_kwh']} kWh")
 
     @pytest.mark.asyncio
     async def test_returns_error_when_no_data(self):
@@ -266,7 +289,7 @@ class TestServiceGetTotalEnergyUsage:
         print("TEST: service_get_total_energy_usage - 데이터 없음")
         print("=" * 60)
 
-        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
+        with patch('src.usage_index.execute_read_query', new_callable=AsyncMock) as mock_query:
             mock_query.return_value = []
 
             result = await service_get_total_energy_usage(
@@ -280,6 +303,105 @@ class TestServiceGetTotalEnergyUsage:
             print(f"✓ 에러 메시지: {result_dict['error']}")
 
 
+class TestServiceGetEnergyUsageByPeriod:
+    """service_get_energy_usage_by_period 테스트"""
+
+    ARGS = (datetime(2024, 9, 1), datetime(2024, 9, 30, 23, 59, 59), ["하이테크센터", "본관"])
+
+    @pytest.mark.asyncio
+    async def test_daily_totals_in_one_query(self):
+        """여러 건물의 일별 사용량을 한 번의 쿼리로 열 단위로 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_get_energy_usage_by_period - 일별 사용량")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
+            mock_query.return_value = [
+                {"building": building, "period_start": datetime(2024, 9, day), "total_usage_kwh": 100.0 * day, "data_points": 144}
+                for building in ["본관", "하이테크센터"]
+                for day in range(1, 31)
+            ]
+
+            result_dict = json.loads(await service_get_energy_usage_by_period(*self.ARGS, "day"))
+
+            assert mock_query.await_count == 1
+            query, params = mock_query.await_args.args
+            assert "date_trunc" in query
+            assert params["period"] == "day"
+            assert params["buildings"] == ["하이테크센터", "본관"]
+
+        columns = result_dict["columns"]
+        assert result_dict["meta"]["rows"] == 60
+        assert set(columns) == {"building", "period_start", "total_usage_kwh", "data_points"}
+        assert all(len(values) == 60 for values in columns.values())
+        assert columns["period_start"][0] == "2024-09-01T00:00:00"
+        assert columns["total_usage_kwh"][29] == 3000.0
+        print(f"✓ 열: {list(columns)}, 행 수: {result_dict['meta']['rows']}")
+
+    @pytest.mark.asyncio
+    async def test_custom_intervals(self):
+        """지정한 구간 목록의 사용량을 구간 시작/종료와 함께 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_get_energy_usage_by_period - 지정 구간")
+        print("=" * 60)
+
+        intervals = [
+            {"start_date_time": datetime(2024, 9, 2, 9), "end_date_time": datetime(2024, 9, 2, 18)},
+            {"start_date_time": datetime(2024, 9, 3, 9), "end_date_time": datetime(2024, 9, 3, 18)},
+        ]
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
+            mock_query.return_value = [
+                {"building": "하이테크센터", "period_index": 2, "total_usage_kwh": 42.5, "data_points": 55},
+            ]
+
+            result_dict = json.loads(await service_get_energy_usage_by_period(*self.ARGS, "custom", intervals))
+
+            query, params = mock_query.await_args.args
+            assert "unnest" in query
+            assert params["period_starts"] == [datetime(2024, 9, 2, 9), datetime(2024, 9, 3, 9)]
+            assert params["period_ends"] == [datetime(2024, 9, 2, 18), datetime(2024, 9, 3, 18)]
+
+        assert result_dict["columns"] == {
+            "building": ["하이테크센터"],
+            "period_start": ["2024-09-03T09:00:00"],
+            "period_end": ["2024-09-03T18:00:00"],
+            "total_usage_kwh": [42.5],
+            "data_points": [55],
+        }
+        print(f"✓ 결과: {result_dict['columns']}")
+
+    @pytest.mark.asyncio
+    async def test_rejects_invalid_period(self):
+        """지원하지 않는 period나 intervals 없는 custom은 쿼리 없이 에러를 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_get_energy_usage_by_period - 잘못된 period")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
+            invalid = json.loads(await service_get_energy_usage_by_period(*self.ARGS, "decade"))
+            missing = json.loads(await service_get_energy_usage_by_period(*self.ARGS, "custom"))
+
+            assert "error" in invalid and "error" in missing
+            mock_query.assert_not_called()
+        print(f"✓ 에러 메시지: {invalid['error']}")
+
+    @pytest.mark.asyncio
+    async def test_returns_error_when_no_data(self):
+        """데이터가 없을 때 에러를 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_get_energy_usage_by_period - 데이터 없음")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
+            mock_query.return_value = []
+
+            result_dict = json.loads(await service_get_energy_usage_by_period(*self.ARGS, "month"))
+
+            assert "error" in result_dict
+        print(f"✓ 에러 메시지: {result_dict['error']}")
+
+
 class TestServiceForecastEnergyUsage:
     """service_forecast_energy_usage 테스트 (기본 기능)"""
 
@@ -290,6 +412,13 @@ class TestServiceForecastEnergyUsage:
         with patch('aiocache.cached', lambda **kwargs: lambda func: func):
             yield
 
+    @pytest.fixture(autouse=True)
+    def empty_forecast_store(self):
+        """테스트마다 빈 메모리 예측 저장소 사용"""
+        from src.forecast_store import MemoryForecastStore
+        with patch('src.forecast_store._store', MemoryForecastStore()):
+            yield
+
     @pytest.mark.asyncio
     async def test_basic_forecast(self):
         """기본 예측 기능 테스트"""
@@ -298,7 +427,7 @@ class TestServiceForecastEnergyUsage:
         print("=" * 60)
 
         with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
-             patch('src.services.asyncio.to_thread', new_callable=AsyncMock) as mock_to_thread:
+             patch('src.services.run_inference', new_callable=AsyncMock) as mock_run_inference:
 
             # Mock 데이터 설정
             mock_query.return_value = [
@@ -306,7 +435,7 @@ class TestServiceForecastEnergyUsage:
             ]
 
             import numpy as np
-            mock_to_thread.return_value = (
+            mock_run_inference.return_value = (
                 np.array([[105.0 + i for i in range(24)]]),  # point_forecast
                 np.array([[[i] * 10 for i in range(24)]])  # quantile_forecast
             )
@@ -357,7 +486,7 @@ class TestServiceForecastEnergyUsage:
         print("=" * 60)
 
         with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
-             patch('src.services.asyncio.to_thread', new_callable=AsyncMock) as mock_to_thread:
+             patch('src.services.run_inference', new_callable=AsyncMock) as mock_run_inference:
 
             # Mock 데이터 설정
             mock_query.return_value = [
@@ -365,7 +494,7 @@ class TestServiceForecastEnergyUsage:
             ]
 
             import numpy as np
-            mock_to_thread.return_value = (
+            mock_run_inference.return_value = (
                 np.array([[105.0 + i for i in range(48)]]),  # horizon=48
                 np.array([[[i] * 10 for i in range(48)]])
             )
@@ -391,7 +520,7 @@ class TestServiceForecastEnergyUsage:
         print("=" * 60)
 
         with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
-             patch('src.services.asyncio.to_thread', new_callable=AsyncMock) as mock_to_thread:
+             patch('src.services.run_inference', new_callable=AsyncMock) as mock_run_inference:
 
             # Mock 데이터 설정
             mock_query.return_value = [
@@ -399,7 +528,7 @@ class TestServiceForecastEnergyUsage:
             ]
 
             import numpy as np
-            mock_to_thread.return_value = (
+            mock_run_inference.return_value = (
                 np.array([[105.0 + i for i in range(24)]]),
                 np.array([[[i] * 10 for i in range(24)]])
             )
@@ -437,6 +566,410 @@ class TestServiceForecastEnergyUsage:
             print(f"✓ point_forecast 정상: {len(point_forecast)}개 예측값")
 
 
+class TestServiceForecastEnergyUsageMultiHorizon:
+    """service_forecast_energy_usage_multi_horizon 테스트"""
+
+    @pytest.fixture(autouse=True)
+    def empty_forecast_store(self):
+        """테스트마다 빈 메모리 예측 저장소 사용"""
+        from src.forecast_store import MemoryForecastStore
+        with patch('src.forecast_store._store', MemoryForecastStore()):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_returns_every_horizon_from_one_inference(self):
+        """한 번의 추론으로 요청한 모든 horizon의 예측을 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_forecast_energy_usage_multi_horizon - horizon별 예측")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
+             patch('src.services.run_inference', new_callable=AsyncMock) as mock_run_inference:
+
+            mock_query.return_value = [{"powerusage": 100.0 + i} for i in range(144)]
+
+            import numpy as np
+            full = np.arange(144, dtype=np.float32)[None, :]
+            mock_run_inference.return_value = {
+                horizon: (full[:, :horizon], full[:, :horizon, None].repeat(10, axis=-1))
+                for horizon in (6, 144)
+            }
+
+            result = await service_forecast_energy_usage_multi_horizon(
+                "2024-09-02 00:00:00",
+                "2024-09-02 23:59:59",
+                "하이테크센터",
+                [144, 6, 6]
+            )
+            result_dict = json.loads(result)
+
+            assert mock_run_inference.await_count == 1
+            assert mock_run_inference.await_args.args[0] is services.forecasting_multi_horizon
+            assert mock_run_inference.await_args.args[2] == [6, 144]
+            assert result_dict["meta"]["horizons"] == [6, 144]
+            assert result_dict["meta"]["data_points"] == 144
+            assert result_dict["forecasts"]["6"]["point_forecast"] == list(range(6))
+            assert len(result_dict["forecasts"]["144"]["point_forecast"]) == 144
+            print(f"✓ horizon별 예측값 개수: { {h: len(f['point_forecast']) for h, f in result_dict['forecasts'].items()} }")
+
+    @pytest.mark.asyncio
+    async def test_stores_every_horizon(self):
+        """한 번의 디코딩으로 얻은 horizon별 예측을 저장해 짧은 horizon의 단일 예측도 추론 없이 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_forecast_energy_usage_multi_horizon - horizon별 저장")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
+             patch('src.services.run_inference', new_callable=AsyncMock) as mock_run_inference:
+            mock_query.return_value = [{"powerusage": 100.0 + i} for i in range(144)]
+
+            import numpy as np
+            full = np.arange(144, dtype=np.float32)[None, :]
+            mock_run_inference.return_value = {
+                horizon: (full[:, :horizon], full[:, :horizon, None].repeat(10, axis=-1))
+                for horizon in (6, 144)
+            }
+
+            await service_forecast_energy_usage_multi_horizon(
+                "2024-09-02 00:00:00", "2024-09-02 23:59:59", "하이테크센터", [6, 144]
+            )
+            single = json.loads(await service_forecast_energy_usage(
+                "2024-09-02 00:00:00", "2024-09-02 23:59:59", "하이테크센터", 6
+            ))
+
+            assert mock_run_inference.await_count == 1
+            assert mock_query.await_count == 1
+
+        assert single["forecast"]["point_forecast"] == list(range(6))
+        print("✓ 짧은 horizon 예측 저장소 재사용")
+
+    @pytest.mark.asyncio
+    async def test_shares_stored_forecast_with_single_horizon(self):
+        """가장 긴 horizon의 예측을 단일 horizon 예측과 같은 저장소 키로 공유하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_forecast_energy_usage_multi_horizon - 예측 저장소 공유")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
+             patch('src.services.run_inference', new_callable=AsyncMock) as mock_run_inference:
+            mock_query.return_value = [{"powerusage": 100.0 + i} for i in range(144)]
+
+            import numpy as np
+            full = np.arange(144, dtype=np.float32)[None, :]
+            mock_run_inference.return_value = (full, full[..., None].repeat(10, axis=-1))
+
+            single = json.loads(await service_forecast_energy_usage(
+                "2024-09-02 00:00:00", "2024-09-02 23:59:59", "하이테크센터", 144
+            ))
+            # 같은 격자 구간을 가리키는 다른 시각
+            multi = json.loads(await service_forecast_energy_usage_multi_horizon(
+                "2024-09-01 23:50:01", "2024-09-02 23:55:00", "하이테크센터", [6, 144]
+            ))
+
+            assert mock_run_inference.await_count == 1
+            assert mock_query.await_count == 1
+
+        assert multi["forecasts"]["144"]["point_forecast"] == single["forecast"]["point_forecast"]
+        assert multi["forecasts"]["6"]["point_forecast"] == single["forecast"]["point_forecast"][:6]
+        assert multi["meta"]["data_points"] == 144
+        print("✓ 저장된 예측 재사용")
+
+    @pytest.mark.asyncio
+    async def test_rejects_invalid_horizons(self):
+        """양수가 아닌 horizon이 있으면 추론 없이 에러를 반환하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_forecast_energy_usage_multi_horizon - 잘못된 horizons")
+        print("=" * 60)
+
+        with patch('src.services.run_inference', new_callable=AsyncMock) as mock_run_inference:
+            result = await service_forecast_energy_usage_multi_horizon(
+                "2024-09-02 00:00:00",
+                "2024-09-02 23:59:59",
+                "하이테크센터",
+                [0, 6]
+            )
+            result_dict = json.loads(result)
+
+            assert "error" in result_dict
+            mock_run_inference.assert_not_called()
+            print(f"✓ 에러 메시지: {result_dict['error']}")
+
+
+class TestSingleFlight:
+    """동시에 들어온 같은 호출을 하나로 합치는 single_flight 테스트"""
+
+    ARGS = ("2024-09-01 00:00:00", "2024-09-01 23:59:59", "하이테크센터")
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+        from src.forecast_store import MemoryForecastStore
+        with patch('src.forecast_store._store', MemoryForecastStore()):
+            yield
+
+    @staticmethod
+    def slow_query(rows, delay=0.05):
+        """delay초 뒤에 rows를 반환하는 execute_read_query 대체 함수"""
+        async def query(*args, **kwargs):
+            await asyncio.sleep(delay)
+            return rows
+        return query
+
+    @pytest.mark.asyncio
+    async def test_coalesces_concurrent_forecasts(self):
+        """동시에 들어온 같은 예측 요청 5개가 DB 조회와 추론을 한 번만 하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: single_flight - 동시 예측 요청 합치기")
+        print("=" * 60)
+
+        import numpy as np
+        rows = [{"powerusage": 100.0 + i} for i in range(144)]
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
+             patch('src.services.run_inference', new_callable=AsyncMock) as mock_run_inference:
+            mock_query.side_effect = self.slow_query(rows)
+            mock_run_inference.return_value = (np.zeros((1, 24)), np.zeros((1, 24, 10)))
+
+            results = await asyncio.gather(*(service_forecast_energy_usage(*self.ARGS, 24) for _ in range(5)))
+
+            assert len(set(results)) == 1
+            assert mock_query.await_count == 1
+            assert mock_run_inference.await_count == 1
+
+        counters = metrics.snapshot()["counters"]
+        assert counters["single_flight.coalesced"] == 4
+        assert counters["single_flight.coalesced.service_forecast_energy_usage"] == 4
+        print(f"✓ 합쳐진 호출 수: {counters['single_flight.coalesced']}")
+
+    @pytest.mark.asyncio
+    async def test_does_not_coalesce_different_arguments(self):
+        """인자가 다른 호출은 따로 계산하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: single_flight - 다른 인자는 따로 계산")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
+            mock_query.side_effect = self.slow_query([{"building": "하이테크센터", "powerusage": 1.0, "datetime": "2024-09-01"}])
+
+            await asyncio.gather(
+                service_get_energy_usages_range(*self.ARGS),
+                service_get_energy_usages_range(*self.ARGS),
+                service_get_energy_usages_range(self.ARGS[0], self.ARGS[1], "다른건물"),
+            )
+
+            assert mock_query.await_count == 2
+        assert metrics.snapshot()["counters"]["single_flight.coalesced"] == 1
+        print("✓ 같은 인자 1회 합침, 다른 인자 별도 조회")
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_keeps_shared_call(self):
+        """한 호출자가 취소되어도 함께 기다리던 호출자는 결과를 받는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: single_flight - 호출자 취소")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
+            mock_query.side_effect = self.slow_query([{"building": "하이테크센터", "powerusage": 1.0, "datetime": "2024-09-01"}])
+
+            first = asyncio.ensure_future(service_get_energy_usages_range(*self.ARGS))
+            second = asyncio.ensure_future(service_get_energy_usages_range(*self.ARGS))
+            await asyncio.sleep(0.01)
+            first.cancel()
+
+            result_dict = json.loads(await second)
+
+            assert first.cancelled()
+            assert result_dict["meta"]["building"] == "하이테크센터"
+            assert mock_query.await_count == 1
+        print("✓ 취소되지 않은 호출자가 결과 수신")
+
+    @pytest.mark.asyncio
+    async def test_shares_errors_and_retries_afterwards(self):
+        """진행 중 호출의 예외를 함께 받고, 끝난 뒤의 호출은 다시 계산하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: single_flight - 예외 공유 후 재계산")
+        print("=" * 60)
+
+        async def failing_query(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            raise ConnectionError("db down")
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
+            mock_query.side_effect = failing_query
+
+            results = await asyncio.gather(
+                service_get_building_data_range("하이테크센터"),
+                service_get_building_data_range("하이테크센터"),
+                return_exceptions=True,
+            )
+            assert all(isinstance(r, ConnectionError) for r in results)
+
+            mock_query.side_effect = None
+            mock_query.return_value = [{"start_datetime": "2024-09-01", "end_datetime": "2024-09-30"}]
+            result_dict = json.loads(await service_get_building_data_range("하이테크센터"))
+
+            assert result_dict["building"] == "하이테크센터"
+            assert mock_query.await_count == 2
+        print("✓ 예외 공유 후 새 호출에서 재계산")
+
+
+class TestRangeCache:
+    """수집 격자로 정규화한 키를 쓰는 range_cache 테스트"""
+
+    ROWS = [
+        {"building": "하이테크센터", "datetime": datetime(2024, 9, 1, 0, 0), "powerusage": 100.0},
+        {"building": "하이테크센터", "datetime": datetime(2024, 9, 1, 12, 0), "powerusage": 150.0},
+        {"building": "하이테크센터", "datetime": datetime(2024, 10, 1, 0, 0), "powerusage": 150.0},
+    ]
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+        yield
+
+    @pytest.mark.asyncio
+    async def test_snaps_arguments_to_grid(self):
+        """같은 격자 구간을 가리키는 초 단위 시각들이 DB를 한 번만 조회하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: range_cache - 10분 격자 정규화")
+        print("=" * 60)
+
+        with patch('src.usage_index.execute_read_query', new_callable=AsyncMock) as mock_query:
+            mock_query.return_value = self.ROWS
+
+            first = await service_get_total_energy_usage("2024-09-01 00:00:00", "2024-09-01 23:50:00", "하이테크센터")
+            second = await service_get_total_energy_usage("2024-08-31 23:50:01", "2024-09-01 23:59:59", "하이테크센터")
+            third = await service_get_total_energy_usage(datetime(2024, 8, 31, 23, 55), datetime(2024, 9, 1, 23, 55), "하이테크센터")
+
+            assert first == second == third
+            assert mock_query.await_count == 1
+
+        counters = metrics.snapshot()["counters"]
+        assert counters["range_cache.hits"] == 2
+        print(f"✓ 지표: {counters}")
+
+    @pytest.mark.asyncio
+    async def test_keeps_historical_ranges(self):
+        """끝난 구간은 수집 시점이 지나도 다시 조회하지 않는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: range_cache - 과거 구간 유지")
+        print("=" * 60)
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
+             patch('src.services._current_tick') as mock_tick:
+            mock_query.return_value = [{"building": "하이테크센터", "powerusage": 1.0, "datetime": "2024-09-01 00:00:00"}]
+
+            for hours in range(6):
+                mock_tick.return_value = datetime(2024, 10, 1, hours)
+                await service_get_energy_usages_range("2024-09-01 00:00:00", "2024-09-30 20:00:00", "하이테크센터")
+
+            assert mock_query.await_count == 1
+        print("✓ 과거 구간 1회 조회")
+
+    @pytest.mark.asyncio
+    async def test_invalidates_live_ranges_on_new_rows(self):
+        """진행 중 구간은 구간 끝에 새 행이 적재되면 다시 조회하고, 수집 시점만 바뀌면 캐시를 쓰는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: range_cache - 새 행 적재 시 무효화")
+        print("=" * 60)
+
+        args = ("2024-10-01 00:00:00", "2024-10-01 11:50:00", "하이테크센터")
+        table = [
+            {"building": "하이테크센터", "datetime": datetime(2024, 10, 1, 0, 0), "powerusage": 100.0},
+            {"building": "하이테크센터", "datetime": datetime(2024, 10, 1, 11, 30), "powerusage": 150.0},
+        ]
+        range_queries = []
+
+        async def query(sql, params):
+            since = services._to_datetime(params.get("since", params.get("start_date_time")))
+            selected = [r for r in table if since <= r["datetime"] <= services._to_datetime(params["end_date_time"])]
+            if "COUNT(*)" in sql:
+                return [{"latest": max((r["datetime"] for r in selected), default=None), "num_rows": len(selected)}]
+            range_queries.append(params)
+            return sorted(selected, key=lambda r: r["datetime"], reverse=True)
+
+        with patch('src.services.execute_read_query', side_effect=query) as mock_query, \
+             patch('src.usage_index.execute_read_query', new_callable=AsyncMock) as mock_index_query, \
+             patch('src.services._current_tick') as mock_tick:
+            mock_tick.return_value = datetime(2024, 10, 1, 12, 0)
+            first = json.loads(await service_get_energy_usages_range(*args))
+            mock_tick.return_value = datetime(2024, 10, 1, 12, 10)
+            second = json.loads(await service_get_energy_usages_range(*args))
+
+            # 구간 끝에 늦게 적재된 행
+            table.append({"building": "하이테크센터", "datetime": datetime(2024, 10, 1, 11, 40), "powerusage": 200.0})
+            third = json.loads(await service_get_energy_usages_range(*args))
+            fourth = json.loads(await service_get_energy_usages_range(*args))
+
+            # 조회 구간 확인 쿼리는 구간 끝의 늦은 행 구간만 읽음
+            probe_params = [c.args[1] for c in mock_query.call_args_list if "COUNT(*)" in c.args[0]]
+            assert probe_params[0]["since"] == datetime(2024, 10, 1, 11, 20)
+            mock_index_query.assert_not_called()
+
+        assert len(first["energyUsageInfos"]) == len(second["energyUsageInfos"]) == 2
+        assert len(third["energyUsageInfos"]) == len(fourth["energyUsageInfos"]) == 3
+        assert len(range_queries) == 2
+        assert metrics.snapshot()["counters"]["range_cache.hits"] == 2
+        print("✓ 새 행 적재 시에만 재조회, 사용량 인덱스 미사용")
+
+    @pytest.mark.asyncio
+    async def test_probe_errors_skip_cache(self):
+        """진행 중 구간 확인 쿼리가 실패하면 캐시 없이 조회 결과를 반환하는지 확인"""
+        args = ("2024-10-01 00:00:00", "2024-10-01 11:50:00", "하이테크센터")
+        rows = [{"building": "하이테크센터", "powerusage": 1.0, "datetime": "2024-10-01 00:00:00"}]
+
+        async def query(sql, params):
+            if "COUNT(*)" in sql:
+                raise ConnectionError("db down")
+            return rows
+
+        with patch('src.services.execute_read_query', side_effect=query), \
+             patch('src.services._current_tick', return_value=datetime(2024, 10, 1, 12, 0)):
+            result_dict = json.loads(await service_get_energy_usages_range(*args))
+
+        assert result_dict["energyUsageInfos"] == rows
+        assert len(services._live_cache) == 0
+
+    def test_ranges_in_late_rows_window_are_live(self):
+        """늦게 도착한 행이 아직 적재될 수 있는 최근 구간은 과거 구간으로 캐시하지 않는지 확인"""
+        with patch('src.services._current_tick', return_value=datetime(2024, 10, 1, 12, 0)):
+            _, _, recent = services._snap_range("2024-10-01 00:00:00", "2024-10-01 11:50:00")
+            _, _, settled = services._snap_range("2024-10-01 00:00:00", "2024-10-01 11:00:00")
+
+        assert recent and not settled
+
+    @pytest.mark.asyncio
+    async def test_does_not_cache_errors(self):
+        """에러 응답은 캐시하지 않는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: range_cache - 에러 응답 미캐시")
+        print("=" * 60)
+
+        args = ("2024-09-01 00:00:00", "2024-09-01 23:50:00", "하이테크센터")
+
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
+            mock_query.return_value = []
+            assert "error" in json.loads(await service_get_energy_usages_range(*args))
+
+            mock_query.return_value = [{"building": "하이테크센터", "powerusage": 1.0, "datetime": "2024-09-01 00:00:00"}]
+            result_dict = json.loads(await service_get_energy_usages_range(*args))
+
+            assert result_dict["meta"]["building"] == "하이테크센터"
+            assert mock_query.await_count == 2
+
+        calls = []
+
+        @services.range_cache
+        async def indented_error(start_date_time, end_date_time):
+            calls.append(start_date_time)
+            return json.dumps({"error": "해당 기간에 데이터를 찾을 수 없습니다."}, ensure_ascii=False, indent=2)
+
+        await indented_error(*args[:2])
+        await indented_error(*args[:2])
+        assert len(calls) == 2
+        print("✓ 에러 후 재조회")
+
+
 class TestResponseStructure:
     """모든 서비스의 응답 구조 검증"""
 
@@ -447,9 +980,10 @@ class TestResponseStructure:
         print("TEST: 모든 서비스 - JSON 유효성 검증")
         print("=" * 60)
 
-        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query:
+        with patch('src.services.execute_read_query', new_callable=AsyncMock) as mock_query, \
+             patch('src.usage_index.execute_read_query', mock_query):
             # Mock 데이터 설정
-            mock_query.return_value = [{"building": "테스트"}]
+            mock_query.return_value = [{"building": "테스트", "datetime": "2024-09-01 00:00:00", "powerusage": 1.0}]
 
             services = [
                 ("get_monitored_buildings", service_get_monitored_buildings, []),
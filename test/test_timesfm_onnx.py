@@ -0,0 +1,130 @@
+"""
+TimesFM 2.5 ONNX Runtime 구현 테스트
+작은 모델을 ONNX 그래프로 export하여 torch 구현과의 예측 일치와 compile 설정 검증을 확인합니다.
+(onnxruntime이 없으면 건너뜀)
+"""
+
+import dataclasses
+import numpy as np
+import pytest
+import torch
+
+pytest.importorskip("onnxruntime")
+
+from src.models.timesfm.src.timesfm import configs
+from src.models.timesfm.src.timesfm.timesfm_2p5 import timesfm_2p5_base, timesfm_2p5_onnx, timesfm_2p5_torch
+
+FORECAST_CONFIG = configs.ForecastConfig(max_context=256, max_horizon=256, per_core_batch_size=2)
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    """트랜스포머 층을 1개로 줄인 무작위 가중치 모델과 그 ONNX 그래프 디렉토리"""
+    definition = timesfm_2p5_base.TimesFM_2p5_200M_Definition()
+    definition = dataclasses.replace(
+        definition,
+        stacked_transformers=dataclasses.replace(definition.stacked_transformers, num_layers=1),
+    )
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(timesfm_2p5_torch.TimesFM_2p5_200M_torch_module, "config", definition)
+        monkeypatch.setattr(timesfm_2p5_onnx.TimesFM_2p5_200M_onnx_module, "config", definition)
+        torch.manual_seed(0)
+        module = timesfm_2p5_torch.TimesFM_2p5_200M_torch_module().eval()
+        with torch.no_grad():
+            for p in module.parameters():
+                p.normal_(0, 0.05)
+        forecaster = timesfm_2p5_torch.TimesFM_2p5_200M_torch.__new__(timesfm_2p5_torch.TimesFM_2p5_200M_torch)
+        forecaster.model = module
+        forecaster.compile(FORECAST_CONFIG)
+
+        model_dir = tmp_path_factory.mktemp("onnx")
+        timesfm_2p5_onnx.export(forecaster, str(model_dir))
+        yield forecaster, str(model_dir)
+
+
+def load(model_dir, forecast_config=FORECAST_CONFIG):
+    model = timesfm_2p5_onnx.TimesFM_2p5_200M_onnx(model_dir)
+    model.compile(forecast_config)
+    return model
+
+
+class TestExport:
+    """export / TimesFM_2p5_200M_onnx 테스트"""
+
+    def test_forecast_matches_torch(self, exported):
+        """ONNX Runtime 예측이 torch 모델 예측과 일치하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: TimesFM_2p5_200M_onnx - torch 예측과 비교")
+        print("=" * 60)
+
+        forecaster, model_dir = exported
+        rng = np.random.default_rng(0)
+        inputs = [
+            np.sin(np.arange(256) / 10.0) * 50 + 100,
+            rng.normal(size=180).cumsum(),
+            np.sin(np.arange(40) / 5.0),
+        ]
+
+        expected_point, expected_quantile = forecaster.forecast(horizon=200, inputs=inputs)
+        actual_point, actual_quantile = load(model_dir).forecast(horizon=200, inputs=inputs)
+
+        np.testing.assert_allclose(actual_point, expected_point, rtol=1e-4, atol=1e-4)
+        np.testing.assert_allclose(actual_quantile, expected_quantile, rtol=1e-4, atol=1e-4)
+        print(f"✓ 최대 오차: {np.abs(actual_quantile - expected_quantile).max():.3e}")
+
+    def test_prefill_outputs_last_patch_only(self, exported):
+        """prefill 그래프가 마지막 패치의 출력 헤드만 계산하는지 확인"""
+        _, model_dir = exported
+        model = load(model_dir)
+
+        shapes = {o.name: o.shape for o in model.model.prefill_session.get_outputs()}
+
+        assert shapes["output_ts"][1] == 1
+        assert shapes["output_quantile_spread"][1] == 1
+
+    @pytest.mark.parametrize("options", [
+        {"precision": "bfloat16"},
+        {"kv_cache_dtype": "bfloat16"},
+        {"memory_budget_mb": 64},
+        {"attention_block_size": 4},
+        {"attention_backend": "einsum"},
+        {"pack_inputs": True},
+        {"return_backcast": True},
+        {"max_context": 512},
+        {"per_core_batch_size": 4},
+    ])
+    def test_compile_rejects_unsupported_configs(self, exported, options):
+        """export된 그래프가 지원하지 않거나 export 설정과 다른 compile 설정은 ValueError를 발생시키는지 확인"""
+        _, model_dir = exported
+
+        with pytest.raises(ValueError):
+            load(model_dir, dataclasses.replace(FORECAST_CONFIG, **options))
+
+    def test_compile_does_not_borrow_torch_methods(self, exported):
+        """ONNX compile/decode가 torch 클래스의 메서드를 빌려 쓰지 않고 공용 함수만 사용하는지 확인"""
+        _, model_dir = exported
+
+        def fail(*args, **kwargs):
+            raise AssertionError("torch 클래스의 메서드가 호출됨")
+
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr(timesfm_2p5_torch.TimesFM_2p5_200M_torch, "compile", fail)
+            monkeypatch.setattr(timesfm_2p5_torch.TimesFM_2p5_200M_torch_module, "decode", fail)
+            model = load(model_dir, dataclasses.replace(FORECAST_CONFIG, max_context=250, max_horizon=200))
+            point, _ = model.forecast(horizon=24, inputs=[np.sin(np.arange(100) / 10.0)])
+
+        assert (model.forecast_config.max_context, model.forecast_config.max_horizon) == (256, 256)
+        assert point.shape == (1, 24)
+
+    def test_export_rejects_quantized_model(self, exported):
+        """양자화된 모델은 export할 수 없는지 확인"""
+        forecaster, model_dir = exported
+
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr(forecaster.model, "quantization", "int8_dynamic")
+            with pytest.raises(ValueError, match="quantized"):
+                timesfm_2p5_onnx.export(forecaster, model_dir)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,1139 @@
+"""
+TimesFM 2.5 PyTorch 구현 단위 테스트
+사전학습 가중치 없이 연산 단위로 기존(루프) 구현과의 수치 일치를 검증합니다.
+"""
+
+import dataclasses
+import numpy as np
+import pytest
+import torch
+from src.models.timesfm.src.timesfm import configs
+from src.models.timesfm.src.timesfm.timesfm_2p5 import batch_planner, timesfm_2p5_base, timesfm_2p5_torch
+from src.models.timesfm.src.timesfm.torch import compile_cache, dense, quantization, transformer, util
+
+
+def make_series(batch_size, num_patches, patch_len, seed=0, offset=0.0, scale=1.0):
+    """앞쪽 패딩(mask=True)과 부분 마스킹이 섞인 패치 단위 입력 생성"""
+    generator = torch.Generator().manual_seed(seed)
+    x = offset + scale * torch.randn(batch_size, num_patches, patch_len, generator=generator)
+    mask = torch.zeros(batch_size, num_patches, patch_len, dtype=torch.bool)
+    for b in range(batch_size):
+        num_padded = int(torch.randint(0, num_patches * patch_len, (1,), generator=generator))
+        mask.view(batch_size, -1)[b, :num_padded] = True
+    x = torch.where(mask, 0.0, x)
+    return x, mask
+
+
+def loop_running_stats(n, mu, sigma, x, mask):
+    """update_running_stats를 패치마다 호출하는 기존 방식"""
+    ns, mus, sigmas = [], [], []
+    for i in range(x.shape[1]):
+        (n, mu, sigma), _ = util.update_running_stats(n, mu, sigma, x[:, i], mask[:, i])
+        ns.append(n)
+        mus.append(mu)
+        sigmas.append(sigma)
+    return torch.stack(ns, dim=1), torch.stack(mus, dim=1), torch.stack(sigmas, dim=1)
+
+
+class TestRunningStats:
+    """util.running_stats (prefix scan) 테스트"""
+
+    @pytest.mark.parametrize("offset,scale", [(0.0, 1.0), (500.0, 20.0), (1e4, 0.5)])
+    def test_matches_loop_from_zero(self, offset, scale):
+        """초기 상태가 0일 때 루프 구현과 일치하는지 확인"""
+        x, mask = make_series(8, 128, 32, offset=offset, scale=scale)
+        zeros = torch.zeros(8)
+
+        expected = loop_running_stats(zeros, zeros, zeros, x, mask)
+        actual = util.running_stats(zeros, zeros, zeros, x, mask)
+
+        for name, e, a in zip(["n", "mu", "sigma"], expected, actual):
+            torch.testing.assert_close(a, e, rtol=1e-4, atol=1e-4 * scale)
+            print(f"✓ {name} 최대 오차: {(a - e).abs().max().item():.3e}")
+
+    def test_matches_loop_from_initial_state(self):
+        """AR 디코딩처럼 이전 통계에서 이어서 계산할 때 루프 구현과 일치하는지 확인"""
+        x, mask = make_series(4, 4, 32, seed=1, offset=100.0, scale=5.0)
+        mask = torch.zeros_like(mask)
+        n = torch.tensor([0.0, 32.0, 640.0, 4096.0])
+        mu = torch.tensor([0.0, 99.0, 101.0, 100.5])
+        sigma = torch.tensor([0.0, 4.0, 6.0, 5.0])
+
+        expected = loop_running_stats(n, mu, sigma, x, mask)
+        actual = util.running_stats(n, mu, sigma, x, mask)
+
+        for e, a in zip(expected, actual):
+            torch.testing.assert_close(a, e, rtol=1e-4, atol=1e-3)
+
+    def test_fully_masked_rows(self):
+        """모든 값이 마스킹된 행은 0 통계를 유지하는지 확인"""
+        x = torch.randn(2, 3, 32)
+        mask = torch.ones_like(x, dtype=torch.bool)
+        zeros = torch.zeros(2)
+
+        n, mu, sigma = util.running_stats(zeros, zeros, zeros, x, mask)
+
+        assert torch.all(n == 0) and torch.all(mu == 0) and torch.all(sigma == 0)
+
+
+def reference_rotary(inputs, position, embedding_dims, min_timescale=1.0, max_timescale=10000.0):
+    """sin/cos를 매번 계산하는 기존 rotary embedding 방식"""
+    fraction = 2 * torch.arange(0, embedding_dims // 2) / embedding_dims
+    timescale = min_timescale * (max_timescale / min_timescale) ** fraction
+    sinusoid_inp = position[..., None, None] / timescale[None, None, None, :]
+    sin, cos = torch.sin(sinusoid_inp), torch.cos(sinusoid_inp)
+    first_half, second_half = torch.chunk(inputs, 2, dim=-1)
+    return torch.cat([first_half * cos - second_half * sin, second_half * cos + first_half * sin], dim=-1)
+
+
+class TestRotaryPositionalEmbedding:
+    """캐시된 sin/cos 테이블 기반 RotaryPositionalEmbedding 테스트"""
+
+    def test_matches_reference_with_negative_positions(self):
+        """패딩으로 인한 음수 위치를 포함해 기존 계산과 일치하는지 확인"""
+        rope = transformer.RotaryPositionalEmbedding(embedding_dims=80)
+        inputs = torch.randn(2, 12, 16, 80)
+        position = torch.arange(12)[None, :] - torch.tensor([[0], [5]])
+
+        expected = reference_rotary(inputs, position, 80)
+        actual = rope(inputs, position)
+
+        torch.testing.assert_close(actual, expected, rtol=1e-5, atol=1e-5)
+
+    def test_tables_shared_across_layers(self):
+        """여러 레이어가 같은 sin/cos 테이블을 재사용하는지 확인"""
+        transformer._ROTARY_TABLE_CACHE.clear()
+        layers = [transformer.RotaryPositionalEmbedding(embedding_dims=80) for _ in range(3)]
+        position = torch.arange(100)[None, :]
+
+        for layer in layers:
+            sin, cos = layer.sin_cos(position, max_positions=100)
+            assert sin.shape == (1, 100, 40)
+
+        assert len(transformer._ROTARY_TABLE_CACHE) == 1
+        print(f"✓ 캐시된 테이블 수: {len(transformer._ROTARY_TABLE_CACHE)}")
+
+    def test_tables_not_cached_while_exporting(self, monkeypatch):
+        """export 중 생성된 테이블은 공유 캐시에 저장되지 않는지 확인"""
+        transformer._ROTARY_TABLE_CACHE.clear()
+        monkeypatch.setattr(torch.compiler, "is_exporting", lambda: True)
+        rope = transformer.RotaryPositionalEmbedding(embedding_dims=80)
+
+        sin, cos = rope.sin_cos(torch.arange(10)[None, :], max_positions=10)
+
+        assert sin.shape == (1, 10, 40)
+        assert len(transformer._ROTARY_TABLE_CACHE) == 0
+
+
+def make_decode_cache(batch_size, cache_size, num_heads, head_dim):
+    """비어 있는 DecodeCache 생성"""
+    return util.DecodeCache(
+        next_index=torch.zeros(batch_size, dtype=torch.int32),
+        num_masked=torch.zeros(batch_size, dtype=torch.int32),
+        key=torch.zeros(batch_size, cache_size, num_heads, head_dim),
+        value=torch.zeros(batch_size, cache_size, num_heads, head_dim),
+    )
+
+
+class TestCachedAttention:
+    """decode cache를 사용하는 MultiHeadAttention 테스트"""
+
+    def test_cached_decode_matches_full_recompute(self):
+        """유효 길이만 참조하는 캐시 디코딩이 전체 재계산과 일치하는지 확인"""
+        torch.manual_seed(0)
+        attn = transformer.MultiHeadAttention(num_heads=2, in_features=16, fuse_qkv=True)
+        with torch.no_grad():
+            for p in attn.parameters():
+                p.normal_(0, 0.3)
+
+        inputs = torch.randn(2, 10, 16)
+        patch_mask = torch.zeros(2, 10, dtype=torch.bool)
+        patch_mask[1, :3] = True
+
+        with torch.no_grad():
+            expected, _ = attn(inputs, patch_mask=patch_mask)
+
+            cache = make_decode_cache(2, 14, 2, 8)
+            prefill, cache = attn(inputs[:, :6], decode_cache=cache, patch_mask=patch_mask[:, :6])
+            step1, cache = attn(inputs[:, 6:8], decode_cache=cache, patch_mask=patch_mask[:, 6:8])
+            step2, cache = attn(inputs[:, 8:], decode_cache=cache, patch_mask=patch_mask[:, 8:])
+
+        actual = torch.cat([prefill, step1, step2], dim=1)
+        valid = ~patch_mask
+        torch.testing.assert_close(actual[valid], expected[valid], rtol=1e-5, atol=1e-5)
+        assert torch.all(cache.next_index == 10)
+
+    def test_shared_mask_spans_whole_cache(self):
+        """공유 마스크가 고정 크기 캐시 전체에 걸쳐 생성되고 빈 구간은 가려지는지 확인"""
+        cache = make_decode_cache(2, 64, 2, 8)
+        cache.next_index += 10
+        patch_mask = torch.zeros(2, 4, dtype=torch.bool)
+
+        mask = transformer.make_layer_attn_mask(patch_mask, cache)
+
+        assert mask.shape == (2, 1, 4, 64)
+        expected = torch.arange(64)[None, :] <= 10 + torch.arange(4)[:, None]
+        assert torch.equal(mask[0, 0], expected) and torch.equal(mask[1, 0], expected)
+
+    def test_filled_kv_bucket(self):
+        """채워진 슬롯 수를 2의 거듭제곱으로 올리고 캐시 크기로 제한하는지 확인"""
+        assert [transformer.filled_kv_bucket(n, 36) for n in (1, 8, 9, 12, 16, 17, 32, 33, 36)] == [
+            1, 8, 16, 16, 16, 32, 32, 36, 36
+        ]
+
+    def test_bucketed_decode_matches_full_recompute(self):
+        """채워진 구간의 버킷만 참조하는 캐시 디코딩이 전체 재계산과 일치하는지 확인"""
+        torch.manual_seed(0)
+        attn = transformer.MultiHeadAttention(num_heads=2, in_features=16, fuse_qkv=True)
+        with torch.no_grad():
+            for p in attn.parameters():
+                p.normal_(0, 0.3)
+
+        inputs = torch.randn(2, 10, 16)
+        patch_mask = torch.zeros(2, 10, dtype=torch.bool)
+        patch_mask[1, :3] = True
+
+        with torch.no_grad():
+            expected, _ = attn(inputs, patch_mask=patch_mask)
+
+            cache = make_decode_cache(2, 14, 2, 8)
+            outputs = []
+            for start, end in [(0, 6), (6, 8), (8, 10)]:
+                kv_length = transformer.filled_kv_bucket(end, 14)
+                mask = transformer.make_layer_attn_mask(patch_mask[:, start:end], cache, kv_length)
+                assert mask.shape == (2, 1, end - start, kv_length)
+                out, cache = attn(
+                    inputs[:, start:end], decode_cache=cache, patch_mask=patch_mask[:, start:end],
+                    attn_mask=mask, kv_length=kv_length,
+                )
+                outputs.append(out)
+
+        actual = torch.cat(outputs, dim=1)
+        valid = ~patch_mask
+        torch.testing.assert_close(actual[valid], expected[valid], rtol=1e-5, atol=1e-5)
+
+    def test_decode_attends_over_filled_buckets(self, small_module):
+        """디코딩이 단계마다 채워진 구간의 버킷만 읽는지 확인 (프리필 8패치, 단계당 4패치, 캐시 36슬롯)"""
+        kv_lengths = []
+        attn = small_module.stacked_xf[0].attn
+        attention_fn = attn.attention_fn
+
+        def recording_attention(query, key, value, mask=None):
+            kv_lengths.append(key.shape[1])
+            return attention_fn(query, key, value, mask=mask)
+
+        attn.attention_fn = recording_attention
+        inputs = torch.randn(2, 256)
+        masks = torch.zeros(2, 256, dtype=torch.bool)
+        small_module.decode(1024, inputs, masks, return_backcast=False)
+
+        assert kv_lengths == [8, 16, 16, 32, 32, 32, 32, 36]
+
+    def test_export_path_matches_eager_path(self, monkeypatch):
+        """ONNX export용 고정 크기 캐시 경로가 기존 캐시 경로와 일치하는지 확인"""
+        torch.manual_seed(0)
+        attn = transformer.MultiHeadAttention(num_heads=2, in_features=16, fuse_qkv=True)
+        with torch.no_grad():
+            for p in attn.parameters():
+                p.normal_(0, 0.3)
+
+        inputs = torch.randn(2, 10, 16)
+        patch_mask = torch.zeros(2, 10, dtype=torch.bool)
+        patch_mask[1, :3] = True
+
+        def run_decode():
+            cache = make_decode_cache(2, 14, 2, 8)
+            outputs = []
+            for start, end in [(0, 6), (6, 8), (8, 10)]:
+                mask = transformer.make_layer_attn_mask(patch_mask[:, start:end], cache)
+                out, cache = attn(
+                    inputs[:, start:end], decode_cache=cache, patch_mask=patch_mask[:, start:end], attn_mask=mask
+                )
+                outputs.append(out)
+            return torch.cat(outputs, dim=1), cache
+
+        with torch.no_grad():
+            expected, expected_cache = run_decode()
+            monkeypatch.setattr(torch.onnx, "is_in_onnx_export", lambda: True)
+            actual, actual_cache = run_decode()
+
+        valid = ~patch_mask
+        torch.testing.assert_close(actual[valid], expected[valid], rtol=1e-5, atol=1e-5)
+        torch.testing.assert_close(actual_cache.key, expected_cache.key)
+        assert torch.all(actual_cache.next_index == 10)
+
+
+class TestTrimLeadingMaskedPatches:
+    """_trim_leading_masked_patches 테스트"""
+
+    def test_trims_patches_masked_in_every_row(self):
+        """모든 행에서 마스킹된 앞쪽 패치를 context bucket 길이까지만 잘라내는지 확인"""
+        inputs = torch.randn(2, 16 * 4)
+        masks = torch.zeros(2, 16 * 4, dtype=torch.bool)
+        masks[0, :50] = True
+        masks[1, :45] = True
+
+        trimmed_inputs, trimmed_masks = timesfm_2p5_torch._trim_leading_masked_patches(inputs, masks, 4)
+
+        # 마스킹되지 않은 패치 5개 -> 8패치 bucket
+        assert trimmed_inputs.shape == (2, 32)
+        torch.testing.assert_close(trimmed_inputs, inputs[:, 32:])
+        torch.testing.assert_close(trimmed_masks, masks[:, 32:])
+
+    def test_trimmed_lengths_are_context_buckets(self):
+        """잘라낸 길이가 항상 batch_planner.context_bucket 중 하나인지 확인"""
+        buckets = batch_planner.context_buckets(16 * 4, 4)
+        lengths = set()
+        for num_masked in range(16 * 4):
+            masks = torch.zeros(1, 16 * 4, dtype=torch.bool)
+            masks[0, :num_masked] = True
+            trimmed_inputs, _ = timesfm_2p5_torch._trim_leading_masked_patches(torch.randn(1, 16 * 4), masks, 4)
+            lengths.add(trimmed_inputs.shape[1])
+
+        assert sorted(lengths) == buckets == [4, 8, 16, 32, 64]
+
+    def test_keeps_unmasked_or_fully_masked_batch(self):
+        """잘라낼 패치가 없거나 전부 마스킹된 배치는 그대로 두는지 확인"""
+        inputs = torch.randn(2, 16)
+        for masks in [torch.zeros(2, 16, dtype=torch.bool), torch.ones(2, 16, dtype=torch.bool)]:
+            trimmed_inputs, trimmed_masks = timesfm_2p5_torch._trim_leading_masked_patches(inputs, masks, 4)
+            assert trimmed_inputs is inputs and trimmed_masks is masks
+
+    def test_trimmed_decode_matches_padded_decode(self):
+        """앞쪽 패딩 패치를 잘라낸 캐시 디코딩이 원래 길이의 디코딩과 일치하는지 확인"""
+        torch.manual_seed(0)
+        attn = transformer.MultiHeadAttention(num_heads=2, in_features=16, fuse_qkv=True)
+        with torch.no_grad():
+            for p in attn.parameters():
+                p.normal_(0, 0.3)
+
+        inputs = torch.randn(2, 12, 16)
+        patch_mask = torch.zeros(2, 12, dtype=torch.bool)
+        patch_mask[:, :5] = True
+        patch_mask[1, :7] = True
+
+        def run_decode(start):
+            cache = make_decode_cache(2, 12 - start, 2, 8)
+            prefill, cache = attn(inputs[:, start:10], decode_cache=cache, patch_mask=patch_mask[:, start:10])
+            step, cache = attn(inputs[:, 10:], decode_cache=cache, patch_mask=patch_mask[:, 10:])
+            return torch.cat([prefill, step], dim=1)
+
+        with torch.no_grad():
+            expected = run_decode(0)[:, 5:]
+            actual = run_decode(5)
+
+        valid = ~patch_mask[:, 5:]
+        torch.testing.assert_close(actual[valid], expected[valid], rtol=1e-5, atol=1e-5)
+
+
+def loop_continuous_quantile_head(full_forecast, quantile_spreads, max_horizon):
+    """분위수 인덱스마다 열을 대입하는 기존 방식"""
+    full_forecast = full_forecast.clone()
+    for quantile_index in [1, 2, 3, 4, 6, 7, 8, 9]:
+        full_forecast[:, :, quantile_index] = (
+            quantile_spreads[:, :max_horizon, quantile_index]
+            - quantile_spreads[:, :max_horizon, 5]
+            + full_forecast[:, :max_horizon, 5]
+        )
+    return full_forecast
+
+
+def loop_fix_quantile_crossing(full_forecast):
+    """torch.where를 분위수마다 연쇄 적용하는 기존 방식"""
+    full_forecast = full_forecast.clone()
+    for i in [4, 3, 2, 1]:
+        full_forecast[:, :, i] = torch.where(
+            full_forecast[:, :, i] < full_forecast[:, :, i + 1], full_forecast[:, :, i], full_forecast[:, :, i + 1]
+        )
+    for i in [6, 7, 8, 9]:
+        full_forecast[:, :, i] = torch.where(
+            full_forecast[:, :, i] > full_forecast[:, :, i - 1], full_forecast[:, :, i], full_forecast[:, :, i - 1]
+        )
+    return full_forecast
+
+
+class TestQuantilePostProcessing:
+    """벡터화된 분위수 후처리 테스트"""
+
+    def test_continuous_quantile_head_matches_loop(self):
+        """continuous quantile head 결과가 기존 루프와 완전히 같은지 확인"""
+        torch.manual_seed(0)
+        full_forecast = 100 + 10 * torch.randn(3, 256, 10)
+        quantile_spreads = 100 + 10 * torch.randn(3, 1024, 10)
+
+        expected = loop_continuous_quantile_head(full_forecast, quantile_spreads, 256)
+        actual = timesfm_2p5_torch._use_continuous_quantile_head_fn(full_forecast, quantile_spreads, 256)
+
+        assert torch.equal(actual, expected)
+
+    def test_fix_quantile_crossing_matches_loop(self):
+        """교차 보정 결과가 기존 torch.where 연쇄와 완전히 같은지 확인"""
+        torch.manual_seed(0)
+        # 교차가 많이 생기도록 분위수를 무작위로 배치하고 일부 값은 중복
+        full_forecast = torch.randn(4, 300, 10).round(decimals=1)
+
+        expected = loop_fix_quantile_crossing(full_forecast)
+        actual = timesfm_2p5_torch._fix_quantile_crossing_fn(full_forecast)
+
+        assert torch.equal(actual, expected)
+        assert torch.all(actual[..., 1:5].diff(dim=-1) >= 0)
+        assert torch.all(actual[..., 5:10].diff(dim=-1) >= 0)
+
+
+def loop_assemble_batches(inputs, context, batch_size):
+    """입력마다 Python 리스트로 mask를 만들고 np.pad로 채우는 기존 방식"""
+    inputs = list(inputs)
+    if (w := len(inputs) % batch_size) != 0:
+        inputs += [np.array([0.0] * 3)] * (batch_size - w)
+    values, masks = [], []
+    for each_input in inputs:
+        value = timesfm_2p5_base.linear_interpolation(timesfm_2p5_base.strip_leading_nans(np.array(each_input)))
+        if (w := len(value)) >= context:
+            value = value[-context:]
+            mask = np.zeros_like(value, dtype=bool)
+        else:
+            mask = np.array([True] * (context - w) + [False] * w)
+            value = np.pad(value, (context - w, 0), "constant", constant_values=0.0)
+        values.append(value)
+        masks.append(mask)
+    return np.array(values).astype(np.float32), np.array(masks)
+
+
+def make_forecaster(context, batch_size):
+    """모델 없이 forecast 전처리만 사용하는 TimesFM_2p5 인스턴스"""
+    forecaster = timesfm_2p5_base.TimesFM_2p5()
+    forecaster.forecast_config = configs.ForecastConfig(max_context=context, max_horizon=128)
+    forecaster.global_batch_size = batch_size
+    return forecaster
+
+
+class TestAssembleBatches:
+    """TimesFM_2p5._assemble_batches 테스트"""
+
+    def test_matches_loop(self):
+        """패딩/절단/NaN 처리 결과가 기존 방식과 같은지 확인"""
+        rng = np.random.default_rng(0)
+        window_nan = rng.normal(size=100)
+        window_nan[[80, 81, 99]] = np.nan
+        boundary_nan = rng.normal(size=100)
+        boundary_nan[35:45] = np.nan  # 창(마지막 64개) 경계에 걸친 NaN은 창 밖의 값으로 보간
+        leading_nan = np.concatenate([[np.nan] * 70, rng.normal(size=30)])
+        early_nan = rng.normal(size=100)
+        early_nan[:5] = np.nan
+        early_nan[10] = np.nan
+        inputs = [
+            rng.normal(size=10),
+            rng.normal(size=64),
+            rng.normal(size=500),
+            [1.0, 2.0, 3.0],
+            window_nan,
+            boundary_nan,
+            leading_nan,
+            early_nan,
+            np.arange(50),
+        ]
+
+        for batch_size in [1, 3, 4]:
+            expected_values, expected_masks = loop_assemble_batches(inputs, 64, batch_size)
+            values, masks = make_forecaster(64, batch_size)._assemble_batches(inputs)
+
+            assert values.dtype == np.float32 and values.shape == expected_values.shape
+            np.testing.assert_array_equal(masks, expected_masks)
+            np.testing.assert_array_equal(values, expected_values)
+
+    def test_does_not_modify_inputs(self):
+        """호출자의 입력 리스트와 배열을 바꾸지 않는지 확인"""
+        series = np.array([1.0, np.nan, 3.0])
+        inputs = [series]
+
+        values, _ = make_forecaster(8, 4)._assemble_batches(inputs)
+
+        assert len(inputs) == 1
+        assert np.isnan(series[1])
+        assert values[0, -2] == 2.0
+
+    def test_forecast_passes_buffers_without_copy(self):
+        """compiled_decode에 배치 버퍼의 view가 전달되고 결과 순서가 유지되는지 확인"""
+        forecaster = make_forecaster(16, 2)
+        received = []
+
+        def fake_decode(horizon, inputs, masks):
+            received.append(inputs)
+            point = np.repeat(inputs[:, -1:], horizon, axis=1)
+            return point, point[..., None].repeat(10, axis=-1)
+
+        forecaster.compiled_decode = fake_decode
+        inputs = [np.full(5, float(i)) for i in range(5)]
+
+        point, quantile = forecaster.forecast(horizon=3, inputs=inputs)
+
+        assert len(inputs) == 5
+        assert point.shape == (5, 3) and quantile.shape == (5, 3, 10)
+        np.testing.assert_array_equal(point[:, 0], np.arange(5))
+        assert len(received) == 3
+        assert all(r.base is received[0].base for r in received)
+        assert torch.from_numpy(received[0]).data_ptr() == received[0].__array_interface__["data"][0]
+
+
+class TestForecastMultiHorizon:
+    """TimesFM_2p5.forecast_multi_horizon 테스트"""
+
+    @staticmethod
+    def make_counting_forecaster():
+        """compiled_decode 호출 횟수를 기록하는 모델 없는 인스턴스"""
+        forecaster = make_forecaster(16, 2)
+        forecaster.calls = 0
+
+        def fake_decode(horizon, inputs, masks):
+            forecaster.calls += 1
+            steps = np.arange(horizon, dtype=np.float32)[None, :]
+            point = inputs[:, -1:] + steps
+            return point, point[..., None].repeat(10, axis=-1)
+
+        forecaster.compiled_decode = fake_decode
+        return forecaster
+
+    def test_matches_separate_forecasts(self):
+        """한 번의 디코딩 결과가 horizon별 개별 예측과 일치하는지 확인"""
+        forecaster = self.make_counting_forecaster()
+        inputs = [np.full(5, float(i)) for i in range(3)]
+
+        results = forecaster.forecast_multi_horizon([6, 144, 24], inputs)
+
+        assert forecaster.calls == 2  # 입력 3개, 배치 크기 2
+        assert set(results) == {6, 144, 24}
+        for horizon, (point, quantile) in results.items():
+            expected_point, expected_quantile = forecaster.forecast(horizon=horizon, inputs=inputs)
+            np.testing.assert_array_equal(point, expected_point)
+            np.testing.assert_array_equal(quantile, expected_quantile)
+
+    def test_rejects_invalid_horizons(self):
+        """비어 있거나 양수가 아닌 horizon을 거부하는지 확인"""
+        forecaster = self.make_counting_forecaster()
+        for horizons in [[], [0, 6]]:
+            with pytest.raises(ValueError):
+                forecaster.forecast_multi_horizon(horizons, [np.ones(5)])
+        assert forecaster.calls == 0
+
+
+class TestBatchPlanner:
+    """batch_planner 및 메모리 예산 기반 배치 테스트"""
+
+    definition = timesfm_2p5_base.TimesFM_2p5_200M_Definition()
+
+    def test_context_bucket(self):
+        """컨텍스트 길이를 2의 거듭제곱 패치 수로 올림하는지 확인"""
+        assert batch_planner.context_bucket(1, 4096, 32) == 32
+        assert batch_planner.context_bucket(33, 4096, 32) == 64
+        assert batch_planner.context_bucket(300, 4096, 32) == 512
+        assert batch_planner.context_bucket(5000, 4096, 32) == 4096
+        assert batch_planner.context_buckets(512, 32) == [32, 64, 128, 256, 512]
+        assert batch_planner.context_buckets(1000, 32)[-2:] == [512, 992]
+
+    def test_warmup_runs_every_context_bucket(self):
+        """warmup이 잘라낸 디코딩이 받을 수 있는 모든 길이를 한 번씩 실행하는지 확인"""
+        forecaster = make_forecaster(512, 2)
+        forecaster.trims_masked_patches = True
+        lengths = []
+
+        def fake_decode(horizon, inputs, masks):
+            trimmed, _ = timesfm_2p5_torch._trim_leading_masked_patches(
+                torch.from_numpy(inputs), torch.from_numpy(masks), 32
+            )
+            lengths.append(trimmed.shape[1])
+            point = np.zeros((len(inputs), horizon))
+            return point, point[..., None].repeat(10, axis=-1)
+
+        forecaster.compiled_decode = fake_decode
+        forecaster.warmup()
+
+        assert sorted(lengths) == batch_planner.context_buckets(512, 32)
+
+    def test_estimate_scales_with_batch_context_and_flip(self):
+        """추정치가 배치 크기에 비례하고 컨텍스트/flip invariance에 따라 늘어나는지 확인"""
+        fc = configs.ForecastConfig(max_context=4096, max_horizon=1024, force_flip_invariance=False)
+        one = batch_planner.estimate_decode_memory(self.definition, fc, 1)
+        eight = batch_planner.estimate_decode_memory(self.definition, fc, 8)
+        short = batch_planner.estimate_decode_memory(self.definition, fc, 1, context=512)
+        flipped = batch_planner.estimate_decode_memory(
+            self.definition, configs.ForecastConfig(max_context=4096, max_horizon=1024), 1
+        )
+
+        assert eight == {name: value * 8 for name, value in one.items()}
+        assert short["total"] < one["total"]
+        assert flipped["outputs"] == 2 * one["outputs"]
+        # 20개 층 K/V: 2 * 20 * (128 + 7 * 4) * 1280 * 4 bytes
+        assert one["kv_cache"] == 2 * 20 * 156 * 1280 * 4
+
+    @pytest.mark.parametrize("return_backcast", [False, True])
+    def test_head_terms_match_prefill_tensors(self, small_module, return_backcast):
+        """출력 헤드 activation/출력 항이 prefill에서 실제로 만들어지는 헤드 텐서 크기와 같은지 확인"""
+        sizes = {"heads": 0, "quantile_layers": 0}
+
+        def count(name):
+            def hook(module, inputs, output):
+                sizes[name] += output.numel() * output.element_size()
+            return hook
+
+        head = small_module.output_projection_quantiles
+        hooks = [
+            small_module.output_projection_point.register_forward_hook(count("heads")),
+            head.register_forward_hook(count("heads")),
+        ] + [
+            layer.register_forward_hook(count("quantile_layers"))
+            for layer in (head.hidden_layer, head.output_layer, head.residual_layer)
+        ]
+        # max_horizon 128이면 AR 단계 없이 prefill만 실행
+        with torch.no_grad():
+            small_module.decode(128, torch.randn(1, 256), torch.zeros(1, 256, dtype=torch.bool),
+                                return_backcast=return_backcast)
+        for hook in hooks:
+            hook.remove()
+
+        fc = configs.ForecastConfig(
+            max_context=256, max_horizon=128, force_flip_invariance=False, return_backcast=return_backcast
+        )
+        estimate = batch_planner.estimate_decode_memory(self.definition, fc, 1)
+
+        # 출력은 헤드 출력과 재정규화된 사본
+        assert estimate["outputs"] == 2 * sizes["heads"]
+        if return_backcast:
+            assert estimate["activations"] == sizes["quantile_layers"]
+        else:
+            assert estimate["activations"] >= sizes["quantile_layers"]
+        print(f"✓ 헤드 출력 {sizes['heads']} bytes, quantile 헤드 층 {sizes['quantile_layers']} bytes")
+
+    def test_plans_largest_batch_within_budget(self):
+        """예산(여유분 제외) 안에 들어가는 최대 배치 크기를 고르는지 확인"""
+        fc = configs.ForecastConfig(max_context=4096, max_horizon=1024)
+        budget = 512 * 2**20
+
+        batch_size = batch_planner.plan_batch_size(self.definition, fc, budget)
+
+        def total(n):
+            return batch_planner.estimate_decode_memory(self.definition, fc, n)["total"]
+
+        assert total(batch_size) <= budget * 0.8 < total(batch_size + 1)
+        assert batch_planner.plan_batch_size(self.definition, fc, budget, context=512) > batch_size
+        assert batch_planner.plan_batch_size(self.definition, fc, 1) == 1
+
+    def test_forecast_uses_planned_batches(self):
+        """메모리 예산이 있으면 계획된 배치 크기로 나누어 디코딩하는지 확인"""
+        forecaster = make_forecaster(4096, 2)
+        forecaster.forecast_config = configs.ForecastConfig(
+            max_context=4096, max_horizon=128, memory_budget_mb=64
+        )
+        forecaster.trims_masked_patches = True
+        batch_sizes = []
+
+        def fake_decode(horizon, inputs, masks):
+            batch_sizes.append(len(inputs))
+            point = np.repeat(inputs[:, -1:], horizon, axis=1)
+            return point, point[..., None].repeat(10, axis=-1)
+
+        forecaster.compiled_decode = fake_decode
+        inputs = [np.full(100, float(i)) for i in range(50)]
+
+        planned = forecaster.plan_batch_size(inputs)
+        point, _ = forecaster.forecast(horizon=4, inputs=inputs)
+
+        assert forecaster.decode_context(inputs) == 128
+        assert 2 < planned < 50
+        assert batch_sizes == [planned] * len(batch_sizes)
+        np.testing.assert_array_equal(point[:, 0], np.arange(50))
+        assert forecaster.plan_batch_size(inputs[:1]) == 1
+
+
+@pytest.fixture
+def small_module(monkeypatch):
+    """트랜스포머 층을 1개로 줄이고 무작위 가중치를 넣은 TimesFM 모듈 (출력 헤드 크기는 동일)"""
+    definition = timesfm_2p5_base.TimesFM_2p5_200M_Definition()
+    definition = dataclasses.replace(
+        definition,
+        stacked_transformers=dataclasses.replace(definition.stacked_transformers, num_layers=1),
+    )
+    monkeypatch.setattr(timesfm_2p5_torch.TimesFM_2p5_200M_torch_module, "config", definition)
+    torch.manual_seed(0)
+    module = timesfm_2p5_torch.TimesFM_2p5_200M_torch_module().eval()
+    # 정규화 scale 등 0으로 초기화되는 파라미터가 있어 attention이 실제로 동작하도록 채움
+    with torch.no_grad():
+        for p in module.parameters():
+            p.normal_(0, 0.05)
+    return module
+
+
+class TestOutputPositions:
+    """출력 헤드를 필요한 패치에만 적용하는 forward/decode 테스트"""
+
+    def test_forward_selects_positions(self, small_module):
+        """선택한 위치의 출력이 전체 출력의 해당 위치와 같은지 확인"""
+        inputs = torch.randn(2, 6, 32)
+        masks = torch.zeros(2, 6, 32, dtype=torch.bool)
+
+        with torch.no_grad():
+            (_, _, full_ts, full_spread), _ = small_module(inputs, masks)
+            (_, _, last_ts, last_spread), _ = small_module(inputs, masks, output_positions=slice(-1, None))
+            (_, _, point_ts, no_spread), _ = small_module(inputs, masks, compute_quantile_spread=False)
+
+        torch.testing.assert_close(last_ts, full_ts[:, -1:])
+        torch.testing.assert_close(last_spread, full_spread[:, -1:])
+        torch.testing.assert_close(point_ts, full_ts)
+        assert no_spread is None
+
+    def test_decode_without_backcast_matches_last_patch(self, small_module):
+        """backcast 없이 디코딩한 결과가 전체 디코딩의 마지막 패치와 같은지 확인"""
+        inputs = torch.randn(2, 256)
+        masks = torch.zeros(2, 256, dtype=torch.bool)
+        masks[1, :100] = True
+
+        full_pf, full_spread, full_ar = small_module.decode(384, inputs, masks)
+        last_pf, last_spread, last_ar = small_module.decode(384, inputs, masks, return_backcast=False)
+
+        assert full_pf.shape == (2, 8, 128, 10) and last_pf.shape == (2, 1, 128, 10)
+        torch.testing.assert_close(last_pf, full_pf[:, -1:])
+        torch.testing.assert_close(last_spread, full_spread)
+        torch.testing.assert_close(last_ar, full_ar)
+
+
+def relative_error(actual, expected):
+    """상대 L2 오차"""
+    return ((actual - expected).norm() / expected.norm()).item()
+
+
+def decode_sine(module, **kwargs):
+    """앞쪽 패딩이 있는 사인파 배치를 backcast 없이 디코딩"""
+    inputs = torch.sin(torch.arange(2 * 256, dtype=torch.float32) / 10).reshape(2, 256)
+    masks = torch.zeros(2, 256, dtype=torch.bool)
+    masks[1, :100] = True
+    return module.decode(384, inputs, masks, return_backcast=False, **kwargs)
+
+
+class TestPrecision:
+    """bf16 연산 정밀도 옵션 테스트"""
+
+    def test_bfloat16_decode_matches_float32(self, small_module):
+        """bf16 autocast 디코딩이 float32 출력으로 float32 디코딩과 5% 안에서 일치하는지 확인 (20층 모델 실측 약 3.8%)"""
+        expected = decode_sine(small_module)
+        actual = decode_sine(small_module, precision="bfloat16")
+
+        for a, e in zip(actual, expected):
+            assert a.dtype == torch.float32
+            assert not torch.equal(a, e)
+            assert relative_error(a, e) < 0.05
+        print(f"✓ 상대 오차: {[round(relative_error(a, e), 4) for a, e in zip(actual, expected)]}")
+
+    def forecaster_for(self, module):
+        forecaster = timesfm_2p5_torch.TimesFM_2p5_200M_torch.__new__(timesfm_2p5_torch.TimesFM_2p5_200M_torch)
+        forecaster.model = module
+        return forecaster
+
+    @pytest.mark.parametrize("options", [
+        {"precision": "float16"},
+        {"kv_cache_dtype": "int8"},
+    ])
+    def test_compile_rejects_unsupported_dtypes(self, small_module, options):
+        """지원하지 않는 연산 정밀도나 KV 캐시 dtype은 compile에서 ValueError를 발생시키는지 확인"""
+        with pytest.raises(ValueError, match="Unsupported"):
+            self.forecaster_for(small_module).compile(
+                configs.ForecastConfig(max_context=256, max_horizon=128, **options)
+            )
+
+    def test_compile_rejects_bfloat16_with_quantization(self, small_module):
+        """양자화된 모델에 bf16 정밀도를 지정하면 ValueError를 발생시키는지 확인"""
+        quantization.quantize_linear_layers(small_module, "int8_dynamic")
+        small_module.quantization = "int8_dynamic"
+
+        with pytest.raises(ValueError, match="quantized"):
+            self.forecaster_for(small_module).compile(
+                configs.ForecastConfig(max_context=256, max_horizon=128, precision="bfloat16")
+            )
+
+
+class TestKVCacheDtype:
+    """KV 캐시 저장 dtype 옵션 테스트"""
+
+    def test_cached_attention_reads_half_cache_as_stored(self):
+        """bf16 캐시를 float32로 복사하지 않고 캐시 dtype 그대로 attention에 넘기는지 확인"""
+        torch.manual_seed(0)
+        attn = transformer.MultiHeadAttention(num_heads=2, in_features=16, fuse_qkv=True)
+        inputs = torch.randn(2, 10, 16)
+
+        with torch.no_grad():
+            expected, _ = attn(inputs[:, :6], decode_cache=make_decode_cache(2, 14, 2, 8))
+            cache = make_decode_cache(2, 14, 2, 8)
+            cache.key = cache.key.to(torch.bfloat16)
+            cache.value = cache.value.to(torch.bfloat16)
+            attention_inputs = []
+            attention_fn = attn.attention_fn
+
+            def recording_attention(query, key, value, mask=None):
+                attention_inputs.append((query, key, value))
+                return attention_fn(query, key, value, mask=mask)
+
+            attn.attention_fn = recording_attention
+            actual, cache = attn(inputs[:, :6], decode_cache=cache)
+
+        query, key, value = attention_inputs[0]
+        assert query.dtype == key.dtype == value.dtype == torch.bfloat16
+        assert key.untyped_storage().data_ptr() == cache.key.untyped_storage().data_ptr()
+        assert value.untyped_storage().data_ptr() == cache.value.untyped_storage().data_ptr()
+        assert actual.dtype == torch.float32
+        assert cache.key.dtype == torch.bfloat16 and cache.value.dtype == torch.bfloat16
+        torch.testing.assert_close(actual, expected, rtol=2e-2, atol=2e-2)
+
+    @pytest.mark.parametrize("kv_cache_dtype", ["bfloat16", "float16"])
+    def test_decode_with_half_cache_matches_float32(self, small_module, kv_cache_dtype):
+        """반정밀도 캐시 디코딩 결과가 float32 캐시와 0.5% 안에서 일치하는지 확인 (20층 모델 bf16 실측 약 0.25%)"""
+        expected = decode_sine(small_module)
+        actual = decode_sine(small_module, kv_cache_dtype=kv_cache_dtype)
+
+        for a, e in zip(actual, expected):
+            torch.testing.assert_close(a, e, rtol=1e-2, atol=1e-2)
+            assert not torch.equal(a, e)
+            assert relative_error(a, e) < 5e-3
+
+    def test_planner_counts_half_cache(self):
+        """메모리 추정치의 캐시 크기가 반으로 줄어드는지 확인"""
+        definition = timesfm_2p5_base.TimesFM_2p5_200M_Definition()
+        fc = configs.ForecastConfig(max_context=4096, max_horizon=1024)
+        fp32 = batch_planner.estimate_decode_memory(definition, fc, 1)
+        bf16 = batch_planner.estimate_decode_memory(
+            definition, dataclasses.replace(fc, kv_cache_dtype="bfloat16"), 1
+        )
+
+        assert bf16["kv_cache"] * 2 == fp32["kv_cache"]
+        assert bf16["activations"] == fp32["activations"]
+
+
+class TestPackedSegments:
+    """여러 시계열을 한 행에 나란히 넣어 디코딩하는 packing 테스트"""
+
+    def test_pack_rows_fills_longest_first(self):
+        """긴 시계열부터 남은 공간이 있는 첫 행에 배치하는지 확인"""
+        rows = timesfm_2p5_torch._pack_rows([2, 10, 4, 16, 2, 1], 16)
+
+        assert rows == [[3], [1, 2, 0], [4, 5]]
+
+    def test_segment_mask_is_block_diagonal_and_causal(self):
+        """같은 시계열의 이전 위치만 볼 수 있는지 확인"""
+        segment_ids = torch.tensor([[0, 0, 1, 1, 1]])
+        position = torch.tensor([[0, 1, 0, 1, 2]])
+
+        mask = transformer.make_segment_attn_mask(segment_ids, position, segment_ids, position)
+
+        expected = torch.tensor([
+            [1, 0, 0, 0, 0],
+            [1, 1, 0, 0, 0],
+            [0, 0, 1, 0, 0],
+            [0, 0, 1, 1, 0],
+            [0, 0, 1, 1, 1],
+        ], dtype=torch.bool)
+        torch.testing.assert_close(mask, expected[None, None])
+
+    def test_packed_decode_matches_unpacked(self, small_module):
+        """길이가 다른 시계열을 packing한 디코딩 결과가 개별 디코딩과 같은지 확인"""
+        lengths = [40, 100, 512, 64, 300, 20]
+        inputs = torch.sin(torch.arange(6 * 512, dtype=torch.float32) / 7).reshape(6, 512)
+        inputs = inputs + torch.randn(6, 512) * 0.1
+        masks = torch.zeros(6, 512, dtype=torch.bool)
+        for i, length in enumerate(lengths):
+            masks[i, : 512 - length] = True
+
+        expected = small_module.decode(512, inputs, masks, return_backcast=False)
+        actual = small_module.decode(512, inputs, masks, return_backcast=False, pack_inputs=True)
+
+        for a, e in zip(actual, expected):
+            assert a.shape == e.shape
+            torch.testing.assert_close(a, e, rtol=1e-4, atol=1e-4)
+
+    def test_rejects_backcast(self, small_module):
+        """backcast를 요청하면 packing을 거부하는지 확인"""
+        inputs = torch.randn(2, 64)
+        masks = torch.zeros(2, 64, dtype=torch.bool)
+
+        with pytest.raises(ValueError, match="backcast"):
+            small_module.decode(128, inputs, masks, pack_inputs=True)
+
+
+class TestChunkedAttention:
+    """transformer.chunked_dot_product_attention 테스트"""
+
+    @pytest.mark.parametrize("block_size", [1, 7, 64, 512])
+    def test_matches_fused_attention(self, block_size):
+        """블록 크기와 관계없이 fused attention과 같은 결과인지 확인 (전부 마스킹된 query 포함)"""
+        torch.manual_seed(0)
+        query = torch.randn(2, 30, 4, 8)
+        key = torch.randn(2, 34, 4, 8)
+        value = torch.randn(2, 34, 4, 8)
+        mask = torch.ones(2, 1, 30, 34, dtype=torch.bool).tril(4)
+        mask[1, ..., :10] = False
+
+        expected = transformer._torch_dot_product_attention(query, key, value, mask=mask)
+        actual = transformer.chunked_dot_product_attention(query, key, value, mask=mask, block_size=block_size)
+
+        torch.testing.assert_close(actual, expected, rtol=1e-5, atol=1e-5)
+        assert torch.all(actual[1, :6] == 0)
+
+    def test_matches_reference_without_mask(self):
+        """마스크가 없을 때 einsum 기반 기준 구현과 같은지 확인"""
+        torch.manual_seed(0)
+        query, key, value = torch.randn(3, 2, 20, 2, 8).unbind(0)
+
+        expected = transformer._dot_product_attention(query, key, value)
+        actual = transformer.chunked_dot_product_attention(query, key, value, block_size=6)
+
+        torch.testing.assert_close(actual, expected, rtol=1e-5, atol=1e-5)
+
+    def test_decode_matches_fused_attention(self, small_module):
+        """모든 층에 청크 attention을 적용한 디코딩이 기본 attention과 같은지 확인"""
+        inputs = torch.randn(2, 512)
+        masks = torch.zeros(2, 512, dtype=torch.bool)
+        masks[1, :200] = True
+
+        expected = small_module.decode(384, inputs, masks, return_backcast=False)
+        small_module.set_attention_block_size(5)
+        actual = small_module.decode(384, inputs, masks, return_backcast=False)
+        small_module.set_attention_block_size(0)
+
+        for a, e in zip(actual, expected):
+            torch.testing.assert_close(a, e, rtol=1e-4, atol=1e-4)
+
+    def test_planner_counts_block_scores(self):
+        """청크 attention 사용 시 activation 추정치가 블록 크기 기준으로 줄어드는지 확인"""
+        definition = timesfm_2p5_base.TimesFM_2p5_200M_Definition()
+        fc = configs.ForecastConfig(max_context=15360, max_horizon=1024)
+        full = batch_planner.estimate_decode_memory(definition, fc, 1)
+        chunked = batch_planner.estimate_decode_memory(
+            definition, dataclasses.replace(fc, attention_block_size=64), 1
+        )
+
+        assert chunked["activations"] < full["activations"]
+        assert chunked["kv_cache"] == full["kv_cache"]
+
+
+class TestAttentionBackends:
+    """transformer.ATTENTION_BACKENDS와 시작 시 벤치마크 선택 테스트"""
+
+    @pytest.mark.parametrize("name", list(transformer.ATTENTION_BACKENDS))
+    def test_backend_matches_reference(self, name):
+        """패딩 없는 prefill, 패딩 prefill, AR 단계 마스크에서 기준 구현과 같은지 확인"""
+        torch.manual_seed(0)
+        attention_fn = transformer.ATTENTION_BACKENDS[name]
+        patch_mask = torch.zeros(2, 12, dtype=torch.bool)
+        padded = patch_mask.clone()
+        padded[1, :5] = True
+        cache = make_decode_cache(2, 16, 2, 8)
+        cache.next_index += 12
+        cases = [
+            (12, transformer.make_layer_attn_mask(patch_mask), patch_mask),
+            (12, transformer.make_layer_attn_mask(padded), padded),
+            (4, transformer.make_layer_attn_mask(patch_mask[:, :4], cache), patch_mask[:, :4]),
+        ]
+
+        for q_length, mask, query_mask in cases:
+            query = torch.randn(2, q_length, 2, 8)
+            key, value = torch.randn(2, 2, mask.shape[-1], 2, 8).unbind(0)
+            expected = transformer._dot_product_attention(query, key, value, mask)
+            actual = attention_fn(query, key, value, mask=mask)
+            valid = ~query_mask
+            torch.testing.assert_close(actual[valid], expected[valid], rtol=1e-5, atol=1e-5)
+
+    def test_additive_mask_is_converted_once(self):
+        """같은 bool 마스크는 층마다 다시 변환하지 않고 재사용하는지 확인"""
+        mask = transformer.make_layer_attn_mask(torch.zeros(1, 6, dtype=torch.bool))
+        query, key, value = torch.randn(3, 1, 6, 2, 8).unbind(0)
+
+        transformer._torch_additive_mask_attention(query, key, value, mask=mask)
+        additive = transformer._ADDITIVE_MASK_CACHE[id(mask)][1]
+        transformer._torch_additive_mask_attention(query, key, value, mask=mask)
+
+        assert transformer._ADDITIVE_MASK_CACHE[id(mask)][1] is additive
+        assert additive.dtype == torch.float32 and additive[0, 0, 0, 1] < -1e30
+
+    def test_additive_mask_cache_is_bounded_and_released(self):
+        """변환된 마스크 캐시가 크기 제한을 넘지 않고, 원래 마스크가 해제되면 함께 해제되는지 확인"""
+        masks = [transformer.make_layer_attn_mask(torch.zeros(1, 6, dtype=torch.bool)) for _ in range(20)]
+        for mask in masks:
+            transformer._cached_additive_mask(mask, torch.float32)
+
+        assert len(transformer._ADDITIVE_MASK_CACHE) <= transformer._ADDITIVE_MASK_CACHE_SIZE
+        assert id(masks[-1]) in transformer._ADDITIVE_MASK_CACHE
+
+        del masks, mask
+        assert len(transformer._ADDITIVE_MASK_CACHE) == 0
+
+    def test_additive_mask_cache_is_thread_safe(self):
+        """여러 스레드가 서로 다른 마스크로 동시에 호출해도 각자의 마스크로 계산하는지 확인"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        query, key, value = torch.randn(3, 1, 6, 2, 8).unbind(0)
+        masks = [
+            transformer.make_layer_attn_mask(torch.arange(6)[None, :] < k) for k in range(6)
+        ]
+        expected = [
+            transformer._torch_dot_product_attention(
+                query, key, value, transformer.additive_attn_mask(mask, query.dtype)
+            )
+            for mask in masks
+        ]
+
+        def run(k):
+            return [
+                transformer._torch_additive_mask_attention(query, key, value, mask=masks[k]) for _ in range(50)
+            ]
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(run, range(6)))
+
+        for k, outputs in enumerate(results):
+            for output in outputs:
+                torch.testing.assert_close(output, expected[k])
+
+    @pytest.mark.parametrize("name", ["sdpa_additive", "einsum"])
+    def test_decode_matches_default_backend(self, small_module, name):
+        """다른 attention 구현으로 디코딩한 결과가 기본 구현과 같은지 확인"""
+        inputs = torch.randn(2, 256)
+        masks = torch.zeros(2, 256, dtype=torch.bool)
+
+        expected = small_module.decode(384, inputs, masks, return_backcast=False)
+        small_module.set_attention_backend(name)
+        actual = small_module.decode(384, inputs, masks, return_backcast=False)
+        small_module.set_attention_backend("sdpa")
+
+        for a, e in zip(actual, expected):
+            torch.testing.assert_close(a, e, rtol=1e-4, atol=1e-4)
+
+    def test_compile_picks_fastest_correct_backend(self, small_module, monkeypatch):
+        """auto 설정 시 벤치마크에서 가장 빠르고 정확한 구현을 선택하는지 확인"""
+        timings = {"sdpa": 3.0, "sdpa_additive": 2.0, "einsum": None}
+        monkeypatch.setattr(transformer, "benchmark_attention_backends", lambda *args, **kwargs: timings)
+        forecaster = timesfm_2p5_torch.TimesFM_2p5_200M_torch.__new__(timesfm_2p5_torch.TimesFM_2p5_200M_torch)
+        forecaster.model = small_module
+
+        forecaster.compile(configs.ForecastConfig(max_context=256, max_horizon=128, attention_backend="auto"))
+
+        assert forecaster.attention_benchmark == timings
+        assert small_module.attention_backend == "sdpa_additive"
+        assert small_module.stacked_xf[0].attn.attention_fn is transformer._torch_additive_mask_attention
+
+    def test_benchmark_times_every_backend(self):
+        """벤치마크가 모든 구현의 시간을 측정하는지 확인"""
+        timings = transformer.benchmark_attention_backends(
+            2, 8, 2, 8, num_decode_steps=3, decode_patches=4, repeats=1
+        )
+
+        assert set(timings) == set(transformer.ATTENTION_BACKENDS)
+        assert all(t is not None and t > 0 for t in timings.values())
+
+    def test_benchmark_runs_decode_shapes(self, small_module, monkeypatch):
+        """벤치마크가 실제 디코딩의 prefill과 AR 단계 attention shape (query 수, key 수)로 측정하는지 확인"""
+        decode_shapes = []
+        attn = small_module.stacked_xf[0].attn
+        attention_fn = attn.attention_fn
+
+        def recording_decode(query, key, value, mask=None):
+            decode_shapes.append((query.shape[1], key.shape[1]))
+            return attention_fn(query, key, value, mask=mask)
+
+        attn.attention_fn = recording_decode
+        small_module.decode(1024, torch.randn(2, 256), torch.zeros(2, 256, dtype=torch.bool), return_backcast=False)
+
+        benchmark_shapes = []
+
+        def recording_benchmark(query, key, value, mask=None):
+            benchmark_shapes.append((query.shape[1], key.shape[1]))
+            return transformer._torch_dot_product_attention(query, key, value, mask)
+
+        monkeypatch.setattr(transformer, "ATTENTION_BACKENDS", {"recording": recording_benchmark})
+        transformer.benchmark_attention_backends(
+            2, 256 // small_module.p, small_module.h, small_module.hd,
+            num_decode_steps=(1024 - 1) // small_module.o, decode_patches=small_module.m, repeats=1,
+        )
+
+        # 정확도 확인 1회 + 측정 1회, 각각 패딩 없는/있는 디코딩
+        assert benchmark_shapes == decode_shapes * 4
+
+
+class TestQuantization:
+    """quantization.quantize_linear_layers 테스트"""
+
+    def test_quantizes_all_linear_layers(self):
+        """모든 nn.Linear가 int8 동적 양자화 레이어로 바뀌고 결과가 근사하는지 확인"""
+        torch.manual_seed(0)
+        block = dense.ResidualBlock(configs.ResidualBlockConfig(
+            input_dims=64, hidden_dims=128, output_dims=64, use_bias=True, activation="swish"
+        ))
+        inputs = torch.randn(4, 64)
+        with torch.no_grad():
+            expected = block(inputs)
+            quantization.quantize_linear_layers(block, "int8_dynamic")
+            actual = block(inputs)
+
+        assert not any(isinstance(m, torch.nn.Linear) for m in block.modules())
+        relative_error = ((actual - expected).norm() / expected.norm()).item()
+        assert relative_error < 0.05
+        print(f"✓ 상대 오차: {relative_error:.4f}")
+
+    def test_rejects_unknown_mode(self):
+        """지원하지 않는 모드는 ValueError를 발생시키는지 확인"""
+        with pytest.raises(ValueError):
+            quantization.quantize_linear_layers(torch.nn.Linear(4, 4), "int4")
+
+
+class TestCompiledDecode:
+    """torch.compile 적용 시 graph break / 재컴파일 테스트"""
+
+    @pytest.mark.parametrize("max_horizon, horizon", [(128, 100), (1024, 1000)])
+    def test_lengths_share_graphs_without_breaks(self, small_module, max_horizon, horizon):
+        """여러 길이를 예측해도 (자기회귀 단계의 캐시 버킷 길이 포함) graph break 없이 소수의 그래프만 컴파일되는지 확인"""
+        from torch._dynamo.utils import counters
+
+        forecaster = timesfm_2p5_torch.TimesFM_2p5_200M_torch.__new__(timesfm_2p5_torch.TimesFM_2p5_200M_torch)
+        forecaster.model = small_module
+        # 그래프 분할과 재컴파일은 backend와 무관하므로 코드 생성 없는 eager backend 사용
+        small_module.compile(backend="eager")
+        forecaster.compile(configs.ForecastConfig(max_context=256, max_horizon=max_horizon, per_core_batch_size=2))
+
+        torch._dynamo.reset()
+        counters.clear()
+        try:
+            for length in (250, 130, 40, 200, 90):
+                inputs = [np.sin(np.arange(length) / 10.0)] * 2
+                forecaster.forecast(horizon=horizon, inputs=inputs)
+
+            graph_breaks = dict(counters["graph_break"])
+            unique_graphs = counters["stats"]["unique_graphs"]
+        finally:
+            torch._dynamo.reset()
+
+        assert graph_breaks == {}
+        # 정적/동적 shape 각각 quantile spread 계산 여부별 하나씩
+        assert unique_graphs <= 4
+        print(f"✓ graph break 0, 그래프 {unique_graphs}개")
+
+
+class TestCompileCache:
+    """compile_cache 테스트"""
+
+    def test_configure_points_inductor_at_directory(self, tmp_path, monkeypatch):
+        """Inductor 캐시 디렉토리가 지정한 경로로 설정되는지 확인"""
+        from torch._inductor.runtime.cache_dir_utils import cache_dir
+
+        monkeypatch.setenv("TORCHINDUCTOR_CACHE_DIR", str(tmp_path / "default"))
+        compile_cache.configure(str(tmp_path / "artifacts"))
+
+        assert cache_dir() == str(tmp_path / "artifacts")
+        assert (tmp_path / "artifacts").is_dir()
+
+    def test_cache_stats_reports_hits_and_misses(self):
+        """적중/미스 카운터를 모두 반환하는지 확인"""
+        stats = compile_cache.cache_stats()
+
+        assert set(stats) == {
+            "fxgraph_cache_hit", "fxgraph_cache_miss", "autograd_cache_hit", "autograd_cache_miss"
+        }
+        assert all(isinstance(v, int) for v in stats.values())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,247 @@
+"""
+사용량 인덱스(usage_index) 테스트
+건물별 누적 인덱스의 구간 총 사용량, 증분 적재, service_get_total_energy_usage_batch를 검증합니다.
+"""
+
+import json
+import time
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from src import services
+from src.services import service_get_total_energy_usage_batch
+from src.usage_index import BuildingUsageIndex, UsageIndex, to_datetime64
+
+
+def make_rows(building, start, count, usage=lambda i: 1.0):
+    """start부터 10분 간격 count개의 electricity 행 생성"""
+    return [
+        {"building": building, "datetime": start + timedelta(minutes=10 * i), "powerusage": usage(i)}
+        for i in range(count)
+    ]
+
+
+def brute_force_total(rows, start, end):
+    """구간의 첫 행 다음부터 마지막 행까지 powerusage 합 (MAX-MIN과 같은 의미)"""
+    selected = [r["powerusage"] for r in rows if start <= r["datetime"] <= end]
+    return sum(selected[1:]) if selected else None
+
+
+@pytest.fixture(autouse=True)
+def empty_usage_index():
+    """테스트마다 빈 사용량 인덱스와 기간 조회 캐시 사용"""
+    services.clear_range_cache()
+    with patch('src.usage_index._index', UsageIndex()):
+        yield
+
+
+class TestBuildingUsageIndex:
+    """BuildingUsageIndex 테스트"""
+
+    def test_matches_range_scan(self):
+        """이진 탐색 결과가 구간 전체 합산과 같은지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: BuildingUsageIndex - 구간 합산과 비교")
+        print("=" * 60)
+
+        rng = np.random.default_rng(0)
+        usages = rng.uniform(0, 10, size=500)
+        rows = make_rows("하이테크센터", datetime(2024, 9, 1), 500, lambda i: float(usages[i]))
+        index = BuildingUsageIndex(to_datetime64([r["datetime"] for r in rows]), usages)
+
+        for _ in range(100):
+            start = datetime(2024, 9, 1) + timedelta(minutes=int(rng.integers(-60, 5000)))
+            end = start + timedelta(minutes=int(rng.integers(0, 3000)))
+            expected = brute_force_total(rows, start, end)
+            total = index.totals(to_datetime64([start]), to_datetime64([end]))[0]
+            if expected is None:
+                assert np.isnan(total)
+            else:
+                assert total == pytest.approx(expected)
+        print("✓ 100개 무작위 구간 일치")
+
+    def test_extend_keeps_totals(self):
+        """순서대로/순서 없이 추가해도 한 번에 만든 인덱스와 같은지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: BuildingUsageIndex - 증분 추가")
+        print("=" * 60)
+
+        timestamps = to_datetime64([datetime(2024, 9, 1) + timedelta(minutes=10 * i) for i in range(30)])
+        usages = np.arange(30, dtype=np.float64)
+        full = BuildingUsageIndex(timestamps, usages)
+
+        appended = BuildingUsageIndex(timestamps[:10], usages[:10]).extend(timestamps[10:], usages[10:])
+        late = BuildingUsageIndex(timestamps[5:], usages[5:]).extend(timestamps[:5], usages[:5])
+
+        for index in (appended, late):
+            np.testing.assert_array_equal(index.timestamps, full.timestamps)
+            np.testing.assert_allclose(index.cumulative, full.cumulative)
+        print("✓ 증분 인덱스 일치")
+
+
+def electricity_table(rows):
+    """건물 하나의 since 이후 행을 datetime 순으로 limit개까지 반환하는 execute_read_query 대역 (rows는 테스트 중 추가 가능)"""
+    async def query(sql, params):
+        selected = sorted(
+            (r for r in rows
+             if r["building"] == params["building"] and ("since" not in params or r["datetime"] > params["since"])),
+            key=lambda r: r["datetime"],
+        )
+        return [{"datetime": r["datetime"], "powerusage": r["powerusage"]} for r in selected[:params["limit"]]]
+    return query
+
+
+class TestUsageIndex:
+    """UsageIndex 적재 테스트"""
+
+    @pytest.mark.asyncio
+    async def test_refresh_rereads_overlap_without_double_counting(self):
+        """마지막 적재 시각 - overlap 이후만 다시 조회하고, 겹친 행은 중복 집계하지 않는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: UsageIndex - 증분 적재")
+        print("=" * 60)
+
+        index = UsageIndex(refresh_interval=0, overlap=timedelta(minutes=20))
+        rows = make_rows("하이테크센터", datetime(2024, 9, 1), 12)
+        table = rows[:6]
+
+        with patch('src.usage_index.execute_read_query', side_effect=electricity_table(table)) as mock_query:
+            await index.refresh(["하이테크센터"])
+            table += rows[6:]
+            await index.refresh(["하이테크센터"])
+
+            assert mock_query.await_count == 2
+            assert "since" not in mock_query.await_args_list[0].args[1]
+            assert mock_query.await_args.args[1] == {
+                "building": "하이테크센터",
+                "since": datetime(2024, 9, 1, 0, 30),
+                "limit": index.chunk_size,
+            }
+
+        total = index.totals("하이테크센터", [datetime(2024, 9, 1)], [datetime(2024, 9, 1, 1, 50)])[0]
+        assert total == 11.0
+        assert np.isnan(index.totals("없는건물", [datetime(2024, 9, 1)], [datetime(2024, 9, 2)])[0])
+        print(f"✓ 증분 적재 후 총 사용량: {total}")
+
+    @pytest.mark.asyncio
+    async def test_loads_only_requested_buildings(self):
+        """요청된 건물만 건물별 조회로 적재하는지 확인"""
+        index = UsageIndex(refresh_interval=0)
+        table = make_rows("하이테크센터", datetime(2024, 9, 1), 6) + make_rows("본관", datetime(2024, 9, 1), 6)
+
+        with patch('src.usage_index.execute_read_query', side_effect=electricity_table(table)) as mock_query:
+            await index.refresh(["하이테크센터"])
+
+            assert [c.args[1]["building"] for c in mock_query.await_args_list] == ["하이테크센터"]
+            assert all("WHERE building = :building" in c.args[0] for c in mock_query.await_args_list)
+
+        assert list(index.buildings) == ["하이테크센터"]
+
+    @pytest.mark.asyncio
+    async def test_reads_in_chunks(self):
+        """처음 적재하는 건물의 행을 chunk_size씩 나누어 읽어도 한 번에 만든 인덱스와 같은지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: UsageIndex - chunk 단위 적재")
+        print("=" * 60)
+
+        index = UsageIndex(refresh_interval=0, chunk_size=4)
+        rows = make_rows("하이테크센터", datetime(2024, 9, 1), 10, lambda i: float(i))
+
+        with patch('src.usage_index.execute_read_query', side_effect=electricity_table(rows)) as mock_query:
+            await index.refresh(["하이테크센터"])
+
+            assert [c.args[1].get("since") for c in mock_query.await_args_list] == [
+                None, rows[3]["datetime"], rows[7]["datetime"],
+            ]
+
+        full = BuildingUsageIndex(to_datetime64([r["datetime"] for r in rows]), np.arange(10, dtype=np.float64))
+        np.testing.assert_array_equal(index.buildings["하이테크센터"].timestamps, full.timestamps)
+        np.testing.assert_allclose(index.buildings["하이테크센터"].cumulative, full.cumulative)
+        print(f"✓ {mock_query.await_count}회 조회로 {len(rows)}개 행 적재")
+
+    @pytest.mark.asyncio
+    async def test_refresh_waits_for_interval(self):
+        """건물별로 refresh_interval 안에는 DB를 다시 조회하지 않는지 확인"""
+        index = UsageIndex(refresh_interval=3600)
+        table = make_rows("하이테크센터", datetime(2024, 9, 1), 6) + make_rows("본관", datetime(2024, 9, 1), 6)
+
+        with patch('src.usage_index.execute_read_query', side_effect=electricity_table(table)) as mock_query:
+            await index.refresh(["하이테크센터"])
+            await index.refresh(["하이테크센터"])
+            assert mock_query.await_count == 1
+
+            await index.refresh(["하이테크센터", "본관"])
+            assert [c.args[1]["building"] for c in mock_query.await_args_list] == ["하이테크센터", "본관"]
+
+    @pytest.mark.asyncio
+    async def test_late_rows_across_buildings(self):
+        """다른 건물보다 늦게 수집된 건물의 행과 overlap 안에서 늦게 도착한 행이 모두 반영되는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: UsageIndex - 건물별 늦은 수집")
+        print("=" * 60)
+
+        start = datetime(2024, 9, 1)
+        hitech = make_rows("하이테크센터", start, 7, lambda i: float(i + 1))
+        main = make_rows("본관", start, 7, lambda i: 10.0 * (i + 1))
+        # 본관은 00:20까지만, 하이테크센터는 00:50 행이 빠진 채 01:00까지 수집된 상태
+        table = main[:3] + hitech[:5] + hitech[6:]
+        index = UsageIndex(refresh_interval=0, overlap=timedelta(minutes=30))
+
+        with patch('src.usage_index.execute_read_query', side_effect=electricity_table(table)):
+            await index.refresh(["하이테크센터", "본관"])
+            table += main[3:] + hitech[5:6]
+            await index.refresh(["하이테크센터", "본관"])
+
+        end = start + timedelta(hours=1)
+        for building, rows in (("하이테크센터", hitech), ("본관", main)):
+            total = index.totals(building, [start], [end])[0]
+            assert total == brute_force_total(rows, start, end)
+            print(f"✓ {building} 총 사용량: {total}")
+
+
+class TestServiceGetTotalEnergyUsageBatch:
+    """service_get_total_energy_usage_batch 테스트"""
+
+    @pytest.mark.asyncio
+    async def test_daily_totals_for_a_semester(self):
+        """여러 건물의 한 학기 일일 사용량을 건물별 조회로 적재한 인덱스에서 계산하는지 확인"""
+        print("\n" + "=" * 60)
+        print("TEST: service_get_total_energy_usage_batch - 학기 일일 사용량")
+        print("=" * 60)
+
+        buildings = ["하이테크센터", "본관", "60주년기념관"]
+        semester_start = datetime(2024, 9, 1)
+        days = 120
+        rows = []
+        for b, building in enumerate(buildings):
+            rows += make_rows(building, semester_start, days * 144, lambda i, b=b: float(b + 1))
+        queries = [
+            {
+                "building": building,
+                "start_date_time": semester_start + timedelta(days=day),
+                "end_date_time": semester_start + timedelta(days=day, hours=23, minutes=59, seconds=59),
+            }
+            for day in range(days)
+            for building in buildings
+        ]
+        queries.append({"building": "없는건물", "start_date_time": semester_start, "end_date_time": semester_start})
+
+        with patch('src.usage_index.execute_read_query', side_effect=electricity_table(rows)) as mock_query:
+            start = time.perf_counter()
+            result_dict = json.loads(await service_get_total_energy_usage_batch(queries))
+            elapsed = time.perf_counter() - start
+
+            # 요청된 건물만 건물별로 조회
+            assert {c.args[1]["building"] for c in mock_query.await_args_list} == set(buildings) | {"없는건물"}
+
+        assert result_dict["summary"] == {"total": len(queries), "found": len(queries) - 1, "missing": 1}
+        for query, result in zip(queries[:-1], result_dict["results"]):
+            # 하루 144개 중 첫 시점 이후 143구간
+            assert result["total_usage_kwh"] == 143.0 * (buildings.index(query["building"]) + 1)
+        assert result_dict["results"][-1]["total_usage_kwh"] is None
+        print(f"✓ {len(queries)}개 기간 계산: {elapsed * 1000:.1f}ms (인덱스 적재 포함)")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])